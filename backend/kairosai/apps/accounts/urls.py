@@ -4,6 +4,7 @@ from .views import (
     google_auth, change_password, change_email,
     send_verification_email, verify_email_code,
     AdminDashboardView, AdminUsersView, AdminReportsView,
+    AdminLLMStatusView, AdminLLMRoutingView, AdminAnalysisQueueView,
 )
 
 urlpatterns = [
@@ -23,4 +24,7 @@ urlpatterns = [
     path("admin/users/", AdminUsersView.as_view(), name="admin_users"),
     path("admin/users/<int:pk>/", AdminUsersView.as_view(), name="admin_user_detail"),
     path("admin/reports/", AdminReportsView.as_view(), name="admin_reports"),
+    path("admin/llm-status/", AdminLLMStatusView.as_view(), name="admin_llm_status"),
+    path("admin/llm-routing/", AdminLLMRoutingView.as_view(), name="admin_llm_routing"),
+    path("admin/analysis-queue/", AdminAnalysisQueueView.as_view(), name="admin_analysis_queue"),
 ]
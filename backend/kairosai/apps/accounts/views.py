@@ -501,3 +501,48 @@ class AdminReportsView(APIView):
             'page': page,
             'page_size': page_size,
         })
+
+
+class AdminLLMStatusView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        from apps.ai_agents import resilience
+        from apps.ai_agents.rate_limiter import get_limiter
+
+        return Response({
+            'rate_limiter': get_limiter().metrics(),
+            'circuit_breakers': resilience.breaker_states(),
+        })
+
+
+class AdminAnalysisQueueView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        from apps.analysis.job_scheduler import lane_metrics
+        from apps.analysis.speculative import provisional_accuracy
+
+        return Response({
+            'max_concurrent': settings.ANALYSIS_MAX_CONCURRENT,
+            'lanes': lane_metrics(),
+            'provisional_accuracy': provisional_accuracy(),
+        })
+
+
+class AdminLLMRoutingView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        from apps.ai_agents.model_router import prompt_cache_report, routing_report
+
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response({'error': 'hours must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'hours': hours,
+            'experiments': settings.LLM_ROUTE_EXPERIMENTS,
+            'routes': routing_report(hours),
+            'prompt_cache': prompt_cache_report(hours),
+        })
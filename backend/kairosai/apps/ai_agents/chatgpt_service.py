@@ -1,27 +1,78 @@
-import json
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import openai
 from django.conf import settings
 
+from . import model_router
+from .rate_limiter import RateLimitedClient
+
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = 'text-embedding-3-small'
+EMBEDDING_DIMENSIONS = 256
+
+CHAT_PROMPT_VERSION = 'chat/v2'
+# Static; the reports context follows in its own message so this prefix is byte-identical on every call
+CHAT_SYSTEM_PROMPT = """You are an expert AI business intelligence assistant and strategic advisor. You help users with comprehensive business strategy, market analysis, and expansion planning using their market research data as context.
+
+## Your Role:
+- Act as a strategic business advisor who has access to the user's market analysis reports
+- Answer both specific questions about the reports AND broader business strategy questions
+- Use the report data as context to provide informed, strategic advice
+- Be conversational, insightful, and forward-thinking
+- Think beyond just the reports to provide strategic recommendations
+
+## Your Capabilities:
+- **Report Analysis**: Answer specific questions about market scores, competitive landscape, revenue projections
+- **Strategic Planning**: Help with business strategy, expansion planning, market entry decisions
+- **Market Intelligence**: Suggest new markets, countries, or opportunities based on the data
+- **Risk Assessment**: Identify potential challenges and mitigation strategies
+- **Competitive Analysis**: Provide insights on competitive positioning and differentiation
+- **Financial Planning**: Help with revenue projections, budget allocation, ROI analysis
+- **Geographic Expansion**: Suggest new countries, regions, or markets to consider
+- **Industry Insights**: Provide broader industry context and trends
+
+## Response Style:
+- Be conversational and engaging, like talking to a business consultant
+- Use the report data to inform your advice, but don't limit yourself to just the reports
+- Ask follow-up questions when appropriate to provide better advice
+- Provide specific, actionable recommendations
+- Think strategically about the user's broader business goals
+- Be honest about limitations and suggest additional research when needed
+
+## Examples of Questions You Can Handle:
+- "What's my market opportunity score?" (Report-specific)
+- "Any other countries you think I should consider?" (Strategic expansion)
+- "How should I position my product in this market?" (Strategic positioning)
+- "What are the biggest risks I should worry about?" (Risk assessment)
+- "Should I partner with local companies?" (Partnership strategy)
+- "How does this compare to other markets I've analyzed?" (Comparative analysis)
+
+Remember: You're not just a report reader - you're a strategic business advisor who happens to have access to detailed market analysis data. Use this data to provide comprehensive, strategic business advice."""
+CHAT_PROMPT_ID = model_router.prompt_id(CHAT_PROMPT_VERSION, CHAT_SYSTEM_PROMPT)
+
+SUMMARY_SYSTEM_PROMPT = "You maintain a running summary of a business strategy chat. Keep the user's goals, questions, decisions, figures and the advice already given. At most 200 words."
+SUMMARY_PROMPT_ID = model_router.prompt_id('chat-summary/v1', SUMMARY_SYSTEM_PROMPT)
+
+
 class ChatGPTService:
     """
     Service for integrating with ChatGPT API for chatbot responses with RAG context.
     """
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = RateLimitedClient(openai.OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0), priority='interactive')
     
-    def generate_response_with_rag(self, user_query: str, context_reports: List[Dict], conversation_history: List[Dict] = None) -> Dict[str, Any]:
+    def generate_response_with_rag(self, user_query: str, context_reports: List[Dict], conversation_history: List[Dict] = None,
+                                   conversation_summary: str = '') -> Dict[str, Any]:
         """
         Generate ChatGPT response with RAG context from market reports.
         
         Args:
             user_query: The user's question
             context_reports: List of relevant market reports for context
-            conversation_history: Previous conversation messages for context
+            conversation_history: Recent conversation messages for context
+            conversation_summary: Rolling summary of the conversation before those messages
             
         Returns:
             Dict containing the AI response and sources used
@@ -31,21 +82,23 @@ class ChatGPTService:
             rag_context = self._build_rag_context(context_reports)
             
             # Build conversation context
-            conversation_context = self._build_conversation_context(conversation_history)
-            
-            # Create the system prompt with RAG context
-            system_prompt = self._create_system_prompt(rag_context)
+            conversation_context = self._build_conversation_context(conversation_history, conversation_summary)
             
-            # Build messages for ChatGPT
+            # Most stable first, so the provider can cache the longest prompt prefix: the static
+            # instructions, then the user's reports, then the summary and recent turns.
             messages = [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+                {"role": "system", "content": f"## Available Market Reports Context:\n{rag_context}"},
                 *conversation_context,
                 {"role": "user", "content": user_query}
             ]
             
-            # Call ChatGPT API
+            # Follow-ups in an ongoing conversation go to the cheaper model
+            decision = model_router.route('chat_followup' if conversation_context else 'chat')
+            decision['prompt_template'] = CHAT_PROMPT_ID
             response = self.client.chat.completions.create(
-                model="gpt-4",
+                route=decision,
+                model=decision['model'],
                 messages=messages,
                 temperature=0.7,
                 max_tokens=1000,
@@ -60,7 +113,7 @@ class ChatGPTService:
             return {
                 'content': ai_response,
                 'sources': sources,
-                'model_used': 'gpt-4',
+                'model_used': decision['model'],
                 'tokens_used': response.usage.total_tokens if response.usage else 0
             }
             
@@ -69,56 +122,30 @@ class ChatGPTService:
             # Fallback to simple response
             return self._generate_fallback_response(user_query, context_reports)
     
+    def embed_query(self, text: str) -> Optional[List[float]]:
+        """Embedding of a chat question for the semantic response cache; None on failure."""
+        try:
+            response = self.client.embeddings.create(model=EMBEDDING_MODEL, input=text, dimensions=EMBEDDING_DIMENSIONS)
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning(f"Error embedding chat question: {str(e)}")
+            return None
+    
     def _build_rag_context(self, reports: List[Dict]) -> str:
-        """Build comprehensive RAG context from market reports."""
+        """Concatenate the precomputed per-report digests."""
         if not reports:
             return "No market reports available for context."
-        
-        context_parts = []
-        for report in reports:
-            # Extract detailed scores for better context
-            scores = report.get('scores', {})
-            market_score = scores.get('market_opportunity_score', 'N/A')
-            competitive_intensity = scores.get('competitive_intensity', 'N/A')
-            complexity_score = scores.get('entry_complexity_score', 'N/A')
-            revenue_y1 = scores.get('revenue_potential_y1', 'N/A')
-            revenue_y3 = scores.get('revenue_potential_y3', 'N/A')
-            
-            context_parts.append(f"""
-**Market Analysis Report: {report.get('title', 'Market Analysis')}**
-
-**Company & Market Details:**
-- Company: {report.get('company_name', 'N/A')}
-- Industry: {report.get('industry', 'N/A')}
-- Target Market: {report.get('target_market', 'N/A')}
-- Analysis Date: {report.get('created_at', 'N/A')}
-
-**Executive Summary:**
-{report.get('summary', 'No summary available')}
-
-**Key Market Metrics:**
-- Market Opportunity Score: {market_score}/10
-- Competitive Intensity: {competitive_intensity}
-- Entry Complexity: {complexity_score}/10
-- Revenue Potential (Y1): ${revenue_y1}M
-- Revenue Potential (Y3): ${revenue_y3}M
-
-**Strategic Insights:**
-{json.dumps(report.get('key_insights', []), indent=2)}
-
-**Detailed Analysis Data:**
-{json.dumps(scores, indent=2)}
-""")
-        
-        return "\n".join(context_parts)
+        return "\n\n".join(report.get('digest', '') for report in reports)
     
-    def _build_conversation_context(self, conversation_history: List[Dict]) -> List[Dict]:
-        """Build conversation context from history."""
-        if not conversation_history:
-            return []
-        
+    def _build_conversation_context(self, conversation_history: List[Dict], conversation_summary: str = '') -> List[Dict]:
+        """Build conversation context from the summary and the (already token-bounded) recent messages."""
         context = []
-        for message in conversation_history[-10:]:  # Last 10 messages for context
+        if conversation_summary:
+            context.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{conversation_summary}"
+            })
+        for message in conversation_history or []:
             role = "user" if message.get('message_type') == 'user' else "assistant"
             context.append({
                 "role": role,
@@ -127,48 +154,30 @@ class ChatGPTService:
         
         return context
     
-    def _create_system_prompt(self, rag_context: str) -> str:
-        """Create system prompt with RAG context."""
-        return f"""You are an expert AI business intelligence assistant and strategic advisor. You help users with comprehensive business strategy, market analysis, and expansion planning using their market research data as context.
-
-## Your Role:
-- Act as a strategic business advisor who has access to the user's market analysis reports
-- Answer both specific questions about the reports AND broader business strategy questions
-- Use the report data as context to provide informed, strategic advice
-- Be conversational, insightful, and forward-thinking
-- Think beyond just the reports to provide strategic recommendations
-
-## Available Market Reports Context:
-{rag_context}
-
-## Your Capabilities:
-- **Report Analysis**: Answer specific questions about market scores, competitive landscape, revenue projections
-- **Strategic Planning**: Help with business strategy, expansion planning, market entry decisions
-- **Market Intelligence**: Suggest new markets, countries, or opportunities based on the data
-- **Risk Assessment**: Identify potential challenges and mitigation strategies
-- **Competitive Analysis**: Provide insights on competitive positioning and differentiation
-- **Financial Planning**: Help with revenue projections, budget allocation, ROI analysis
-- **Geographic Expansion**: Suggest new countries, regions, or markets to consider
-- **Industry Insights**: Provide broader industry context and trends
-
-## Response Style:
-- Be conversational and engaging, like talking to a business consultant
-- Use the report data to inform your advice, but don't limit yourself to just the reports
-- Ask follow-up questions when appropriate to provide better advice
-- Provide specific, actionable recommendations
-- Think strategically about the user's broader business goals
-- Be honest about limitations and suggest additional research when needed
-
-## Examples of Questions You Can Handle:
-- "What's my market opportunity score?" (Report-specific)
-- "Any other countries you think I should consider?" (Strategic expansion)
-- "How should I position my product in this market?" (Strategic positioning)
-- "What are the biggest risks I should worry about?" (Risk assessment)
-- "Should I partner with local companies?" (Partnership strategy)
-- "How does this compare to other markets I've analyzed?" (Comparative analysis)
-
-Remember: You're not just a report reader - you're a strategic business advisor who happens to have access to detailed market analysis data. Use this data to provide comprehensive, strategic business advice."""
-
+    def summarize_conversation(self, previous_summary: str, messages: List[Dict]) -> str:
+        """Fold older messages into the rolling conversation summary; '' on failure."""
+        transcript = "\n".join(
+            f"{'User' if message.get('message_type') == 'user' else 'Assistant'}: {message.get('content', '')}"
+            for message in messages
+        )
+        try:
+            decision = model_router.route('chat_summary')
+            decision['prompt_template'] = SUMMARY_PROMPT_ID
+            response = self.client.with_priority('background').chat.completions.create(
+                route=decision,
+                model=decision['model'],
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}\n\nReturn the updated summary only."}
+                ],
+                temperature=0.2,
+                max_tokens=400
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Error summarizing conversation: {str(e)}")
+            return ''
+    
     def _generate_fallback_response(self, user_query: str, context_reports: List[Dict]) -> Dict[str, Any]:
         """Generate a fallback response when ChatGPT fails."""
         if not context_reports:
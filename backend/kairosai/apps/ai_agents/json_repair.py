@@ -0,0 +1,262 @@
+"""
+Schema-driven parsing and repair of JSON embedded in LLM output.
+
+``parse`` finds the JSON value in a response and repairs the usual damage
+without re-running the model. It handles fenced code blocks, prose before or
+after the value, nested braces, trailing commas, and output that was cut off
+mid-array. The result is then checked against a small schema:
+
+    {'type': 'array', 'items': {'type': 'object', 'fields': [...],
+                                'required': [...], 'defaults': {...}}}
+    {'type': 'object', 'fields': [...], 'required': [...], 'defaults': {...}}
+
+Array items that are missing required fields are dropped, not the whole
+array, so a truncated final item costs one entry. If nothing usable can be
+recovered, ``parse_or_reask`` sends the broken text back to a small model
+once (the 'json_repair' model route) and asks for valid JSON only. This is
+much cheaper than repeating the research run that produced the text.
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Tuple
+
+from asgiref.sync import sync_to_async
+
+from . import model_router
+
+logger = logging.getLogger(__name__)
+
+REASK_MAX_INPUT_CHARS = 24000
+REASK_MAX_TOKENS = 4000
+
+_FENCE = re.compile(r'```(?:json|JSON)?\s*\n?(.*?)(?:```|$)', re.DOTALL)
+_CLOSERS = {'[': ']', '{': '}'}
+
+# Opening brackets tried per source before giving up on local repair.
+MAX_CANDIDATES = 20
+
+# How many earlier cut points to try when the end of a truncated value is unusable.
+MAX_TRUNCATION_RETRIES = 8
+
+
+class JSONRepairError(ValueError):
+    pass
+
+
+def _scan(text: str) -> Tuple[str, List[str], List[Tuple[int, List[str]]], bool]:
+    """Walk one JSON value and drop trailing commas.
+
+    Returns the cleaned text up to the point where the outermost value
+    closes. Also returns the brackets still open at that point (empty if the
+    value closed), the positions of element separators together with the
+    brackets open at each, and whether the text ends inside a string.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, List[str]]] = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in ']}':
+            # "[1, 2,]" -> "[1, 2]"
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            if stack and stack[-1] == char:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                return ''.join(out), [], cuts, False
+            continue
+        elif char == ',' and stack:
+            cuts.append((len(out), list(stack)))
+        out.append(char)
+    return ''.join(out), stack, cuts, in_string
+
+
+def _close(fragment: str, stack: List[str]) -> str:
+    fragment = fragment.rstrip()
+    while fragment and fragment[-1] in ',:':
+        fragment = fragment[:-1].rstrip()
+    return fragment + ''.join(reversed(stack))
+
+
+def _decode_at(text: str, start: int) -> Tuple[Any, bool]:
+    """Decode the value starting at ``text[start]``, repairing it if needed.
+
+    Returns the decoded value and whether a repair was needed.
+    """
+    decoder = json.JSONDecoder()
+    try:
+        return decoder.raw_decode(text, start)[0], False
+    except json.JSONDecodeError:
+        pass
+
+    cleaned, stack, cuts, in_string = _scan(text[start:])
+    if not stack:
+        return json.loads(cleaned), True
+
+    # Truncated: close whatever is open, then back off to earlier separators
+    # until the remainder parses (a cut inside a half-written item drops that item).
+    candidates = [_close(cleaned + ('"' if in_string else ''), stack)]
+    candidates += [_close(cleaned[:position], open_) for position, open_ in reversed(cuts[-MAX_TRUNCATION_RETRIES:])]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), True
+        except json.JSONDecodeError:
+            continue
+    raise JSONRepairError('Truncated JSON could not be repaired')
+
+
+def _candidate_starts(text: str, openers: str):
+    return sorted(i for char in openers for i in _find_all(text, char))[:MAX_CANDIDATES]
+
+
+def _find_all(text: str, char: str):
+    index = text.find(char)
+    while index != -1:
+        yield index
+        index = text.find(char, index + 1)
+
+
+def _validate_object(value: Any, schema: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(value, dict):
+        raise JSONRepairError(f"Expected an object, got {type(value).__name__}")
+    missing = [field for field in schema.get('required', ()) if field not in value]
+    if missing:
+        raise JSONRepairError(f"Missing required fields: {', '.join(missing)}")
+    for field, default in schema.get('defaults', {}).items():
+        value.setdefault(field, default)
+    return value
+
+
+def validate(value: Any, schema: Dict[str, Any]) -> Any:
+    """Check ``value`` against ``schema`` and fill defaults. Invalid array items are dropped."""
+    if schema.get('type') == 'array':
+        if isinstance(value, dict):
+            # {"competitors": [...]} instead of a bare array.
+            lists = [v for v in value.values() if isinstance(v, list)]
+            if len(lists) == 1:
+                value = lists[0]
+        if not isinstance(value, list):
+            raise JSONRepairError(f"Expected an array, got {type(value).__name__}")
+        item_schema = schema.get('items')
+        if not item_schema:
+            return value
+        items = []
+        for i, item in enumerate(value):
+            try:
+                items.append(_validate_object(item, item_schema))
+            except JSONRepairError as e:
+                logger.warning(f"Dropping item {i}: {e}")
+        if value and not items:
+            raise JSONRepairError('No array items matched the schema')
+        return items
+    return _validate_object(value, schema)
+
+
+def parse(text: str, schema: Dict[str, Any]) -> Any:
+    """Extract, repair and validate the JSON value in an LLM response."""
+    text = text or ''
+    # Arrays also come back wrapped in an object ({"competitors": [...]}), which validate() unwraps.
+    openers = '{' if schema.get('type') == 'object' else '[{'
+    # Fenced blocks first (the model was asked not to use them, so one is deliberate),
+    # then the whole response.
+    sources = [match.group(1) for match in _FENCE.finditer(text)] + [text]
+    errors = []
+    for source in sources:
+        for start in _candidate_starts(source, openers):
+            try:
+                value, repaired = _decode_at(source, start)
+                value = validate(value, schema)
+            except (JSONRepairError, json.JSONDecodeError) as e:
+                errors.append(str(e))
+                continue
+            if repaired:
+                logger.info('Repaired malformed JSON in LLM response')
+            return value
+    raise JSONRepairError(errors[0] if errors else 'No JSON value found in response')
+
+
+def describe_schema(schema: Dict[str, Any]) -> str:
+    """Short plain-language description of a schema for the re-ask prompt."""
+    if schema.get('type') == 'array':
+        item = schema.get('items') or {}
+        fields = item.get('fields') or item.get('required') or []
+        return 'a JSON array of objects, each with the fields: ' + ', '.join(fields)
+    fields = schema.get('fields') or schema.get('required') or []
+    return 'a JSON object with the fields: ' + ', '.join(fields)
+
+
+REASK_SYSTEM_PROMPT = "You repair malformed JSON. Reply with JSON only."
+REASK_PROMPT_ID = model_router.prompt_id('json-repair/v1', REASK_SYSTEM_PROMPT)
+
+
+def _reask_messages(text: str, schema: Dict[str, Any], error: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": REASK_SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            f"The text below was supposed to be {describe_schema(schema)}, but it could not be parsed ({error}).\n"
+            "Return the same content as valid JSON wrapped as {\"result\": <value>}. "
+            "Keep every value that is present in the text; do not invent new entries.\n\n"
+            f"{text[:REASK_MAX_INPUT_CHARS]}"
+        )},
+    ]
+
+
+def _unwrap(content: str, schema: Dict[str, Any]) -> Any:
+    value = parse(content, {'type': 'object'})
+    return validate(value.get('result', value), schema)
+
+
+def _reask_kwargs(text: str, schema: Dict[str, Any], error: str, model: str) -> Dict[str, Any]:
+    return dict(
+        model=model,
+        messages=_reask_messages(text, schema, error),
+        response_format={"type": "json_object"},
+        temperature=0,
+        max_tokens=REASK_MAX_TOKENS,
+    )
+
+
+def parse_or_reask(text: str, schema: Dict[str, Any], client, source_route: Dict[str, Any] = None) -> Any:
+    """``parse``, falling back to one targeted re-ask through a sync OpenAI client.
+
+    ``source_route`` is the routing decision of the call that produced ``text``; it is flagged
+    as a validation failure when a re-ask is needed.
+    """
+    try:
+        return parse(text, schema)
+    except JSONRepairError as e:
+        decision = dict(model_router.route('json_repair'), prompt_template=REASK_PROMPT_ID)
+        logger.warning(f"JSON repair failed ({e}); re-asking {decision['model']}")
+        model_router.mark_validation_failed(source_route)
+        response = client.chat.completions.create(route=decision, **_reask_kwargs(text, schema, str(e), decision['model']))
+        return _unwrap(response.choices[0].message.content, schema)
+
+
+async def aparse_or_reask(text: str, schema: Dict[str, Any], client, source_route: Dict[str, Any] = None) -> Any:
+    """``parse_or_reask`` for an async OpenAI client."""
+    try:
+        return parse(text, schema)
+    except JSONRepairError as e:
+        decision = dict(model_router.route('json_repair'), prompt_template=REASK_PROMPT_ID)
+        logger.warning(f"JSON repair failed ({e}); re-asking {decision['model']}")
+        await sync_to_async(model_router.mark_validation_failed, thread_sensitive=False)(source_route)
+        response = await client.chat.completions.create(
+            route=decision, **_reask_kwargs(text, schema, str(e), decision['model']))
+        return _unwrap(response.choices[0].message.content, schema)
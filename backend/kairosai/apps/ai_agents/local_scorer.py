@@ -0,0 +1,253 @@
+"""
+Deterministic, rule-based implementation of the MarketScoringAgent rubric.
+
+Scores are derived from a small set of facts (market size, growth rate,
+competitor count, HHI, setup timeline and keyword signals) pulled out of the
+research report. Scoring a set of facts is pure arithmetic and runs in
+microseconds, so it is used for instant provisional scores, as the fallback
+when the LLM is unavailable, and to flag LLM scores that disagree sharply
+with the evidence in the report.
+"""
+import math
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .number_extractor import extract_numbers
+
+# An LLM score further than this from the rule-based score (on the 0-10 scale)
+# is reported as an outlier, but only for dimensions backed by hard numbers.
+OUTLIER_THRESHOLD = 3.0
+
+UNIT_MULTIPLIERS = {
+    'trillion': 1e12, 't': 1e12,
+    'billion': 1e9, 'bn': 1e9, 'b': 1e9,
+    'million': 1e6, 'mn': 1e6, 'm': 1e6,
+    'thousand': 1e3, 'k': 1e3,
+}
+
+# Rubric breakpoints from _load_scoring_framework, as (input, score) pairs.
+# Inputs between breakpoints are interpolated linearly.
+MARKET_SIZE_BREAKPOINTS = (  # log10(USD)
+    (6.0, 1.0), (7.0, 3.0), (math.log10(5e7), 5.0), (8.0, 7.0), (9.0, 9.0), (10.0, 10.0),
+)
+GROWTH_BREAKPOINTS = ((-5.0, 1.0), (0.0, 3.0), (3.0, 5.0), (8.0, 7.0), (15.0, 9.0), (30.0, 10.0))
+COMPETITOR_BREAKPOINTS = ((0.0, 1.0), (5.0, 4.0), (15.0, 7.0), (40.0, 10.0))
+HHI_BREAKPOINTS = ((0.0, 1.0), (1500.0, 4.0), (2500.0, 7.0), (5000.0, 10.0))
+SETUP_MONTHS_BREAKPOINTS = ((0.0, 1.0), (3.0, 3.0), (6.0, 5.0), (12.0, 7.0), (18.0, 9.0), (36.0, 10.0))
+
+# Keyword signals: each hit moves the neutral midpoint of a sub-score.
+SIGNAL_PATTERNS = {
+    'maturity_positive': r'\b(?:emerging|nascent|underserved|untapped|rapidly growing)\b',
+    'maturity_negative': r'\b(?:saturated|declining|mature market|shrinking|stagnant)\b',
+    'regulatory_positive': r'\b(?:incentives?|tax breaks?|favou?rable regulat\w*|free trade|streamlined)\b',
+    'regulatory_negative': r'\b(?:restrictive|bans?|banned|protectionis\w*|sanctions?|foreign ownership limits?)\b',
+    'economy_positive': r'\b(?:stable economy|rising (?:incomes?|consumer spending)|high purchasing power|strong economy)\b',
+    'economy_negative': r'\b(?:recession|inflation|currency (?:volatility|crisis)|unstable economy|economic downturn)\b',
+    'competition_pressure': r'\b(?:price wars?|intense competition|highly competitive|dominant players?|oligopoly|monopoly)\b',
+    'complexity': r'\b(?:licen[cs](?:e|es|ing)|permits?|certifications?|compliance|customs|tariffs?|'
+                  r'language barriers?|cultural (?:barriers?|adaptation|differences)|local partner|joint venture|'
+                  r'data localization)\b',
+}
+# One alternation with a named group per signal, so counting them is a single pass.
+_SIGNALS = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in SIGNAL_PATTERNS.items()), re.IGNORECASE)
+_MONEY = re.compile(r'\$?\s*([0-9][0-9,]*(?:\.[0-9]+)?)\s*(trillion|billion|million|thousand|bn|mn|[TBMK])?\b', re.IGNORECASE)
+
+
+def _interpolate(value: float, breakpoints: Sequence[Tuple[float, float]]) -> float:
+    if value <= breakpoints[0][0]:
+        return breakpoints[0][1]
+    for (x0, y0), (x1, y1) in zip(breakpoints, breakpoints[1:]):
+        if value <= x1:
+            return y0 + (y1 - y0) * (value - x0) / (x1 - x0)
+    return breakpoints[-1][1]
+
+
+def _clamp(value: float, low: float = 0.0, high: float = 10.0) -> float:
+    return max(low, min(high, value))
+
+
+def parse_money(amount: str, unit: Optional[str] = None) -> Optional[float]:
+    """Convert an amount such as ('2.3', 'billion') or '$450M' to US dollars."""
+    if unit is None:
+        match = _MONEY.search(amount or '')
+        if not match:
+            return None
+        amount, unit = match.group(1), match.group(2)
+    try:
+        value = float(str(amount).replace(',', ''))
+    except ValueError:
+        return None
+    return value * UNIT_MULTIPLIERS.get((unit or '').lower(), 1.0)
+
+
+def parse_money_range(text: str) -> Optional[Tuple[float, float]]:
+    """Parse '$420K-$1.2M' (or a single '$2M') into a (low, high) pair in US dollars."""
+    amounts = [(m.group(1), m.group(2) or '') for m in _MONEY.finditer(text or '')][:2]
+    if not amounts:
+        return None
+    if len(amounts) == 2 and not amounts[0][1]:
+        # "$1-3M": the unit on the upper bound applies to the lower bound too.
+        amounts[0] = (amounts[0][0], amounts[1][1])
+    values = [v for v in (parse_money(amount, unit) for amount, unit in amounts) if v is not None]
+    if not values:
+        return None
+    return min(values), max(values)
+
+
+def format_money(value: float) -> str:
+    """Format dollars the way the scoring prompt does: $420K, $1.2M, $2.3B."""
+    for threshold, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if abs(value) >= threshold:
+            return f"${value / threshold:.3g}{suffix}"
+    return f"${value:.0f}"
+
+
+def format_money_range(low: float, high: float) -> str:
+    return f"{format_money(low)}-{format_money(high)}"
+
+
+def _median(values: Sequence[float]) -> float:
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def facts_from_text(text: str, extracted_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Collect the facts the rubric needs from a report and its number_extractor summary."""
+    text = text or ''
+    if extracted_data is None:
+        extracted_data = extract_numbers(text)
+    facts: Dict[str, Any] = {}
+
+    sizes = extracted_data.get('market_size_usd')
+    if sizes:
+        # The largest figure is normally the TAM; smaller ones are SAM/SOM or segments.
+        facts['market_size_usd'] = max(sizes)
+
+    growth = [g for g in extracted_data.get('growth_rates_pct', []) if -50.0 <= g <= 200.0]
+    if growth:
+        facts['growth_rate_pct'] = _median(growth)
+
+    competitors = [c for c in extracted_data.get('competitor_counts', []) if 0 < c < 1000]
+    if competitors:
+        facts['competitor_count'] = max(competitors)
+
+    if extracted_data.get('hhi'):
+        facts['hhi'] = extracted_data['hhi'][0]
+
+    months = [m for m in extracted_data.get('setup_months', []) if 0 < m <= 60]
+    if months:
+        facts['setup_months'] = max(months)
+
+    signals = dict.fromkeys(SIGNAL_PATTERNS, 0)
+    for match in _SIGNALS.finditer(text):
+        signals[match.lastgroup] += 1
+    facts['signals'] = signals
+    return facts
+
+
+def _signal_score(signals: Dict[str, int], positive: str, negative: str, step: float = 1.0) -> float:
+    """Neutral 5.0 nudged by the balance of positive and negative keyword hits."""
+    balance = signals.get(positive, 0) - signals.get(negative, 0)
+    return _clamp(5.0 + step * max(-4, min(4, balance)), 1.0, 9.0)
+
+
+def score_facts(facts: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply the rubric to a facts dict. Returns the three scores plus rationale."""
+    signals = facts.get('signals', {})
+    evidence = []
+
+    size = facts.get('market_size_usd')
+    size_score = _interpolate(math.log10(size), MARKET_SIZE_BREAKPOINTS) if size else 5.0
+    growth = facts.get('growth_rate_pct')
+    growth_score = _interpolate(growth, GROWTH_BREAKPOINTS) if growth is not None else 5.0
+    opportunity = (
+        size_score * 0.30
+        + growth_score * 0.25
+        + _signal_score(signals, 'economy_positive', 'economy_negative') * 0.20
+        + _signal_score(signals, 'maturity_positive', 'maturity_negative') * 0.15
+        + _signal_score(signals, 'regulatory_positive', 'regulatory_negative') * 0.10
+    )
+    opportunity_reasons = []
+    if size:
+        opportunity_reasons.append(f"market size ~${size / 1e6:,.0f}M")
+    if growth is not None:
+        opportunity_reasons.append(f"growth ~{growth:g}%")
+    if opportunity_reasons:
+        evidence.append('market_opportunity_score')
+
+    competitor_count = facts.get('competitor_count')
+    hhi = facts.get('hhi')
+    intensity_parts = []
+    if competitor_count is not None:
+        intensity_parts.append(_interpolate(competitor_count, COMPETITOR_BREAKPOINTS))
+    if hhi is not None:
+        intensity_parts.append(_interpolate(hhi, HHI_BREAKPOINTS))
+    intensity = sum(intensity_parts) / len(intensity_parts) if intensity_parts else 5.0
+    intensity = _clamp(intensity + 0.5 * min(3, signals.get('competition_pressure', 0)), 1.0, 10.0)
+    intensity_reasons = []
+    if competitor_count is not None:
+        intensity_reasons.append(f"{competitor_count} competitors")
+    if hhi is not None:
+        intensity_reasons.append(f"HHI {hhi:,.0f}")
+    if intensity_parts:
+        evidence.append('competitive_intensity_score')
+
+    setup_months = facts.get('setup_months')
+    complexity_hits = signals.get('complexity', 0)
+    if setup_months is not None:
+        complexity = _interpolate(setup_months, SETUP_MONTHS_BREAKPOINTS)
+        complexity += 0.25 * min(4, complexity_hits)
+        evidence.append('entry_complexity_score')
+    elif complexity_hits:
+        # No timeline: regulatory/cultural/distribution mentions stand in for it.
+        complexity = 3.0 + 0.5 * min(8, complexity_hits)
+    else:
+        complexity = 5.0
+    complexity = _clamp(complexity, 1.0, 10.0)
+    complexity_reasons = []
+    if setup_months is not None:
+        complexity_reasons.append(f"~{setup_months:g} month setup")
+    if complexity_hits:
+        complexity_reasons.append(f"{complexity_hits} regulatory/cultural/distribution signals")
+
+    if intensity <= 3.9:
+        intensity_label = 'Low'
+    elif intensity <= 6.9:
+        intensity_label = 'Medium'
+    else:
+        intensity_label = 'High'
+
+    def rationale(reasons):
+        return 'Rule-based estimate from ' + ', '.join(reasons) + '.' if reasons else 'Rule-based estimate; no supporting figures found in the report.'
+
+    return {
+        'market_opportunity_score': round(_clamp(opportunity), 1),
+        'market_opportunity_rationale': rationale(opportunity_reasons),
+        'competitive_intensity': intensity_label,
+        'competitive_intensity_score': round(intensity, 1),
+        'competitive_intensity_rationale': rationale(intensity_reasons),
+        'entry_complexity_score': round(complexity, 1),
+        'entry_complexity_rationale': rationale(complexity_reasons),
+        'confidence_level': 'Medium' if len(evidence) >= 2 else 'Low',
+        'evidence': evidence,
+    }
+
+
+def score_text(text: str, extracted_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Rule-based scores for a report; pass ``extracted_data`` to reuse an existing extraction."""
+    return score_facts(facts_from_text(text, extracted_data))
+
+
+def find_outliers(llm_scores: Dict[str, Any], local_scores: Dict[str, Any],
+                  threshold: float = OUTLIER_THRESHOLD) -> Dict[str, Dict[str, float]]:
+    """LLM scores that disagree with evidence-backed local scores by more than ``threshold``."""
+    outliers = {}
+    for field in local_scores.get('evidence', []):
+        try:
+            llm_value = float(llm_scores.get(field))
+        except (TypeError, ValueError):
+            continue
+        local_value = local_scores[field]
+        if abs(llm_value - local_value) > threshold:
+            outliers[field] = {'llm': llm_value, 'local': local_value}
+    return outliers
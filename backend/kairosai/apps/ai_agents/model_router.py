@@ -0,0 +1,235 @@
+"""
+Model routing per task and cycles tier, with A/B experiments.
+
+Every model call names its task, and ``route`` picks the model:
+
+    route('scoring', cycles='20')
+    -> {'task': 'scoring', 'tier': 'deep', 'model': 'gpt-4o', 'roles': None, 'variant': 'control'}
+
+Research tasks drive deep_researcher. For them, ``roles`` holds its
+reasoning/main/fast models and ``model`` is the main one. Defaults are in
+ROUTES. LLM_ROUTES overrides any task/tier, and LLM_ROUTE_EXPERIMENTS sends
+a share of a task's calls to another model:
+
+    LLM_ROUTE_EXPERIMENTS = {'scoring': {'model': 'gpt-4o-mini', 'share': 0.2}}
+
+For a research task, an override or experiment may name all three roles
+or a single model, which replaces the main role. A malformed override
+raises ValueError when the route is built, not later inside the agent.
+
+The route travels with the call. The rate-limited client pops ``route=``
+from the create() kwargs and stores one LLMCall row per call, holding
+latency, token usage (including prompt tokens served from the provider's
+prompt cache), cost and outcome. Call sites tag their decision with a
+``prompt_template`` id from ``prompt_id``. Research runs are recorded the
+same way through ``record``. ``mark_validation_failed`` flags calls whose
+output needed a JSON re-ask. ``routing_report`` aggregates the rows per
+task, model and variant, so experiment variants can be compared on
+latency, cost and validation-failure rate.
+"""
+import hashlib
+import logging
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CYCLE_TIERS = {'3': 'quick', '5': 'quick', '7': 'standard', '10': 'standard', '20': 'deep'}
+
+ROLES = ('reasoning', 'main', 'fast')
+_RESEARCH = {'reasoning': 'o3-mini', 'main': 'gpt-4o', 'fast': 'gpt-4o-mini'}
+
+# task -> tier -> model (or deep_researcher roles); 'default' covers tiers not listed
+ROUTES = {
+    'market_research': {'default': _RESEARCH, 'deep': {**_RESEARCH, 'fast': 'gpt-4o'}},
+    # Competitor and segment lists are short JSON outputs; the fast model writes them as well.
+    'competitor_listing': {'default': {**_RESEARCH, 'main': 'gpt-4o-mini'}, 'deep': _RESEARCH},
+    'scoring': {'default': 'gpt-4o'},
+    'json_repair': {'default': 'gpt-4o-mini'},
+    'financial_narrative': {'default': 'gpt-4o-mini'},
+    'chat': {'default': 'gpt-4o'},
+    'chat_followup': {'default': 'gpt-4o-mini'},
+    'chat_summary': {'default': 'gpt-4o-mini'},
+}
+
+# USD per million tokens (prompt, completion); cached prompt tokens are billed at half price
+CACHED_PROMPT_DISCOUNT = 0.5
+PRICES = {
+    'gpt-4': (30.0, 60.0),
+    'gpt-4o': (2.5, 10.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'o3-mini': (1.1, 4.4),
+    'text-embedding-3-small': (0.02, 0.0),
+}
+
+# Share of inserts that also prune rows older than LLM_CALL_RETENTION_DAYS
+PRUNE_PROBABILITY = 0.01
+
+
+def tier_for(cycles: Any = None) -> str:
+    return CYCLE_TIERS.get(str(cycles), 'default') if cycles is not None else 'default'
+
+
+def _choice(task: str, tier: str):
+    routes = {**ROUTES.get(task, {}), **getattr(settings, 'LLM_ROUTES', {}).get(task, {})}
+    if not routes:
+        raise KeyError(f"No model route for task {task!r}")
+    return routes.get(tier, routes['default'])
+
+
+def _resolve(task: str, choice: Any, roles: Optional[Dict[str, str]]):
+    """``choice`` checked as a model name, or as deep_researcher roles when ``roles`` are the task's defaults."""
+    if isinstance(choice, str) and choice:
+        return {**roles, 'main': choice} if roles else choice
+    if roles and isinstance(choice, dict) and set(choice) == set(ROLES) \
+            and all(isinstance(model, str) and model for model in choice.values()):
+        return choice
+    expected = f"a model name or a {{{', '.join(ROLES)}}} dict" if roles else 'a model name'
+    raise ValueError(f"Route for {task!r} must be {expected}, got {choice!r}")
+
+
+def route(task: str, cycles: Any = None) -> Dict[str, Any]:
+    """Routing decision for one call of ``task``."""
+    tier = tier_for(cycles)
+    builtin = ROUTES.get(task, {})
+    builtin = builtin.get(tier, builtin.get('default'))
+    # A research task's own roles are what a single-model override is folded into
+    choice = _resolve(task, _choice(task, tier), builtin if isinstance(builtin, dict) else None)
+    variant = 'control'
+    experiment = getattr(settings, 'LLM_ROUTE_EXPERIMENTS', {}).get(task)
+    if experiment:
+        share = experiment.get('share', 0.5) if isinstance(experiment, dict) else None
+        if not isinstance(share, (int, float)) or not 0 <= share <= 1:
+            raise ValueError(f"Experiment for {task!r} needs a 'model' and a 'share' between 0 and 1, got {experiment!r}")
+        alternative = _resolve(task, experiment.get('model'), choice if isinstance(choice, dict) else None)
+        if random.random() < share:
+            choice, variant = alternative, 'experiment'
+    roles = choice if isinstance(choice, dict) else None
+    return {'task': task, 'tier': tier, 'model': roles['main'] if roles else choice, 'roles': roles, 'variant': variant}
+
+
+def prompt_id(version: str, prefix: str) -> str:
+    """Template id for a call site, e.g. 'scoring/v2#1f2e3d4c'.
+
+    The hash covers the static prefix, so an edit that forgets to bump the
+    version still shows up as a separate template in the cache report.
+    """
+    return f"{version}#{hashlib.sha256(prefix.encode()).hexdigest()[:8]}"
+
+
+def cost_usd(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int],
+             cached_tokens: Optional[int] = None) -> Optional[float]:
+    if prompt_tokens is None or model not in PRICES:
+        return None
+    prompt_price, completion_price = PRICES[model]
+    cached = cached_tokens or 0
+    prompt_cost = (prompt_tokens - cached) * prompt_price + cached * prompt_price * CACHED_PROMPT_DISCOUNT
+    return (prompt_cost + (completion_tokens or 0) * completion_price) / 1_000_000
+
+
+def _usage(response) -> Dict[str, Optional[int]]:
+    usage = getattr(response, 'usage', None)
+    prompt, completion = getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None)
+    cached = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None)
+    return {
+        'prompt_tokens': prompt if isinstance(prompt, int) else None,
+        'completion_tokens': completion if isinstance(completion, int) else None,
+        'cached_tokens': cached if isinstance(cached, int) else None,
+    }
+
+
+def save_call(decision: Dict[str, Any], latency: float, succeeded: bool, response=None) -> None:
+    """Store an LLMCall row for a routed call; the row id is kept on the decision for later flags."""
+    from apps.analysis.models import LLMCall
+
+    usage = _usage(response)
+    try:
+        call = LLMCall.objects.create(
+            task=decision['task'], tier=decision['tier'], model=decision['model'], variant=decision['variant'],
+            prompt_template=decision.get('prompt_template', ''),
+            latency_ms=int(latency * 1000), succeeded=succeeded,
+            cost_usd=cost_usd(decision['model'], usage['prompt_tokens'], usage['completion_tokens'], usage['cached_tokens']),
+            **usage,
+        )
+        decision['call_id'] = call.id
+        if random.random() < PRUNE_PROBABILITY:
+            LLMCall.objects.filter(
+                created_at__lt=timezone.now() - timedelta(days=settings.LLM_CALL_RETENTION_DAYS)).delete()
+    except Exception as e:
+        # Bookkeeping must never fail the call itself
+        logger.warning(f"Could not record {decision['task']} call: {e}")
+
+
+@contextmanager
+def record(decision: Dict[str, Any]):
+    """Time a block that makes the routed call(s), e.g. a research run, and store the outcome."""
+    started = time.monotonic()
+    try:
+        yield decision
+    except Exception:
+        save_call(decision, time.monotonic() - started, succeeded=False)
+        raise
+    save_call(decision, time.monotonic() - started, succeeded=True)
+
+
+def mark_validation_failed(decision: Optional[Dict[str, Any]]) -> None:
+    from apps.analysis.models import LLMCall
+
+    if decision and decision.get('call_id'):
+        try:
+            LLMCall.objects.filter(pk=decision['call_id']).update(validation_failed=True)
+        except Exception as e:
+            logger.warning(f"Could not flag {decision['task']} call: {e}")
+
+
+def routing_report(hours: int = 24) -> List[Dict[str, Any]]:
+    """Latency, cost and failure rates per task, tier, model and variant over the last ``hours``."""
+    from apps.analysis.models import LLMCall
+
+    rows = (
+        LLMCall.objects.filter(created_at__gte=timezone.now() - timedelta(hours=hours))
+        .values('task', 'tier', 'model', 'variant')
+        .annotate(
+            calls=Count('id'),
+            failures=Count('id', filter=Q(succeeded=False)),
+            validation_failures=Count('id', filter=Q(validation_failed=True)),
+            mean_latency_ms=Avg('latency_ms'),
+            max_latency_ms=Max('latency_ms'),
+            total_cost_usd=Sum('cost_usd'),
+        )
+        .order_by('task', 'tier', 'variant', 'model')
+    )
+    report = []
+    for row in rows:
+        row['failure_rate'] = row['failures'] / row['calls']
+        row['validation_failure_rate'] = row['validation_failures'] / row['calls']
+        row['mean_cost_usd'] = row['total_cost_usd'] / row['calls'] if row['total_cost_usd'] is not None else None
+        report.append(row)
+    return report
+
+
+def prompt_cache_report(hours: int = 24) -> List[Dict[str, Any]]:
+    """Share of prompt tokens served from the provider's prompt cache, per prompt template."""
+    from apps.analysis.models import LLMCall
+
+    rows = (
+        LLMCall.objects.filter(created_at__gte=timezone.now() - timedelta(hours=hours), prompt_tokens__isnull=False)
+        .exclude(prompt_template='')
+        .values('prompt_template', 'model')
+        .annotate(calls=Count('id'), prompt_tokens=Sum('prompt_tokens'), cached_tokens=Sum('cached_tokens'),
+                  mean_latency_ms=Avg('latency_ms'))
+        .order_by('prompt_template', 'model')
+    )
+    report = []
+    for row in rows:
+        row['cached_tokens'] = row['cached_tokens'] or 0
+        row['cached_ratio'] = row['cached_tokens'] / row['prompt_tokens'] if row['prompt_tokens'] else 0.0
+        report.append(row)
+    return report
@@ -0,0 +1,241 @@
+"""
+Single-pass extraction of typed quantitative facts from research reports.
+
+One compiled pattern walks the text once, matching money amounts,
+percentages, counted nouns ("8 competitors", "9 months"), HHI figures and
+sentence boundaries. Values are buffered per sentence and labelled from the
+keywords nearest to them in that sentence when the sentence closes, so no
+pattern ever scans across the whole report or backtracks over it.
+
+Each value is a dict:
+
+    {'kind': 'money' | 'percent' | 'count' | 'index',
+     'value': float,          # USD, percentage points, count or index value
+     'unit': str,             # 'USD', '%', 'months', 'competitors', 'HHI', ...
+     'label': str | None,     # 'market_size', 'growth', 'competitors', ...
+     'sentence': int,         # index of the sentence it came from
+     'context': str}          # that sentence, trimmed
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+MONEY_MULTIPLIERS = {
+    'trillion': 1e12, 't': 1e12,
+    'billion': 1e9, 'bn': 1e9, 'b': 1e9,
+    'million': 1e6, 'mn': 1e6, 'm': 1e6,
+    'thousand': 1e3, 'k': 1e3,
+}
+
+COUNT_NOUNS = {
+    'competitor': 'competitors', 'company': 'competitors', 'companie': 'competitors', 'player': 'competitors',
+    'brand': 'competitors', 'firm': 'competitors', 'vendor': 'competitors',
+    'month': 'months', 'year': 'years',
+    'location': 'locations', 'store': 'locations', 'outlet': 'locations', 'branch': 'locations', 'branche': 'locations',
+    'customer': 'customers', 'client': 'customers',
+}
+
+_TOKEN = re.compile(
+    # Every token starts with one of these characters; checking that first lets the
+    # engine skip ordinary prose without trying each alternative at every position.
+    r'(?=[$U\d+\-−.!?\nHh])(?:'
+    r'(?P<money>(?:US\$|\$|USD\s?)\s?(?P<amount>\d[\d,]*(?:\.\d+)?)(?:\s?[-–]\s?(?P<amount2>\d[\d,]*(?:\.\d+)?))?'
+    r'(?:\s?(?P<mult>(?i:trillion|billion|million|thousand|bn|mn)|[TBMKtbmk])\b)?)'
+    r'|(?P<percent>(?P<pct>[-+−]?\d+(?:\.\d+)?)(?:\s?[-–]\s?(?P<pct2>\d+(?:\.\d+)?))?\s?(?:%|(?i:percent)\b))'
+    r'|(?P<count>\b(?P<n>\d{1,4})(?:\s?[-–]\s?(?P<n2>\d{1,4}))?\s+'
+    r'(?:(?i:major|key|main|leading|local|international|global|direct|established|active)\s+)?'
+    r'(?P<noun>(?i:competitor|compan(?:y|ie)|player|brand|firm|vendor|month|year|location|store|outlet|branch(?:e)?|customer|client))s?\b)'
+    r'|(?P<hhi>\b(?i:HHI|Herfindahl)\b[^0-9\n]{0,30}(?P<hhi_value>\d[\d,]{2,5}))'
+    r'|(?P<eos>[.!?](?=\s|$)|\n\s*\n|\n[#*-])'
+    r')'
+)
+
+# Context keywords, one named group per (kind, label): m_ for money, p_ for
+# percentages, d_ for durations. Matched against single lowercased words; stems
+# without a trailing $ also match longer words ("licensing"), so words with
+# unrelated derivatives ("marketing", "marketplace", "shareholders") are anchored.
+_KEYWORD = re.compile(
+    r'(?P<m_market_size>markets?$|tam$|sam$|industry$|industries$|valued$|worth$|size[sd]?$)'
+    r'|(?P<m_revenue>revenue|sales$|turnover$|arr$)'
+    r'|(?P<m_funding>funding$|raise|investment|capital$)'
+    r'|(?P<m_cost>cost|budget|capex$|fee)'
+    r'|(?P<p_growth>cagr|growth|growing$|grow|yoy$|increas|expan)'
+    r'|(?P<p_market_share>shares?$)'
+    r'|(?P<p_margin>margins?$)'
+    r'|(?P<p_penetration>penetration$|adoption$)'
+    r'|(?P<d_setup_months>setup$|set-up$|licen[cs]|approval|registration$|permit|launch|entry$|establish|obtain|incorporat)'
+)
+_KIND_PREFIX = {'money': 'm_', 'percent': 'p_', 'months': 'd_'}
+
+# Words of the sentence before/after a value searched for its label.
+CONTEXT_WORDS_BEFORE = 10
+CONTEXT_WORDS_AFTER = 5
+MAX_CONTEXT_CHARS = 240
+
+
+# Word -> keyword group memo. Reports reuse a small vocabulary, so lookups
+# nearly always hit; the size cap only guards against pathological input.
+_word_groups: Dict[str, Optional[str]] = {}
+MAX_MEMO_WORDS = 20000
+
+
+def _keyword_group(word: str) -> Optional[str]:
+    match = _KEYWORD.match(word.lower().strip('()[],;:"\'*.!?'))
+    group = match.lastgroup if match else None
+    if len(_word_groups) < MAX_MEMO_WORDS:
+        _word_groups[word] = group
+    return group
+
+
+def _label(kind_key: str, before: str, after: str):
+    """Label for a value from the nearest keyword of its kind in the sentence text around it."""
+    prefix = _KIND_PREFIX[kind_key]
+    # maxsplit keeps long sentences from being split in full for every value
+    before = before.rsplit(None, CONTEXT_WORDS_BEFORE)
+    after = after.split(None, CONTEXT_WORDS_AFTER)
+    n_before = min(len(before), CONTEXT_WORDS_BEFORE)
+    n_after = min(len(after), CONTEXT_WORDS_AFTER)
+    groups = _word_groups
+    for distance in range(max(n_before, n_after)):
+        if distance < n_before:
+            word = before[-1 - distance]
+            group = groups[word] if word in groups else _keyword_group(word)
+            if group and group.startswith(prefix):
+                return group[2:]
+        if distance < n_after:
+            word = after[distance]
+            group = groups[word] if word in groups else _keyword_group(word)
+            if group and group.startswith(prefix):
+                return group[2:]
+    return None
+
+
+def _close_sentence(text: str, start: int, end: int, index: int, pending: List[tuple], records: List[tuple]):
+    for kind, value, unit, label, token_start, token_end in pending:
+        if label is None:
+            label = _label('months' if unit == 'months' else kind, text[start:token_start], text[token_end:end])
+            if unit == 'months' and label is None:
+                label = 'duration_months'
+        records.append((kind, value, unit, label, index, start, end))
+
+
+def _context(text: str, start: int, end: int) -> str:
+    return ' '.join(text[start:end].split())[:MAX_CONTEXT_CHARS]
+
+
+def _scan(text: str) -> List[tuple]:
+    """(kind, value, unit, label, sentence index, sentence start, sentence end) for every value in ``text``.
+
+    Contexts are left to the callers: extract_numbers only needs them for the
+    facts it keeps, which on figure-dense reports is a small fraction of the values.
+    """
+    records: List[tuple] = []
+    pending: List[tuple] = []
+    sentence_start, sentence_index = 0, 0
+    text = text or ''
+
+    for match in _TOKEN.finditer(text):
+        group = match.lastgroup
+        if group == 'eos':
+            if pending:
+                _close_sentence(text, sentence_start, match.end(), sentence_index, pending, records)
+                pending = []
+            sentence_start = match.end()
+            sentence_index += 1
+        elif group == 'money':
+            # A range ("$1-3 billion") is summarized by its midpoint.
+            amount, amount2, mult = match.group('amount', 'amount2', 'mult')
+            amount = float(amount.replace(',', '').rstrip('.') or 0)
+            if amount2:
+                amount = (amount + float(amount2.replace(',', '').rstrip('.') or 0)) / 2
+            multiplier = MONEY_MULTIPLIERS.get(mult.lower(), 1.0) if mult else 1.0
+            pending.append(('money', amount * multiplier, 'USD', None) + match.span())
+        elif group == 'percent':
+            pct, pct2 = match.group('pct', 'pct2')
+            value = float(pct.replace('−', '-'))
+            if pct2:
+                value = (value + float(pct2)) / 2
+            pending.append(('percent', value, '%', None) + match.span())
+        elif group == 'count':
+            unit = COUNT_NOUNS[match.group('noun').lower()]
+            # For a range ("6-9 months") keep the upper bound, as the rubric is conservative.
+            value = float(match.group('n2') or match.group('n'))
+            if unit == 'years':
+                unit, value = 'months', value * 12
+            label = unit if unit in ('competitors', 'locations', 'customers') else None
+            pending.append(('count', value, unit, label) + match.span())
+        elif group == 'hhi':
+            value = float(match.group('hhi_value').replace(',', ''))
+            pending.append(('index', value, 'HHI', 'hhi') + match.span())
+
+    if pending:
+        _close_sentence(text, sentence_start, len(text), sentence_index, pending, records)
+    return records
+
+
+def extract_values(text: str) -> List[Dict[str, Any]]:
+    """Every money amount, percentage, counted noun and HHI figure in ``text``, in order."""
+    values: List[Dict[str, Any]] = []
+    contexts: Dict[int, str] = {}
+    for kind, value, unit, label, index, start, end in _scan(text):
+        if index not in contexts:
+            contexts[index] = _context(text, start, end)
+        values.append({
+            'kind': kind, 'value': value, 'unit': unit, 'label': label,
+            'sentence': index, 'context': contexts[index],
+        })
+    return values
+
+
+def _summary(by_label: Dict[str, List[float]], percentages: List[float]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {}
+    if by_label.get('market_size'):
+        summary['market_size_usd'] = sorted(by_label['market_size'], reverse=True)[:3]
+    if by_label.get('growth'):
+        summary['growth_rates_pct'] = by_label['growth'][:5]
+    if percentages:
+        summary['percentage_mentions'] = percentages[:5]
+    if by_label.get('competitors'):
+        summary['competitor_counts'] = [int(v) for v in by_label['competitors'][:3]]
+    if by_label.get('hhi'):
+        summary['hhi'] = by_label['hhi'][:1]
+    if by_label.get('setup_months'):
+        summary['setup_months'] = by_label['setup_months'][:3]
+    return summary
+
+
+def summarize_values(values: List[Dict[str, Any]], max_facts: int = 25) -> Dict[str, Any]:
+    """Group typed values by label into the compact summary the scoring prompt and local scorer use."""
+    by_label: Dict[str, List[float]] = {}
+    percentages = []
+    for item in values:
+        if item['kind'] == 'percent':
+            percentages.append(item['value'])
+        if item['label']:
+            by_label.setdefault(item['label'], []).append(item['value'])
+
+    summary = _summary(by_label, percentages)
+    # Labelled values with their sentence give the LLM the evidence, not just the numbers.
+    summary['facts'] = [
+        {'label': item['label'], 'value': item['value'], 'unit': item['unit'], 'context': item['context']}
+        for item in values if item['label']
+    ][:max_facts]
+    return summary
+
+
+def extract_numbers(text: str, max_facts: int = 25) -> Dict[str, Any]:
+    """summarize_values(extract_values(text)), building contexts only for the facts kept."""
+    text = text or ''
+    by_label: Dict[str, List[float]] = {}
+    percentages = []
+    facts = []
+    for kind, value, unit, label, index, start, end in _scan(text):
+        if kind == 'percent':
+            percentages.append(value)
+        if label:
+            by_label.setdefault(label, []).append(value)
+            if len(facts) < max_facts:
+                facts.append({'label': label, 'value': value, 'unit': unit, 'context': _context(text, start, end)})
+
+    summary = _summary(by_label, percentages)
+    summary['facts'] = facts
+    return summary
@@ -0,0 +1,374 @@
+"""
+Token-bucket rate limiting for OpenAI calls, shared across worker processes.
+
+Each model with limits in settings.LLM_RATE_LIMITS has two buckets. One
+holds requests per minute and the other tokens per minute. Both refill
+continuously and each holds one minute's worth. The right limits depend
+on the account's OpenAI usage tier, so none are assumed: a model without
+configured limits is observe-only, and its calls are counted but never
+held or timed out. Bucket state lives in the LLMRateLimitBucket table, so
+every gunicorn worker and replica draws from the same budget. Tests and
+local runs can swap in LocalBucketStore instead. Wait counters are kept
+per process; ``metrics`` says so next to the shared bucket levels.
+
+Callers wait until both buckets can cover the request. Priority classes
+decide how much headroom a call must leave behind:
+
+    interactive  chat answers; may drain the bucket
+    standard     analysis scoring and JSON re-asks; leaves 10%
+    background   summaries and narratives; leaves 30%
+
+So when capacity is scarce, interactive calls go first, without needing a
+shared queue. A token estimate is taken up front and corrected with the
+reported usage once the call returns.
+
+Agents get a limited client from ``RateLimitedClient`` or
+``AsyncRateLimitedClient``. These clients also apply the retries, hedging
+and circuit breaker in resilience.py, and each retry takes from the
+buckets again. The wait comes before the call is timed for hedging. A
+call that had to wait is not hedged, and a hedge duplicate goes out only
+if the buckets can cover it at once. A RateLimitTimeout never counts
+against the circuit breaker. The deep_researcher library makes its own
+model calls and is outside this limiter. A ``route=`` decision from
+model_router, passed to create(), is taken out of the request and the
+call is recorded against it.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from . import model_router, resilience
+
+logger = logging.getLogger(__name__)
+
+# Fraction of each bucket a priority class must leave untouched.
+PRIORITY_RESERVE = {'interactive': 0.0, 'standard': 0.1, 'background': 0.3}
+
+CHARS_PER_TOKEN = 4
+DEFAULT_COMPLETION_TOKENS = 1000
+# Longest single sleep, so waiters re-check soon after other processes reconcile usage.
+MAX_POLL_SECONDS = 2.0
+# Waits longer than this are logged.
+SLOW_WAIT_SECONDS = 1.0
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+def limits_for(model: str) -> Optional[Dict[str, float]]:
+    """Configured {'rpm', 'tpm'} for ``model``, or None if its calls are only observed."""
+    return (getattr(settings, 'LLM_RATE_LIMITS', {}) or {}).get(model)
+
+
+def _take(state: Dict[str, float], limits: Dict[str, float], tokens: float, reserve: float, now: float) -> float:
+    """Refill ``state`` to ``now`` and take one request and ``tokens`` from it.
+
+    Returns 0 on success, otherwise the seconds until the buckets could cover it.
+    """
+    rpm, tpm = limits['rpm'], limits['tpm']
+    elapsed = max(0.0, now - state['refilled_at'])
+    state['requests'] = min(rpm, state['requests'] + elapsed * rpm / 60)
+    state['tokens'] = min(tpm, state['tokens'] + elapsed * tpm / 60)
+    state['refilled_at'] = now
+
+    # A request larger than the reservable bucket waits for a full one rather than forever.
+    need_requests = 1 + reserve * rpm
+    need_tokens = min(tokens, tpm * (1 - reserve)) + reserve * tpm
+    if state['requests'] >= need_requests and state['tokens'] >= need_tokens:
+        state['requests'] -= 1
+        state['tokens'] -= tokens
+        return 0.0
+    return max(
+        (need_requests - state['requests']) * 60 / rpm,
+        (need_tokens - state['tokens']) * 60 / tpm,
+        0.01,
+    )
+
+
+def _full(limits: Dict[str, float], now: float) -> Dict[str, float]:
+    return {'requests': float(limits['rpm']), 'tokens': float(limits['tpm']), 'refilled_at': now}
+
+
+class LocalBucketStore:
+    """In-process bucket store, for tests and single-process development."""
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, model: str, limits: Dict[str, float], tokens: float, reserve: float) -> float:
+        now = time.time()
+        with self._lock:
+            state = self._states.setdefault(model, _full(limits, now))
+            return _take(state, limits, tokens, reserve, now)
+
+    def adjust(self, model: str, limits: Dict[str, float], tokens: float) -> None:
+        with self._lock:
+            if model in self._states:
+                state = self._states[model]
+                state['tokens'] = min(limits['tpm'], state['tokens'] + tokens)
+
+    def levels(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {model: dict(state) for model, state in self._states.items()}
+
+
+class DatabaseBucketStore:
+    """Bucket store on the LLMRateLimitBucket table; rows are locked for each take."""
+
+    def _locked(self, model: str, limits: Dict[str, float], now: float):
+        from apps.analysis.models import LLMRateLimitBucket
+        bucket = LLMRateLimitBucket.objects.select_for_update().filter(model=model).first()
+        if bucket is None:
+            bucket, _ = LLMRateLimitBucket.objects.get_or_create(model=model, defaults=_full(limits, now))
+        return bucket
+
+    def try_acquire(self, model: str, limits: Dict[str, float], tokens: float, reserve: float) -> float:
+        now = time.time()
+        with transaction.atomic():
+            bucket = self._locked(model, limits, now)
+            state = {'requests': bucket.requests, 'tokens': bucket.tokens, 'refilled_at': bucket.refilled_at}
+            wait = _take(state, limits, tokens, reserve, now)
+            type(bucket).objects.filter(pk=bucket.pk).update(**state)
+        return wait
+
+    def adjust(self, model: str, limits: Dict[str, float], tokens: float) -> None:
+        with transaction.atomic():
+            bucket = self._locked(model, limits, time.time())
+            type(bucket).objects.filter(pk=bucket.pk).update(tokens=min(limits['tpm'], bucket.tokens + tokens))
+
+    def levels(self) -> Dict[str, Dict[str, float]]:
+        from apps.analysis.models import LLMRateLimitBucket
+        return {
+            row['model']: {key: row[key] for key in ('requests', 'tokens', 'refilled_at')}
+            for row in LLMRateLimitBucket.objects.values('model', 'requests', 'tokens', 'refilled_at')
+        }
+
+
+class RateLimiter:
+    def __init__(self, store, max_wait: Optional[float] = None):
+        self.store = store
+        self.max_wait = max_wait
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._metrics_lock = threading.Lock()
+
+    def _max_wait(self) -> float:
+        return self.max_wait if self.max_wait is not None else getattr(settings, 'LLM_RATE_LIMIT_MAX_WAIT', 60)
+
+    def _record(self, model: str, priority: str, waited: float, timed_out: bool = False) -> None:
+        with self._metrics_lock:
+            stats = self._metrics.setdefault(f'{model}:{priority}', {
+                'calls': 0, 'waited_calls': 0, 'total_wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'timeouts': 0,
+            })
+            stats['calls'] += 1
+            stats['timeouts'] += int(timed_out)
+            if waited > 0:
+                stats['waited_calls'] += 1
+                stats['total_wait_seconds'] += waited
+                stats['max_wait_seconds'] = max(stats['max_wait_seconds'], waited)
+        if waited >= SLOW_WAIT_SECONDS:
+            logger.info(f"Rate limiter held a {priority} {model} call for {waited:.1f}s")
+
+    def _next_sleep(self, model, priority, wait, started):
+        waited = time.monotonic() - started
+        if waited + wait > self._max_wait():
+            self._record(model, priority, waited, timed_out=True)
+            raise RateLimitTimeout(f"{model} rate limit: would wait more than {self._max_wait():.0f}s")
+        # Jitter keeps waiters in different processes from retrying in lockstep.
+        return min(wait, MAX_POLL_SECONDS) * random.uniform(0.8, 1.2)
+
+    def acquire(self, model: str, tokens: int, priority: str = 'standard') -> float:
+        """Block until the call fits the model's limits; returns the seconds waited."""
+        limits, reserve = limits_for(model), PRIORITY_RESERVE[priority]
+        if limits is None:
+            self._record(model, priority, 0.0)
+            return 0.0
+        started, slept = time.monotonic(), False
+        while True:
+            wait = self.store.try_acquire(model, limits, tokens, reserve)
+            if not wait:
+                # Admitted on the first try: the store round trip is not a wait
+                waited = time.monotonic() - started if slept else 0.0
+                self._record(model, priority, waited)
+                return waited
+            time.sleep(self._next_sleep(model, priority, wait, started))
+            slept = True
+
+    async def acquire_async(self, model: str, tokens: int, priority: str = 'standard') -> float:
+        limits, reserve = limits_for(model), PRIORITY_RESERVE[priority]
+        if limits is None:
+            self._record(model, priority, 0.0)
+            return 0.0
+        started, slept = time.monotonic(), False
+        try_acquire = sync_to_async(self.store.try_acquire, thread_sensitive=False)
+        while True:
+            wait = await try_acquire(model, limits, tokens, reserve)
+            if not wait:
+                waited = time.monotonic() - started if slept else 0.0
+                self._record(model, priority, waited)
+                return waited
+            await asyncio.sleep(self._next_sleep(model, priority, wait, started))
+            slept = True
+
+    def try_acquire(self, model: str, tokens: int, priority: str = 'standard') -> bool:
+        """Take from the buckets only if the call fits now; never waits."""
+        limits = limits_for(model)
+        if limits is not None and self.store.try_acquire(model, limits, tokens, PRIORITY_RESERVE[priority]):
+            return False
+        self._record(model, priority, 0.0)
+        return True
+
+    def reconcile(self, model: str, estimated: int, actual: Optional[int]) -> None:
+        """Return over-estimated tokens to the bucket, or take the shortfall."""
+        limits = limits_for(model)
+        if limits is not None and actual is not None and actual != estimated:
+            self.store.adjust(model, limits, estimated - actual)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            waits = {key: dict(stats) for key, stats in self._metrics.items()}
+        for stats in waits.values():
+            stats['mean_wait_seconds'] = stats['total_wait_seconds'] / stats['calls'] if stats['calls'] else 0.0
+        try:
+            levels = self.store.levels()
+        except Exception as e:
+            logger.warning(f"Could not read rate limit buckets: {e}")
+            levels = {}
+        return {
+            # Wait counters belong to the worker that answered; the buckets are shared by all of them.
+            'waits': waits,
+            'waits_scope': 'process',
+            'process_id': os.getpid(),
+            'buckets': levels,
+            'limits': getattr(settings, 'LLM_RATE_LIMITS', {}) or {},
+        }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    backend = getattr(settings, 'LLM_RATE_LIMIT_BACKEND', 'database')
+    with _limiters_lock:
+        if backend not in _limiters:
+            _limiters[backend] = RateLimiter(LocalBucketStore() if backend == 'local' else DatabaseBucketStore())
+        return _limiters[backend]
+
+
+def estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    """Prompt plus completion allowance for a chat.completions or embeddings call."""
+    if 'messages' in kwargs:
+        prompt = sum(len(str(message.get('content') or '')) for message in kwargs['messages'])
+        completion = kwargs.get('max_tokens') or DEFAULT_COMPLETION_TOKENS
+    else:
+        inputs = kwargs.get('input', '')
+        prompt = sum(len(str(item)) for item in inputs) if isinstance(inputs, list) else len(str(inputs))
+        completion = 0
+    return prompt // CHARS_PER_TOKEN + completion + 1
+
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = getattr(response, 'usage', None)
+    total = getattr(usage, 'total_tokens', None)
+    return total if isinstance(total, int) else None
+
+
+class _Endpoint:
+    def __init__(self, owner, path):
+        self._owner = owner
+        self._path = path
+
+    def _target(self):
+        target = self._owner._client
+        for name in self._path:
+            target = getattr(target, name)
+        return target
+
+    def create(self, **kwargs):
+        return self._owner._call(self._target(), kwargs)
+
+
+class RateLimitedClient:
+    """Wraps an openai.OpenAI client so chat.completions.create and embeddings.create pass the limiter."""
+
+    def __init__(self, client, priority: str = 'standard'):
+        if priority not in PRIORITY_RESERVE:
+            raise ValueError(f"Unknown priority class: {priority}")
+        self._client = client
+        self.priority = priority
+        self.chat = type('Chat', (), {})()
+        self.chat.completions = _Endpoint(self, ('chat', 'completions', 'create'))
+        self.embeddings = _Endpoint(self, ('embeddings', 'create'))
+
+    def with_priority(self, priority: str):
+        return type(self)(self._client, priority)
+
+    def _call(self, create, kwargs):
+        limiter = get_limiter()
+        decision = kwargs.pop('route', None)
+        model = kwargs.get('model', '')
+        estimated = estimate_tokens(kwargs)
+
+        def attempt():
+            response = create(**kwargs)
+            limiter.reconcile(model, estimated, _usage_tokens(response))
+            return response
+
+        options = {
+            'hedge': self.priority == 'interactive',
+            'acquire': lambda: limiter.acquire(model, estimated, self.priority),
+            'try_acquire': lambda: limiter.try_acquire(model, estimated, self.priority),
+        }
+        if decision is None:
+            return resilience.call(model, attempt, **options)
+        started = time.monotonic()
+        try:
+            response = resilience.call(model, attempt, **options)
+        except Exception:
+            model_router.save_call(decision, time.monotonic() - started, succeeded=False)
+            raise
+        model_router.save_call(decision, time.monotonic() - started, succeeded=True, response=response)
+        return response
+
+
+class AsyncRateLimitedClient(RateLimitedClient):
+    """RateLimitedClient for an openai.AsyncOpenAI client; ``create`` returns a coroutine."""
+
+    async def _call(self, create, kwargs):
+        limiter = get_limiter()
+        decision = kwargs.pop('route', None)
+        model = kwargs.get('model', '')
+        estimated = estimate_tokens(kwargs)
+
+        async def attempt():
+            response = await create(**kwargs)
+            await sync_to_async(limiter.reconcile, thread_sensitive=False)(model, estimated, _usage_tokens(response))
+            return response
+
+        try_acquire = sync_to_async(limiter.try_acquire, thread_sensitive=False)
+        options = {
+            'hedge': self.priority == 'interactive',
+            'acquire': lambda: limiter.acquire_async(model, estimated, self.priority),
+            'try_acquire': lambda: try_acquire(model, estimated, self.priority),
+        }
+        if decision is None:
+            return await resilience.acall(model, attempt, **options)
+        save_call = sync_to_async(model_router.save_call, thread_sensitive=False)
+        started = time.monotonic()
+        try:
+            response = await resilience.acall(model, attempt, **options)
+        except Exception:
+            await save_call(decision, time.monotonic() - started, succeeded=False)
+            raise
+        await save_call(decision, time.monotonic() - started, succeeded=True, response=response)
+        return response
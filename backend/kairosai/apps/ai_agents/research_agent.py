@@ -2,11 +2,58 @@
 import asyncio
 import json
 import os
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import openai
+from asgiref.sync import sync_to_async
 from deep_researcher import IterativeResearcher, DeepResearcher, LLMConfig
 from django.conf import settings
 
+from . import model_router
+from .json_repair import JSONRepairError, aparse_or_reask
+from .rate_limiter import AsyncRateLimitedClient
+
+COMPETITOR_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'fields': ['name', 'description', 'market_share', 'years_in_market', 'headquarters'],
+        'required': ['name'],
+        'defaults': {'description': '', 'market_share': 'unknown', 'years_in_market': 'unknown', 'headquarters': 'unknown'},
+    },
+}
+
+ARBITRAGE_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'fields': ['segment_name', 'current_gap', 'positioning_opportunity', 'market_size',
+                   'competitive_advantage', 'implementation_strategy'],
+        'required': ['segment_name'],
+        'defaults': {'current_gap': '', 'positioning_opportunity': '', 'market_size': 'unknown',
+                     'competitive_advantage': '', 'implementation_strategy': ''},
+    },
+}
+
+PLAYBOOK_SCHEMA = {
+    'type': 'object',
+    'fields': ['title', 'summary', 'total_estimated_budget', 'timeline_months', 'phases',
+               'team_requirements', 'success_metrics', 'critical_risks'],
+    'required': ['phases'],
+    'defaults': {'team_requirements': [], 'success_metrics': [], 'critical_risks': []},
+}
+
+class ObservableIterativeResearcher(IterativeResearcher):
+    """IterativeResearcher that awaits ``on_findings(iteration, findings)`` after each round of tool calls."""
+    on_findings = None
+
+    async def _execute_tools(self, tasks: List[Any]) -> Dict[str, Any]:
+        results = await super()._execute_tools(tasks)
+        if self.on_findings is not None:
+            await self.on_findings(self.iteration, self.conversation.get_all_findings())
+        return results
+
 class CompetitorResearchAgent:
     def __init__(self, cycles='3'):
         # Set environment variables from Django settings
@@ -17,31 +64,18 @@ class CompetitorResearchAgent:
         if hasattr(settings, 'SERPER_API_KEY') and settings.SERPER_API_KEY:
             os.environ['SERPER_API_KEY'] = settings.SERPER_API_KEY
         
-        # Create a proper LLM configuration with best models (sequential execution avoids rate limits)
-        # llm_config = LLMConfig(
-        #     search_provider="serper",
-        #     reasoning_model_provider="openai",
-        #     reasoning_model="o1",  # Best reasoning model - sequential execution avoids rate limits
-        #     main_model_provider="openai",
-        #     main_model="gpt-4o",  # Best general model
-        #     fast_model_provider="openai",
-        #     fast_model="gpt-4o"  # High quality throughout
-        # )
-
-        llm_config = LLMConfig(
-            search_provider="serper",
-            reasoning_model_provider="openai",
-            reasoning_model="o3-mini",
-            main_model_provider="openai",
-            main_model="gpt-4o",
-            fast_model_provider="openai",
-            fast_model="gpt-4o-mini"
-        )
+        # Models come from the router per task and cycles tier; competitor and segment
+        # lists get their own researcher so they can run on cheaper models.
+        self.routes = {
+            'market_research': model_router.route('market_research', cycles),
+            'competitor_listing': model_router.route('competitor_listing', cycles),
+        }
+        llm_config = self._llm_config(self.routes['market_research']['roles'])
         
         # Configure iterations and time based on cycles
         cycles_config = self._get_cycles_config(cycles)
         
-        self.iterative_researcher = IterativeResearcher(
+        self.iterative_researcher = ObservableIterativeResearcher(
             max_iterations=cycles_config['max_iterations'], 
             max_time_minutes=cycles_config['max_time_minutes'],
             config=llm_config
@@ -51,6 +85,36 @@ class CompetitorResearchAgent:
             max_time_minutes=cycles_config['deep_max_time_minutes'],
             config=llm_config
         )
+        self.listing_researcher = IterativeResearcher(
+            max_iterations=cycles_config['max_iterations'],
+            max_time_minutes=cycles_config['max_time_minutes'],
+            config=self._llm_config(self.routes['competitor_listing']['roles'])
+        )
+    
+    @staticmethod
+    def _llm_config(roles: Dict[str, str]) -> LLMConfig:
+        return LLMConfig(
+            search_provider="serper",
+            reasoning_model_provider="openai",
+            reasoning_model=roles['reasoning'],
+            main_model_provider="openai",
+            main_model=roles['main'],
+            fast_model_provider="openai",
+            fast_model=roles['fast']
+        )
+    
+    async def _run(self, researcher, task: str, *args, **kwargs):
+        """Run a researcher and record the run against its route; returns (result, routing decision)."""
+        decision = dict(self.routes[task])
+        save_call = sync_to_async(model_router.save_call, thread_sensitive=False)
+        started = time.monotonic()
+        try:
+            result = await researcher.run(*args, **kwargs)
+        except Exception:
+            await save_call(decision, time.monotonic() - started, succeeded=False)
+            raise
+        await save_call(decision, time.monotonic() - started, succeeded=True)
+        return result, decision
     
     def _get_cycles_config(self, cycles):
         """Get configuration based on cycles parameter"""
@@ -291,10 +355,18 @@ CRITICAL INSTRUCTIONS:
 Return ONLY the JSON array, nothing else - no markdown, no explanations, no extra text.
 """
     
-    async def research_market(self, company: str, industry: str, target_country: str, company_info: Dict[str, Any] = None) -> str:
-        """Conduct comprehensive market research optimized for scoring."""
+    async def research_market(self, company: str, industry: str, target_country: str, company_info: Dict[str, Any] = None,
+                              on_findings=None) -> str:
+        """Conduct comprehensive market research optimized for scoring.
+
+        ``on_findings`` is awaited after every research iteration with the iteration number and all findings so far.
+        """
         query = self._build_scoring_focused_prompt(company, industry, target_country, company_info)
-        report = await self.iterative_researcher.run(query, output_length="3 pages")
+        self.iterative_researcher.on_findings = on_findings
+        try:
+            report, _ = await self._run(self.iterative_researcher, 'market_research', query, output_length="3 pages")
+        finally:
+            self.iterative_researcher.on_findings = None
         return report
     
     async def research_market_deep(self, company: str, industry: str, target_country: str, company_info: Dict[str, Any] = None) -> str:
@@ -349,7 +421,7 @@ CULTURAL AND OPERATIONAL INSIGHTS:
 
 Provide maximum detail with specific data points, company examples, and quantitative analysis to enable precise scoring and strategic decision-making. Ensure all competitor information is verified and all complexity factors are specific to {target_country}."""
         
-        report = await self.deep_researcher.run(deep_query)
+        report, _ = await self._run(self.deep_researcher, 'market_research', deep_query)
         return report
     
     async def generate_competitor_report(self, company: str, industry: str, target_country: str, company_info: Dict[str, Any] = None, output_file: Optional[str] = None) -> str:
@@ -377,32 +449,12 @@ List the top 5-10 direct competitors for {company} in the {industry} industry in
 ]"""
         
         prompt = self._build_json_focused_prompt(task_description, example_format)
-        result = await self.iterative_researcher.run(prompt, output_length="short")
+        result, decision = await self._run(self.listing_researcher, 'competitor_listing', prompt, output_length="short")
         
         print(f"AI raw response: {result}")
         
-        # Use the validation function to parse and validate JSON
-        competitors = self._validate_and_clean_json_response(result)
-        
-        # If parsing failed and we got an empty array, try to provide some fallback data
-        if not competitors and len(competitors) == 0:
-            print("Parsing failed, providing fallback competitor data")
-            competitors = [
-                {
-                    "name": "Sample Local Competitor 1",
-                    "description": "A major player in the {target_country} market with established presence",
-                    "market_share": "unknown",
-                    "years_in_market": "unknown",
-                    "headquarters": "{target_country}"
-                },
-                {
-                    "name": "Sample Local Competitor 2", 
-                    "description": "Emerging competitor with innovative approach in {target_country}",
-                    "market_share": "unknown",
-                    "years_in_market": "unknown",
-                    "headquarters": "{target_country}"
-                }
-            ]
+        # An empty list means the response could not be recovered, even after a re-ask.
+        competitors = await self._validate_and_clean_json_response(result, decision)
         
         if output_file:
             import json
@@ -412,47 +464,21 @@ List the top 5-10 direct competitors for {company} in the {industry} industry in
         
         return competitors
     
-    def _validate_and_clean_json_response(self, result: str) -> Dict[str, Any]:
-        """Validate and clean JSON response from AI, with detailed error reporting."""
-        import json
-        import re
-        
-        # First, try to extract JSON from markdown code blocks
-        json_block_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', result, re.DOTALL)
-        if json_block_match:
-            json_str = json_block_match.group(1)
-            print(f"Extracted JSON from markdown block: {json_str[:200]}...")
-        else:
-            # Fallback to extracting JSON array directly
-            json_match = re.search(r'\[.*?\]', result, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                print(f"Extracted JSON array from response: {json_str[:200]}...")
-            else:
-                json_str = result
-                print(f"No JSON array found in response, using raw result: {result[:200]}...")
-            
+    def _repair_client(self):
+        if not hasattr(self, '_openai_client'):
+            self._openai_client = AsyncRateLimitedClient(openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0))
+        return self._openai_client
+
+    async def _validate_and_clean_json_response(self, result: str, source_route: Dict[str, Any] = None) -> list:
+        """Parse the competitor list, repairing malformed JSON or re-asking for it if needed."""
         try:
-            competitors = json.loads(json_str)
-            # Validate structure
-            if not isinstance(competitors, list):
-                raise ValueError("Result is not a list")
-            for i, competitor in enumerate(competitors):
-                if not isinstance(competitor, dict):
-                    raise ValueError(f"Competitor {i} is not a dictionary")
-                required_fields = ['name', 'description', 'market_share', 'years_in_market', 'headquarters']
-                for field in required_fields:
-                    if field not in competitor:
-                        raise ValueError(f"Competitor {i} missing '{field}' field")
-            
-            print(f"Successfully parsed {len(competitors)} competitors")
-            return competitors
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Failed to parse JSON response: {e}")
+            competitors = await aparse_or_reask(result, COMPETITOR_SCHEMA, self._repair_client(), source_route)
+        except Exception as e:
+            print(f"Failed to parse competitor JSON response: {e}")
             print(f"Raw response: {result}")
-            # Return an empty array instead of error object to maintain consistency
             return []
+        print(f"Successfully parsed {len(competitors)} competitors")
+        return competitors
     
     async def generate_deep_competitor_analysis(self, company: str, industry: str, target_country: str, company_info: Dict[str, Any] = None, output_file: Optional[str] = None) -> str:
         """Generate a deep competitor analysis using enhanced prompts for comprehensive scoring data."""
@@ -511,34 +537,12 @@ Focus on segments that are:
 ]"""
         
         prompt = self._build_json_focused_prompt(task_description, example_format)
-        result = await self.iterative_researcher.run(prompt, output_length="short")
+        result, decision = await self._run(self.listing_researcher, 'competitor_listing', prompt, output_length="short")
         
         print(f"AI raw arbitrage response: {result}")
         
-        # Use the validation function to parse and validate JSON
-        arbitrage_opportunities = self._validate_and_clean_arbitrage_response(result)
-        
-        # If parsing failed and we got an empty array, try to provide some fallback data
-        if not arbitrage_opportunities and len(arbitrage_opportunities) == 0:
-            print("Parsing failed, providing fallback arbitrage data")
-            arbitrage_opportunities = [
-                {
-                    "segment_name": "Premium Segment in {target_country}",
-                    "current_gap": "Limited premium options in the {target_country} market",
-                    "positioning_opportunity": "Position as the premium alternative in {target_country}",
-                    "market_size": "10-15% of {target_country} target market",
-                    "competitive_advantage": "Strong brand reputation",
-                    "implementation_strategy": "Launch premium product line in {target_country}"
-                },
-                {
-                    "segment_name": "Digital-First Consumers in {target_country}",
-                    "current_gap": "Lack of digital integration in {target_country}",
-                    "positioning_opportunity": "Create seamless digital experience in {target_country}",
-                    "market_size": "20-25% of {target_country} target market",
-                    "competitive_advantage": "Digital expertise",
-                    "implementation_strategy": "Develop mobile app and digital features for {target_country}"
-                }
-            ]
+        # An empty list means the response could not be recovered, even after a re-ask.
+        arbitrage_opportunities = await self._validate_and_clean_arbitrage_response(result, decision)
         
         if output_file:
             import json
@@ -548,53 +552,16 @@ Focus on segments that are:
         
         return arbitrage_opportunities
     
-    def _validate_and_clean_arbitrage_response(self, result: str) -> Dict[str, Any]:
-        """Validate and clean arbitrage JSON response from AI, with detailed error reporting."""
-        import json
-        import re
-        
-        # First, try to extract JSON from markdown code blocks
-        json_block_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', result, re.DOTALL)
-        if json_block_match:
-            json_str = json_block_match.group(1)
-            print(f"Extracted arbitrage JSON from markdown block: {json_str[:200]}...")
-        else:
-            # Fallback to extracting JSON array directly
-            json_match = re.search(r'\[.*?\]', result, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                print(f"Extracted arbitrage JSON array from response: {json_str[:200]}...")
-            else:
-                # Try to extract from thinking process (look for JSON in thoughts)
-                thought_match = re.search(r'=== Drafting Final Response ===\s*<thought>\s*(\[.*?\])\s*</thought>', result, re.DOTALL)
-                if thought_match:
-                    json_str = thought_match.group(1)
-                    print(f"Extracted arbitrage JSON from thinking process: {json_str[:200]}...")
-                else:
-                    json_str = result
-                    print(f"No arbitrage JSON array found in response, using raw result: {result[:200]}...")
-            
+    async def _validate_and_clean_arbitrage_response(self, result: str, source_route: Dict[str, Any] = None) -> list:
+        """Parse the arbitrage opportunities, repairing malformed JSON or re-asking for it if needed."""
         try:
-            arbitrage_opportunities = json.loads(json_str)
-            # Validate structure
-            if not isinstance(arbitrage_opportunities, list):
-                raise ValueError("Result is not a list")
-            for i, opportunity in enumerate(arbitrage_opportunities):
-                if not isinstance(opportunity, dict):
-                    raise ValueError(f"Opportunity {i} is not a dictionary")
-                required_fields = ['segment_name', 'current_gap', 'positioning_opportunity', 'market_size', 'competitive_advantage', 'implementation_strategy']
-                for field in required_fields:
-                    if field not in opportunity:
-                        raise ValueError(f"Opportunity {i} missing '{field}' field")
-            
-            print(f"Successfully parsed {len(arbitrage_opportunities)} arbitrage opportunities")
-            return arbitrage_opportunities
-            
-        except (json.JSONDecodeError, ValueError) as e:
+            arbitrage_opportunities = await aparse_or_reask(result, ARBITRAGE_SCHEMA, self._repair_client(), source_route)
+        except Exception as e:
             print(f"Failed to parse arbitrage JSON response: {e}")
             print(f"Raw response: {result}")
-            # Return an empty array instead of error object to maintain consistency
             return []
+        print(f"Successfully parsed {len(arbitrage_opportunities)} arbitrage opportunities")
+        return arbitrage_opportunities
 
     async def research_deep_dive(self, company: str, industry: str, target_country: str, module: str, company_info: Dict[str, Any] = None) -> Dict[str, Any]:
         """Run a specific deep-dive research module."""
@@ -609,7 +576,7 @@ Focus on segments that are:
         if not prompt:
             return {"error": f"Unknown module: {module}"}
 
-        report = await self.iterative_researcher.run(prompt, output_length="2 pages")
+        report, _ = await self._run(self.iterative_researcher, 'market_research', prompt, output_length="2 pages")
         return {"module": module, "content": report, "generated_at": datetime.now().isoformat()}
 
     async def generate_market_entry_playbook(self, report_data: dict) -> dict:
@@ -685,106 +652,24 @@ Create 4-5 phases covering: Research & Validation, Legal & Setup, Soft Launch, F
 Include realistic costs, timelines, and 3-5 tasks per phase.
 Return ONLY the JSON object."""
 
-        result = await self.iterative_researcher.run(prompt, output_length="2 pages")
+        result, decision = await self._run(self.iterative_researcher, 'market_research', prompt, output_length="2 pages")
 
         # Parse the JSON response
-        playbook = self._validate_and_clean_playbook_response(result)
+        playbook = await self._validate_and_clean_playbook_response(result, decision)
         return playbook
 
-    def _validate_and_clean_playbook_response(self, result: str) -> dict:
-        """Validate and clean playbook JSON response from AI."""
-        import re
-
-        # Try to extract JSON from markdown code blocks
-        json_block_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', result, re.DOTALL)
-        if json_block_match:
-            json_str = json_block_match.group(1)
-        else:
-            # Fallback to extracting JSON object directly
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-            else:
-                json_str = result
+    async def _validate_and_clean_playbook_response(self, result: str, source_route: Dict[str, Any] = None) -> dict:
+        """Parse the playbook, repairing malformed JSON or re-asking for it if needed.
 
+        Raises JSONRepairError rather than returning a canned playbook, so a
+        failed generation is never saved on the report.
+        """
         try:
-            playbook = json.loads(json_str)
-            if not isinstance(playbook, dict):
-                raise ValueError("Result is not a dictionary")
-            # Ensure required keys exist
-            if 'phases' not in playbook:
-                playbook['phases'] = []
-            return playbook
-        except (json.JSONDecodeError, ValueError):
-            # Return a default playbook structure on failure
-            return {
-                'title': 'Market Entry Playbook',
-                'summary': 'Auto-generated playbook - AI generation encountered an issue. Please regenerate.',
-                'total_estimated_budget': 'TBD',
-                'timeline_months': 18,
-                'phases': [
-                    {
-                        'phase': 1,
-                        'title': 'Research & Validation',
-                        'description': 'Validate market opportunity and refine entry strategy',
-                        'duration_months': 3,
-                        'estimated_cost': 25000,
-                        'tasks': [
-                            {'title': 'Market validation research', 'description': 'Conduct primary market research', 'estimated_cost': 10000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Competitive landscape deep-dive', 'description': 'Detailed competitor analysis', 'estimated_cost': 5000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Regulatory requirements review', 'description': 'Review all regulatory requirements', 'estimated_cost': 10000, 'priority': 'high', 'dependencies': []},
-                        ],
-                        'key_milestones': ['Market validation complete', 'Regulatory checklist finalized'],
-                        'risks': ['Market conditions may change during research phase'],
-                    },
-                    {
-                        'phase': 2,
-                        'title': 'Legal & Entity Setup',
-                        'description': 'Establish legal entity and complete regulatory compliance',
-                        'duration_months': 3,
-                        'estimated_cost': 50000,
-                        'tasks': [
-                            {'title': 'Legal entity formation', 'description': 'Register business entity', 'estimated_cost': 20000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Compliance setup', 'description': 'Complete all regulatory filings', 'estimated_cost': 15000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Local partnerships', 'description': 'Establish key local partnerships', 'estimated_cost': 15000, 'priority': 'medium', 'dependencies': []},
-                        ],
-                        'key_milestones': ['Legal entity registered', 'Key partnerships signed'],
-                        'risks': ['Regulatory delays', 'Partnership negotiations may take longer'],
-                    },
-                    {
-                        'phase': 3,
-                        'title': 'Soft Launch',
-                        'description': 'Limited market launch to test and iterate',
-                        'duration_months': 3,
-                        'estimated_cost': 75000,
-                        'tasks': [
-                            {'title': 'Product localization', 'description': 'Adapt product for local market', 'estimated_cost': 25000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Hire local team', 'description': 'Recruit key local positions', 'estimated_cost': 25000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Beta launch', 'description': 'Launch to limited audience', 'estimated_cost': 25000, 'priority': 'high', 'dependencies': []},
-                        ],
-                        'key_milestones': ['Product localized', 'First local customers acquired'],
-                        'risks': ['Product-market fit issues', 'Hiring challenges'],
-                    },
-                    {
-                        'phase': 4,
-                        'title': 'Full Launch & Scale',
-                        'description': 'Full market launch and growth acceleration',
-                        'duration_months': 6,
-                        'estimated_cost': 150000,
-                        'tasks': [
-                            {'title': 'Marketing campaign', 'description': 'Full marketing launch', 'estimated_cost': 50000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Scale operations', 'description': 'Expand team and operations', 'estimated_cost': 50000, 'priority': 'high', 'dependencies': []},
-                            {'title': 'Growth optimization', 'description': 'Optimize channels and operations', 'estimated_cost': 50000, 'priority': 'medium', 'dependencies': []},
-                        ],
-                        'key_milestones': ['Revenue targets met', 'Market share goals achieved'],
-                        'risks': ['Competition response', 'Scaling challenges'],
-                    },
-                ],
-                'team_requirements': [],
-                'success_metrics': [],
-                'critical_risks': [],
-                'raw_content': result,
-            }
+            return await aparse_or_reask(result, PLAYBOOK_SCHEMA, self._repair_client(), source_route)
+        except JSONRepairError:
+            raise
+        except Exception as e:
+            raise JSONRepairError(f"Playbook JSON could not be repaired: {e}")
 
     def _build_regulatory_prompt(self, company, industry, target_country, company_info=None):
         return f"""Provide a detailed regulatory compliance checklist for {company} ({industry}) entering {target_country}.
@@ -0,0 +1,293 @@
+"""
+Retries, hedging and circuit breaking for OpenAI calls.
+
+``call`` runs one model call. It is used by the rate-limited clients, so
+every agent gets the same behaviour:
+
+- Transient errors (connection failures, timeouts, 429 and 5xx responses)
+  are retried up to LLM_RETRY_ATTEMPTS times. Backoff is exponential with
+  full jitter and respects Retry-After. Other errors are raised at once.
+- Hedging is optional. Once a model has enough latency samples, a call
+  still running at that model's p95 latency gets one duplicate request,
+  and the first answer wins. The losing request still runs to completion
+  and is billed, so the rate-limited clients enable hedging only for
+  interactive calls.
+- ``acquire`` runs before each try, outside the latency timing. It is the
+  rate limiter's wait. A try that had to wait is not hedged, and a
+  duplicate is sent only if ``try_acquire`` finds room without waiting.
+  If ``acquire`` fails, nothing reached the service, so the failure is
+  not counted by the breaker.
+- Each model has a circuit breaker. After LLM_BREAKER_FAILURES
+  consecutive transient failures it opens, and calls raise
+  CircuitOpenError without touching the network. Callers then take their
+  local fallback path: rule-based scores, canned chat answers. After
+  LLM_BREAKER_RESET_SECONDS one probe call is let through; its result
+  closes or re-opens the breaker.
+
+Breakers and latency samples are per process. ``breaker_states`` exposes
+them for the admin LLM status endpoint.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+import openai
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+LATENCY_SAMPLES = 200
+# Don't hedge on a p95 estimated from fewer calls than this.
+MIN_HEDGE_SAMPLES = 20
+# Each request thread runs at most a primary and a hedge duplicate at once, so size the pool
+# to gunicorn's --threads (8 in railway.toml) x 2; a smaller pool queues primaries behind hedges.
+HEDGE_WORKERS = 16
+
+_executor = None
+_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_retriable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code in (408, 409) or error.status_code >= 500)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    return min(BACKOFF_MAX_SECONDS, max(delay, _retry_after(error) or 0))
+
+
+class CircuitBreaker:
+    def __init__(self):
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'open' and time.time() - self.opened_at >= settings.LLM_BREAKER_RESET_SECONDS:
+                self.state = 'half_open'
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back a probe slot taken by allow() for a call that never reached the service."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state, self.consecutive_failures, self._probe_in_flight = 'closed', 0, False
+
+    def record_failure(self, transient: bool) -> None:
+        with self._lock:
+            probing, self._probe_in_flight = self._probe_in_flight, False
+            if not transient:
+                # The service answered; a probe that got a client error still shows it is up.
+                if probing:
+                    self.state, self.consecutive_failures = 'closed', 0
+                return
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or (
+                    self.state == 'closed' and self.consecutive_failures >= settings.LLM_BREAKER_FAILURES):
+                self.state, self.opened_at = 'open', time.time()
+                self.times_opened += 1
+                logger.warning(f"LLM circuit opened after {self.consecutive_failures} consecutive failures")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'opened_at': self.opened_at,
+                'times_opened': self.times_opened,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, deque] = {}
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    with _lock:
+        return _breakers.setdefault(model, CircuitBreaker())
+
+
+def _record_latency(model: str, seconds: float) -> None:
+    with _lock:
+        _latencies.setdefault(model, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+
+def p95_latency(model: str) -> Optional[float]:
+    with _lock:
+        samples = sorted(_latencies.get(model, ()))
+    if len(samples) < MIN_HEDGE_SAMPLES:
+        return None
+    return samples[int(0.95 * (len(samples) - 1))]
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        models = sorted(set(_breakers) | set(_latencies))
+    return {model: {**get_breaker(model).snapshot(), 'p95_latency_seconds': p95_latency(model)} for model in models}
+
+
+def reset() -> None:
+    with _lock:
+        _breakers.clear()
+        _latencies.clear()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='llm-hedge')
+        return _executor
+
+
+def _hedged(model: str, attempt: Callable[[], Any], threshold: float,
+            try_acquire: Optional[Callable[[], bool]]) -> Any:
+    executor = _get_executor()
+    pending = {executor.submit(attempt)}
+    done, pending = wait(pending, timeout=threshold)
+    if not done and (try_acquire is None or try_acquire()):
+        logger.info(f"Hedging {model} call still running after {threshold:.1f}s")
+        pending.add(executor.submit(attempt))
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        failed = None
+        for future in done:
+            if future.exception() is None:
+                # A loser that hasn't started yet gives its pool slot back
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            failed = future.exception()
+        if not pending:
+            raise failed
+
+
+def _attempt_once(model: str, attempt: Callable[[], Any], hedge: bool,
+                  try_acquire: Optional[Callable[[], bool]]) -> Any:
+    threshold = p95_latency(model) if hedge and settings.LLM_HEDGE_INTERACTIVE else None
+    started = time.monotonic()
+    result = _hedged(model, attempt, threshold, try_acquire) if threshold else attempt()
+    _record_latency(model, time.monotonic() - started)
+    return result
+
+
+def _acquire(breaker: CircuitBreaker, acquire: Optional[Callable[[], float]]) -> float:
+    if acquire is None:
+        return 0.0
+    try:
+        return acquire()
+    except BaseException:
+        breaker.release()
+        raise
+
+
+def call(model: str, attempt: Callable[[], Any], hedge: bool = False,
+         acquire: Optional[Callable[[], float]] = None, try_acquire: Optional[Callable[[], bool]] = None) -> Any:
+    """Run ``attempt`` with retries, optional hedging and the model's circuit breaker.
+
+    ``acquire`` blocks before each try and returns the seconds it waited;
+    ``try_acquire`` admits a hedge duplicate only if it needs no wait.
+    """
+    breaker = get_breaker(model)
+    for n in range(settings.LLM_RETRY_ATTEMPTS):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{model} circuit is open")
+        waited = _acquire(breaker, acquire)
+        try:
+            result = _attempt_once(model, attempt, hedge and not waited, try_acquire)
+        except Exception as e:
+            transient = is_retriable(e)
+            breaker.record_failure(transient)
+            if not transient or n == settings.LLM_RETRY_ATTEMPTS - 1:
+                raise
+            delay = backoff_delay(n, e)
+            logger.warning(f"{model} call failed ({type(e).__name__}); retry {n + 1} in {delay:.1f}s")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+async def _ahedged(model: str, attempt: Callable[[], Any], threshold: float,
+                   try_acquire: Optional[Callable[[], Any]]) -> Any:
+    pending = {asyncio.ensure_future(attempt())}
+    done, pending = await asyncio.wait(pending, timeout=threshold)
+    if not done and (try_acquire is None or await try_acquire()):
+        logger.info(f"Hedging {model} call still running after {threshold:.1f}s")
+        pending.add(asyncio.ensure_future(attempt()))
+    while True:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        failed = None
+        for task in done:
+            if task.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return task.result()
+            failed = task.exception()
+        if not pending:
+            raise failed
+
+
+async def acall(model: str, attempt: Callable[[], Any], hedge: bool = False,
+                acquire: Optional[Callable[[], Any]] = None, try_acquire: Optional[Callable[[], Any]] = None) -> Any:
+    """Async ``call``; ``attempt``, ``acquire`` and ``try_acquire`` return coroutines, and a losing hedge is cancelled."""
+    breaker = get_breaker(model)
+    for n in range(settings.LLM_RETRY_ATTEMPTS):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{model} circuit is open")
+        waited = 0.0
+        if acquire is not None:
+            try:
+                waited = await acquire()
+            except BaseException:
+                breaker.release()
+                raise
+        threshold = p95_latency(model) if hedge and not waited and settings.LLM_HEDGE_INTERACTIVE else None
+        started = time.monotonic()
+        try:
+            result = await (_ahedged(model, attempt, threshold, try_acquire) if threshold else attempt())
+        except Exception as e:
+            transient = is_retriable(e)
+            breaker.record_failure(transient)
+            if not transient or n == settings.LLM_RETRY_ATTEMPTS - 1:
+                raise
+            delay = backoff_delay(n, e)
+            logger.warning(f"{model} call failed ({type(e).__name__}); retry {n + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            _record_latency(model, time.monotonic() - started)
+            breaker.record_success()
+            return result
@@ -0,0 +1,202 @@
+"""
+Monte Carlo revenue model behind the financial model endpoint.
+
+Year 1 and Year 3 revenue ranges from the scoring step are read as P10-P90
+intervals and decomposed into independent multiplicative drivers:
+
+    y1 = median_y1 * volume * pricing * competition * execution
+    y3 = median_y3 * volume * pricing * competition * sqrt(execution) * scale_up
+    y5 = y3 * (1 + growth) ** 2
+
+Each driver is lognormal with median 1, so the simulated P50 matches the
+geometric midpoint of the stated range. The variance of each range is split
+across the drivers, with competition and execution widened or narrowed by
+the competitive intensity and entry complexity scores. Tornado sensitivities
+compare mean Year 3 revenue when a driver lands in its bottom versus top
+decile; post-Year 3 growth only shapes the Year 5 projection.
+"""
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .local_scorer import format_money, parse_money_range
+
+DEFAULT_DRAWS = 100_000
+
+# Range bounds are treated as the 10th and 90th percentiles.
+Z90 = 1.2815515655446004
+
+MAX_POST_Y3_GROWTH = 0.30
+
+# Share of Year 1 log-variance attributed to each driver (before score scaling).
+VARIANCE_SHARES = {'volume': 0.45, 'pricing': 0.30, 'competition': 0.15, 'execution': 0.10}
+
+DRIVER_LABELS = {
+    'volume': 'Customer / location volume',
+    'pricing': 'Revenue per customer',
+    'competition': 'Competitive pressure',
+    'execution': 'Entry execution & ramp-up',
+    'scale_up': 'Year 1-3 scale-up',
+}
+
+# Used when a report has no parseable revenue ranges (matches the scoring fallback).
+DEFAULT_RANGES = {'y1': (200_000.0, 800_000.0), 'y3': (2_000_000.0, 8_000_000.0)}
+
+
+def _score(scores: Dict[str, Any], field: str) -> float:
+    try:
+        return min(10.0, max(0.0, float(scores.get(field, 5.0))))
+    except (TypeError, ValueError):
+        return 5.0
+
+
+def revenue_ranges(report_data: Dict[str, Any]) -> Tuple[Dict[str, Tuple[float, float]], bool]:
+    """Year 1/3 (low, high) ranges from revenue_projections, then detailed_scores."""
+    projections = report_data.get('revenue_projections') or {}
+    scores = report_data.get('detailed_scores') or {}
+    ranges, assumed = {}, False
+    for year, keys in (('y1', ('year_1', 'revenue_potential_y1')), ('y3', ('year_3', 'revenue_potential_y3'))):
+        parsed: Optional[Tuple[float, float]] = None
+        for source, key in ((projections, keys[0]), (scores, keys[1])):
+            value = source.get(key) if isinstance(source, dict) else None
+            parsed = parse_money_range(str(value)) if value else None
+            if parsed and parsed[1] > 0:
+                break
+        if not parsed or parsed[1] <= 0:
+            parsed, assumed = DEFAULT_RANGES[year], True
+        low, high = parsed
+        ranges[year] = (max(low, 1.0), max(high, low, 1.0))
+    return ranges, assumed
+
+
+def _sigma(low: float, high: float) -> float:
+    # A single-point estimate still carries the rubric's +/-30% uncertainty margin.
+    return max(np.log(high / low) / (2 * Z90), np.log(1.3) / Z90)
+
+
+def simulate(report_data: Dict[str, Any], draws: int = DEFAULT_DRAWS, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Run the simulation; returns percentiles, driver samples summary and sensitivities."""
+    scores = {**(report_data.get('dashboard_data') or {}), **(report_data.get('detailed_scores') or {})}
+    ranges, assumed = revenue_ranges(report_data)
+    if seed is None:
+        seed = zlib.crc32(repr(sorted(ranges.items())).encode())
+    rng = np.random.default_rng(seed)
+
+    intensity = _score(scores, 'competitive_intensity_score')
+    complexity = _score(scores, 'entry_complexity_score')
+    opportunity = _score(scores, 'market_opportunity_score')
+
+    sigma_y1 = _sigma(*ranges['y1'])
+    sigma_y3 = _sigma(*ranges['y3'])
+    driver_sigma = {
+        'volume': sigma_y1 * np.sqrt(VARIANCE_SHARES['volume']),
+        'pricing': sigma_y1 * np.sqrt(VARIANCE_SHARES['pricing']),
+        'competition': sigma_y1 * np.sqrt(VARIANCE_SHARES['competition']) * (0.5 + intensity / 10),
+        'execution': sigma_y1 * np.sqrt(VARIANCE_SHARES['execution']) * (0.5 + complexity / 10),
+    }
+    shared = np.sqrt(sum(driver_sigma[k] ** 2 for k in ('volume', 'pricing', 'competition')))
+    # Whatever Year 3 spread the shared drivers don't explain is scale-up uncertainty.
+    driver_sigma['scale_up'] = np.sqrt(max(sigma_y3 ** 2 - shared ** 2, (0.25 * sigma_y3) ** 2))
+
+    samples = {name: rng.lognormal(0.0, sigma, draws) for name, sigma in driver_sigma.items()}
+
+    median_y1 = np.sqrt(ranges['y1'][0] * ranges['y1'][1])
+    median_y3 = np.sqrt(ranges['y3'][0] * ranges['y3'][1])
+    # Growth after Year 3 decays to half the implied Year 1-3 CAGR (capped, since that
+    # CAGR includes the launch ramp), nudged by market opportunity.
+    cagr_13 = np.sqrt(median_y3 / median_y1) - 1
+    growth_mean = min(0.5 * cagr_13, MAX_POST_Y3_GROWTH) + (opportunity - 5.0) * 0.02
+    samples['growth'] = np.clip(rng.normal(growth_mean, 0.10 + 0.25 * abs(growth_mean), draws), -0.5, None)
+
+    common = samples['volume'] * samples['pricing'] * samples['competition']
+    revenue = {
+        'year_1': median_y1 * common * samples['execution'],
+        'year_3': median_y3 * common * np.sqrt(samples['execution']) * samples['scale_up'],
+    }
+    revenue['year_5'] = revenue['year_3'] * (1 + samples['growth']) ** 2
+
+    percentiles = {
+        year: dict(zip(('p10', 'p50', 'p90'), np.percentile(values, [10, 50, 90]).tolist()))
+        for year, values in revenue.items()
+    }
+
+    sensitivities = []
+    target = revenue['year_3']
+    base = float(target.mean())
+    for name in DRIVER_LABELS:
+        # Drivers are lognormal with median 1, so their deciles are known in closed form.
+        cut = np.exp(Z90 * driver_sigma[name])
+        driver = samples[name]
+        sensitivities.append({
+            'driver': name,
+            'pessimistic': float(target[driver <= 1 / cut].mean()),
+            'base': base,
+            'optimistic': float(target[driver >= cut].mean()),
+        })
+    for item in sensitivities:
+        item['swing'] = (item['optimistic'] - item['pessimistic']) / item['base'] if item['base'] else 0.0
+    sensitivities.sort(key=lambda item: item['swing'], reverse=True)
+
+    return {
+        'draws': draws,
+        'seed': seed,
+        'ranges': ranges,
+        'assumed_ranges': assumed,
+        'percentiles': percentiles,
+        'sensitivities': sensitivities,
+        'growth_mean': float(growth_mean),
+    }
+
+
+def build_financial_model(report_data: Dict[str, Any], draws: int = DEFAULT_DRAWS) -> Dict[str, Any]:
+    """Sensitivity analysis and scenario projections in the shape the dashboard renders."""
+    result = simulate(report_data, draws=draws)
+    percentiles = result['percentiles']
+
+    max_swing = max((item['swing'] for item in result['sensitivities']), default=0.0) or 1.0
+    variables = [
+        {
+            'variable': DRIVER_LABELS[item['driver']],
+            'pessimistic_impact': format_money(item['pessimistic']),
+            'base_impact': format_money(item['base']),
+            'optimistic_impact': format_money(item['optimistic']),
+            'sensitivity_score': round(10 * item['swing'] / max_swing, 1),
+        }
+        for item in result['sensitivities']
+    ]
+    top = variables[0]['variable'] if variables else None
+
+    def scenario(percentile, probability, assumptions):
+        return {
+            'probability': probability,
+            'year_1_revenue': format_money(percentiles['year_1'][percentile]),
+            'year_3_revenue': format_money(percentiles['year_3'][percentile]),
+            'year_5_revenue': format_money(percentiles['year_5'][percentile]),
+            'key_assumptions': assumptions,
+        }
+
+    findings = (
+        f"Across {result['draws']:,} simulated outcomes, Year 3 revenue has an 80% interval of "
+        f"{format_money(percentiles['year_3']['p10'])}-{format_money(percentiles['year_3']['p90'])} "
+        f"(median {format_money(percentiles['year_3']['p50'])})."
+    )
+    if top:
+        findings += f" {top} is the largest driver of the outcome."
+    if result['assumed_ranges']:
+        findings += ' No revenue ranges were found on this report, so default conservative ranges were used.'
+
+    return {
+        'sensitivity_analysis': {'variables': variables, 'key_findings': findings},
+        'scenario_projections': {
+            'conservative': scenario('p10', '90%', 'P10 outcome: 90% of simulated outcomes exceed this revenue.'),
+            'base': scenario('p50', '50%', 'P50 outcome: median of simulated outcomes.'),
+            'optimistic': scenario('p90', '10%', 'P90 outcome: only 10% of simulated outcomes exceed this revenue.'),
+        },
+        'simulation': {
+            'draws': result['draws'],
+            'seed': result['seed'],
+            'percentiles': percentiles,
+            'assumed_ranges': result['assumed_ranges'],
+        },
+    }
@@ -0,0 +1,188 @@
+"""
+Local scenario model for re-scoring a report under changed assumptions.
+
+Each scenario variable is encoded as a numeric feature measured relative to
+the baseline assumption (0 = no change). Adjusted outputs are a linear
+function of those features:
+
+    outputs = baseline + features @ EFFECTS
+
+where the outputs are the three dashboard scores plus log-multipliers on the
+Year 1 and Year 3 revenue ranges. A whole grid of scenarios is evaluated as a
+single matrix product.
+"""
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .local_scorer import format_money_range, parse_money_range
+
+OUTPUTS = (
+    'market_opportunity_score',
+    'competitive_intensity_score',
+    'entry_complexity_score',
+    'revenue_log_y1',
+    'revenue_log_y3',
+)
+
+# Feature -> effect on each output per unit of the feature.
+#   opportunity, intensity, complexity, log(rev y1), log(rev y3)
+FEATURE_EFFECTS = {
+    # log2(budget / moderate budget): more capital eases entry and speeds ramp-up.
+    'budget': (0.0, 0.0, -0.35, 0.15, 0.10),
+    # log2(team size / 5 people).
+    'team_size': (0.0, 0.0, -0.20, 0.08, 0.05),
+    # Timeline change in units of 6 months: more runway, later revenue.
+    'timeline': (0.0, 0.0, -0.40, -0.15, -0.05),
+    # Entry modes, one-hot against solo entry.
+    'entry_mode_joint_venture': (0.0, -0.30, -1.00, 0.10, 0.05),
+    'entry_mode_franchise': (0.0, 0.00, -0.50, -0.10, 0.20),
+    'entry_mode_acquisition': (0.0, -0.50, -1.50, 0.35, 0.25),
+    # Market assumptions, in percentage points / competitors.
+    'market_growth_pct': (0.10, 0.00, 0.00, 0.01, 0.03),
+    'market_size_pct': (0.02, 0.00, 0.00, 0.004, 0.006),
+    'competitor_count': (0.00, 0.30, 0.05, -0.02, -0.03),
+    # Direct score overrides expressed as deltas.
+    'market_opportunity_score': (1.0, 0.0, 0.0, 0.0, 0.0),
+    'competitive_intensity_score': (0.0, 1.0, 0.0, 0.0, 0.0),
+    'entry_complexity_score': (0.0, 0.0, 1.0, 0.0, 0.0),
+}
+FEATURES = tuple(FEATURE_EFFECTS)
+EFFECTS = np.array([FEATURE_EFFECTS[name] for name in FEATURES], dtype=float)
+
+BUDGET_LEVELS = {'low': 75_000, 'moderate': 300_000, 'high': 750_000, 'very_high': 1_500_000}
+ENTRY_MODES = ('solo', 'joint_venture', 'franchise', 'acquisition')
+BASELINE_TEAM_SIZE = 5
+BASELINE_TIMELINE_MONTHS = 12
+
+MAX_GRID_SIZE = 10_000
+
+
+class ScenarioError(ValueError):
+    pass
+
+
+def _number(value: Any, name: str) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    token = str(value).strip().split()[0] if str(value).strip() else ''
+    try:
+        return float(token.replace(',', '').rstrip('%'))
+    except ValueError:
+        raise ScenarioError(f"{name} must be numeric, got {value!r}")
+
+
+def encode_changes(variable_changes: Dict[str, Any]) -> np.ndarray:
+    """Encode one scenario's variable_changes as a feature vector."""
+    features = np.zeros(len(FEATURES))
+    index = {name: i for i, name in enumerate(FEATURES)}
+
+    for key, value in variable_changes.items():
+        if key == 'budget':
+            if str(value) in BUDGET_LEVELS:
+                amount = BUDGET_LEVELS[str(value)]
+            else:
+                money = parse_money_range(str(value))
+                if not money or money[1] <= 0:
+                    raise ScenarioError(f"budget must be one of {', '.join(BUDGET_LEVELS)} or a dollar amount")
+                amount = sum(money) / 2
+            features[index['budget']] = np.log2(amount / BUDGET_LEVELS['moderate'])
+        elif key == 'entry_mode':
+            if value not in ENTRY_MODES:
+                raise ScenarioError(f"entry_mode must be one of: {', '.join(ENTRY_MODES)}")
+            if value != 'solo':
+                features[index[f'entry_mode_{value}']] = 1.0
+        elif key == 'timeline':
+            months = _number(value, key)
+            features[index['timeline']] = (months - BASELINE_TIMELINE_MONTHS) / 6.0
+        elif key == 'team_size':
+            size = _number(value, key)
+            if size <= 0:
+                raise ScenarioError('team_size must be positive')
+            features[index['team_size']] = np.log2(size / BASELINE_TEAM_SIZE)
+        elif key in index:
+            features[index[key]] = _number(value, key)
+        else:
+            raise ScenarioError(f"Unknown scenario variable: {key}")
+    return features
+
+
+def baseline_from_scores(scores: Dict[str, Any]) -> Tuple[np.ndarray, Dict[str, Optional[Tuple[float, float]]]]:
+    """Baseline output vector and revenue ranges from a report's detailed_scores."""
+    baseline = np.zeros(len(OUTPUTS))
+    for i, field in enumerate(OUTPUTS[:3]):
+        try:
+            baseline[i] = float(scores.get(field, 5.0))
+        except (TypeError, ValueError):
+            baseline[i] = 5.0
+    revenue = {
+        'y1': parse_money_range(str(scores.get('revenue_potential_y1', ''))),
+        'y3': parse_money_range(str(scores.get('revenue_potential_y3', ''))),
+    }
+    return baseline, revenue
+
+
+def evaluate(baseline: np.ndarray, features: np.ndarray) -> np.ndarray:
+    """Evaluate a (n, features) matrix of scenarios; returns (n, outputs)."""
+    outputs = baseline + np.atleast_2d(features) @ EFFECTS
+    outputs[:, :3] = np.clip(outputs[:, :3], 0.0, 10.0)
+    return outputs
+
+
+def readiness(outputs: np.ndarray) -> np.ndarray:
+    """Vectorized form of the views' _calculate_readiness."""
+    m, c, x = outputs[:, 0], outputs[:, 1], outputs[:, 2]
+    return np.clip(((m * 0.4) + ((10 - c) * 0.3) + ((10 - x) * 0.3)) * 10, 0, 100).astype(int)
+
+
+def _result_rows(outputs: np.ndarray, revenue: Dict[str, Optional[Tuple[float, float]]],
+                 fallback: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ready = readiness(outputs)
+    rows = []
+    for row, score in zip(outputs, ready):
+        result = {field: round(float(row[i]), 1) for i, field in enumerate(OUTPUTS[:3])}
+        for year, column in (('y1', 3), ('y3', 4)):
+            base = revenue[year]
+            if base:
+                multiplier = float(np.exp(row[column]))
+                result[f'revenue_potential_{year}'] = format_money_range(base[0] * multiplier, base[1] * multiplier)
+            else:
+                result[f'revenue_potential_{year}'] = fallback.get(f'revenue_potential_{year}', 'N/A')
+        result['market_entry_readiness'] = int(score)
+        rows.append(result)
+    return rows
+
+
+def run_scenario(scores: Dict[str, Any], variable_changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Adjusted scores for a single scenario, plus per-variable contributions."""
+    baseline, revenue = baseline_from_scores(scores)
+    features = encode_changes(variable_changes)
+    adjusted = _result_rows(evaluate(baseline, features), revenue, scores)[0]
+    contributions = {
+        FEATURES[i]: {field: round(float(v), 2) for field, v in zip(OUTPUTS, features[i] * EFFECTS[i]) if v}
+        for i in np.flatnonzero(features)
+    }
+    return {'adjusted_scores': adjusted, 'contributions': contributions}
+
+
+def run_grid(scores: Dict[str, Any], grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Evaluate every combination of the values in ``grid`` in one vectorized pass."""
+    if not isinstance(grid, dict) or not grid:
+        raise ScenarioError('grid must map variable names to lists of values')
+    names = list(grid)
+    values = [v if isinstance(v, list) else [v] for v in grid.values()]
+    size = int(np.prod([len(v) for v in values]))
+    if size == 0 or size > MAX_GRID_SIZE:
+        raise ScenarioError(f'grid must contain between 1 and {MAX_GRID_SIZE} scenarios')
+
+    # Encode each distinct value once, then sum per-variable feature rows.
+    encoded = [np.array([encode_changes({name: value}) for value in options]) for name, options in zip(names, values)]
+    combos = np.array(list(itertools.product(*[range(len(options)) for options in values])))
+    features = sum(encoded[i][combos[:, i]] for i in range(len(names)))
+
+    baseline, revenue = baseline_from_scores(scores)
+    rows = _result_rows(evaluate(baseline, features), revenue, scores)
+    for row, combo in zip(rows, combos):
+        row['variable_changes'] = {name: values[i][j] for i, (name, j) in enumerate(zip(names, combo))}
+    return rows
@@ -1,24 +1,39 @@
 import json
 import logging
-import re
 from typing import Dict, Any, Tuple
 import openai
 from django.conf import settings
 
+from . import json_repair, local_scorer, model_router, number_extractor
+from .rate_limiter import RateLimitedClient
+
 logger = logging.getLogger(__name__)
 
+SCORING_PROMPT_VERSION = 'scoring/v2'
+
+SCORES_SCHEMA = {
+    'type': 'object',
+    'fields': ['market_opportunity_score', 'market_opportunity_rationale', 'competitive_intensity',
+               'competitive_intensity_score', 'competitive_intensity_rationale', 'entry_complexity_score',
+               'entry_complexity_rationale', 'revenue_potential_y1', 'revenue_potential_y3', 'confidence_level'],
+    'required': ['market_opportunity_score', 'competitive_intensity_score', 'entry_complexity_score'],
+}
+
 class MarketScoringAgent:
     """
     Advanced scoring agent that uses LLM to convert research reports into quantified dashboard metrics.
     """
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = RateLimitedClient(openai.OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0), priority='standard')
         self.scoring_prompt = self._load_scoring_framework()
+        self.prompt_id = model_router.prompt_id(SCORING_PROMPT_VERSION, self.scoring_prompt)
     
     def _load_scoring_framework(self) -> str:
-        return """
-You are an expert market analysis scoring specialist. Your task is to analyze market research reports and convert them into precise numerical scores for executive dashboards.
+        """Static system prompt; must not interpolate anything, so it stays byte-identical across calls."""
+        return """You are an expert market analysis scoring specialist. Analyze research reports and provide precise numerical scores with detailed rationale.
+
+Your task is to analyze market research reports and convert them into precise numerical scores for executive dashboards.
 
 ## SCORING FRAMEWORK
 
@@ -203,53 +218,13 @@ Remember:
 - Be realistic about Year 1: assume 1-3 locations/limited presence, not massive scale
 - Year 3 should show 5-10x growth, not 100x
 - If data is missing, note this and provide best estimate with lower confidence level
+
+The next message contains the research report, the company context and data points extracted from the report. Analyze the research report and provide scores in the exact JSON format specified above. Base your scoring on specific data points from the report and provide detailed rationale for each score.
 """
     
     def _extract_numbers_from_text(self, text: str) -> Dict[str, Any]:
-        """Extract quantitative data points from research report using regex."""
-        extracted_data = {}
-        
-        # Market size patterns
-        market_size_patterns = [
-            r'\$([0-9,.]+)\s*(billion|million|B|M)\s*(TAM|market|size)',
-            r'market.*size.*\$([0-9,.]+)\s*(billion|million|B|M)',
-            r'(\$[0-9,.]+\s*(?:billion|million|B|M)).*market'
-        ]
-        
-        # Growth rate patterns
-        growth_patterns = [
-            r'([0-9,.]+)%.*growth',
-            r'growth.*([0-9,.]+)%',
-            r'growing.*([0-9,.]+)%'
-        ]
-        
-        # Competitor count patterns
-        competitor_patterns = [
-            r'([0-9]+)\s*(?:major|key|main)?\s*competitors',
-            r'competitors.*([0-9]+)',
-            r'([0-9]+)\s*companies.*competing'
-        ]
-        
-        # Extract market size
-        for pattern in market_size_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                extracted_data['market_size_mentions'] = matches[:3]  # Top 3 matches
-                break
-        
-        # Extract growth rates
-        growth_matches = re.findall(r'([0-9,.]+)%', text)
-        if growth_matches:
-            extracted_data['percentage_mentions'] = [float(m.replace(',', '')) for m in growth_matches[:5]]
-        
-        # Extract competitor counts
-        for pattern in competitor_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                extracted_data['competitor_counts'] = [int(m) for m in matches[:3]]
-                break
-        
-        return extracted_data
+        """Extract typed quantitative data points (with their source sentences) from the research report."""
+        return number_extractor.extract_numbers(text)
     
     def score_research_report(self, research_report: str, company_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -286,11 +261,9 @@ Remember:
             if company_info.get('partnership_preferences'):
                 additional_context.append(f"Partnership Preferences: {company_info.get('partnership_preferences')}")
             
-            # Prepare the scoring request
-            analysis_prompt = f"""
-{self.scoring_prompt}
-
-## RESEARCH REPORT TO ANALYZE:
+            # Only the report-specific data goes in the user message; the static framework
+            # is the system message, so the provider can cache it as a prompt prefix.
+            analysis_prompt = f"""## RESEARCH REPORT TO ANALYZE:
 {research_report}
 
 ## COMPANY CONTEXT:
@@ -303,15 +276,16 @@ Brand Description: {company_info.get('brand_description', 'Not specified')}
 
 ## EXTRACTED DATA POINTS:
 {json.dumps(extracted_data, indent=2)}
-
-Now analyze this research report and provide scores in the exact JSON format specified above. Base your scoring on specific data points from the report and provide detailed rationale for each score.
 """
 
             # Call OpenAI to generate scores
+            decision = model_router.route('scoring', cycles=company_info.get('cycles'))
+            decision['prompt_template'] = self.prompt_id
             response = self.client.chat.completions.create(
-                model="gpt-4o",
+                route=decision,
+                model=decision['model'],
                 messages=[
-                    {"role": "system", "content": "You are an expert market analysis scoring specialist. Analyze research reports and provide precise numerical scores with detailed rationale."},
+                    {"role": "system", "content": self.scoring_prompt},
                     {"role": "user", "content": analysis_prompt}
                 ],
                 temperature=0.1,  # Low temperature for consistent scoring
@@ -321,35 +295,36 @@ Now analyze this research report and provide scores in the exact JSON format spe
             # Parse the response
             response_text = response.choices[0].message.content
             
-            # Extract JSON from response
-            json_match = re.search(r'```json\n(.*?)\n```', response_text, re.DOTALL)
-            if json_match:
-                scores_json = json_match.group(1)
-            else:
-                # Fallback: try to find JSON in the response
-                json_start = response_text.find('{')
-                json_end = response_text.rfind('}') + 1
-                if json_start != -1 and json_end > json_start:
-                    scores_json = response_text[json_start:json_end]
-                else:
-                    raise ValueError("No valid JSON found in LLM response")
-            
-            # Parse and validate JSON
-            scores = json.loads(scores_json)
+            # Parse (repairing fences, trailing prose or truncation); re-ask once if that fails
+            scores = json_repair.parse_or_reask(response_text, SCORES_SCHEMA, self.client, source_route=decision)
             
             # Validate required fields and add defaults if missing
             scores = self._validate_and_clean_scores(scores, company_info)
+
+            # Cross-check against the rule-based rubric; large disagreements on
+            # evidence-backed dimensions usually mean the LLM misread the report.
+            local_scores = local_scorer.score_text(research_report, extracted_data)
+            outliers = local_scorer.find_outliers(scores, local_scores)
+            if outliers:
+                logger.warning(f"LLM scores for {company_info.get('company_name')} disagree with rule-based scores: {outliers}")
+                scores['score_outliers'] = outliers
             
             logger.info(f"Generated LLM scores for {company_info.get('company_name')}: {scores}")
             return scores
             
-        except json.JSONDecodeError as e:
+        except json_repair.JSONRepairError as e:
             logger.error(f"JSON parsing error in scoring: {e}")
-            return self._generate_fallback_scores(company_info, "JSON parsing error")
+            return self._generate_fallback_scores(company_info, "JSON parsing error", research_report)
             
         except Exception as e:
             logger.error(f"Error in LLM scoring: {e}")
-            return self._generate_fallback_scores(company_info, str(e))
+            return self._generate_fallback_scores(company_info, str(e), research_report)
+
+    def provisional_scores(self, research_report: str, company_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Instant rule-based scores for display while the LLM scoring runs."""
+        scores = local_scorer.score_text(research_report, self._extract_numbers_from_text(research_report))
+        scores['provisional'] = True
+        return self._validate_and_clean_scores(scores, company_info)
     
     def _validate_and_clean_scores(self, scores: Dict[str, Any], company_info: Dict[str, Any]) -> Dict[str, Any]:
         """Validate and clean the scores returned by the LLM."""
@@ -418,19 +393,18 @@ Now analyze this research report and provide scores in the exact JSON format spe
         
         return scores
     
-    def _generate_fallback_scores(self, company_info: Dict[str, Any], error_reason: str) -> Dict[str, Any]:
-        """Generate fallback scores when LLM scoring fails."""
-        company_name = company_info.get('company_name', 'Unknown Company')
-        target_market = company_info.get('target_market', 'Unknown Market')
+    def _generate_fallback_scores(self, company_info: Dict[str, Any], error_reason: str, research_report: str = '') -> Dict[str, Any]:
+        """Generate rule-based fallback scores when LLM scoring fails."""
+        local_scores = local_scorer.score_text(research_report, self._extract_numbers_from_text(research_report or ''))
         
         return {
-            "market_opportunity_score": 5.0,
-            "market_opportunity_rationale": f"Default scoring due to analysis error: {error_reason}",
-            "competitive_intensity": "Medium",
-            "competitive_intensity_score": 5.0,
-            "competitive_intensity_rationale": f"Default competitive assessment for {company_name}",
-            "entry_complexity_score": 5.0,
-            "entry_complexity_rationale": f"Default complexity assessment for {target_market}",
+            "market_opportunity_score": local_scores['market_opportunity_score'],
+            "market_opportunity_rationale": f"{local_scores['market_opportunity_rationale']} LLM scoring unavailable: {error_reason}",
+            "competitive_intensity": local_scores['competitive_intensity'],
+            "competitive_intensity_score": local_scores['competitive_intensity_score'],
+            "competitive_intensity_rationale": local_scores['competitive_intensity_rationale'],
+            "entry_complexity_score": local_scores['entry_complexity_score'],
+            "entry_complexity_rationale": local_scores['entry_complexity_rationale'],
             "revenue_potential_y1": "$200K-$800K",
             "revenue_potential_y3": "$2M-$8M",
             "revenue_rationale": "Conservative default projections based on 1-3 locations in Year 1, scaling to 8-15 locations by Year 3. Detailed analysis pending.",
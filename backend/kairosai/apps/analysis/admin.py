@@ -1,12 +1,45 @@
 from django.contrib import admin
-from .models import MarketReport, ChatConversation, ChatMessage
+from .models import (
+    Industry,
+    IndustryAlias,
+    Market,
+    MarketAlias,
+    MarketReport,
+    ChatConversation,
+    ChatMessage,
+)
+
+
+class IndustryAliasInline(admin.TabularInline):
+    model = IndustryAlias
+    extra = 0
+
+
+class MarketAliasInline(admin.TabularInline):
+    model = MarketAlias
+    extra = 0
+
+
+@admin.register(Industry)
+class IndustryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'created_at')
+    search_fields = ('name', 'slug', 'aliases__alias')
+    inlines = [IndustryAliasInline]
+
+
+@admin.register(Market)
+class MarketAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'created_at')
+    search_fields = ('name', 'slug', 'aliases__alias')
+    inlines = [MarketAliasInline]
 
 
 @admin.register(MarketReport)
 class MarketReportAdmin(admin.ModelAdmin):
     list_display = ('user', 'company_name', 'target_market', 'industry', 'status', 'analysis_type', 'created_at')
-    list_filter = ('status', 'analysis_type', 'industry')
+    list_filter = ('status', 'analysis_type', 'normalized_industry')
     search_fields = ('company_name', 'target_market', 'user__email')
+    raw_id_fields = ('normalized_industry', 'normalized_market')
     ordering = ('-created_at',)
 
 
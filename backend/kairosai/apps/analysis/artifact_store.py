@@ -0,0 +1,134 @@
+import logging
+import os
+import tempfile
+from io import BytesIO
+from typing import BinaryIO, Optional
+
+from django.conf import settings
+
+from .report_generator import TEMPLATE_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def _artifact_dir() -> str:
+    return getattr(settings, 'REPORT_ARTIFACT_DIR', os.path.join(settings.MEDIA_ROOT, 'report_artifacts'))
+
+
+def _max_bytes() -> int:
+    return getattr(settings, 'REPORT_ARTIFACT_MAX_BYTES', 512 * 1024 * 1024)
+
+
+def _prefix(report_id, report_type) -> str:
+    return f'r{report_id}_{report_type}_'
+
+
+def artifact_path(report, report_type: str, extension: str) -> str:
+    """On-disk location for (report id, type, updated_at, template version)."""
+    stamp = int(report.updated_at.timestamp() * 1_000_000) if report.updated_at else 0
+    filename = f'{_prefix(report.id, report_type)}{stamp}_t{TEMPLATE_VERSION}.{extension}'
+    return os.path.join(_artifact_dir(), filename)
+
+
+def open_artifact(report, report_type: str, extension: str) -> Optional[BinaryIO]:
+    """Open a cached artifact for reading, or return None on a miss."""
+    path = artifact_path(report, report_type, extension)
+    try:
+        handle = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    try:
+        # Refresh mtime so eviction is least-recently-used
+        os.utime(path)
+    except OSError:
+        pass
+    return handle
+
+
+def store_artifact(report, report_type: str, extension: str, data: bytes) -> str:
+    """Atomically write an artifact, drop superseded versions and enforce the size bound."""
+    directory = _artifact_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = artifact_path(report, report_type, extension)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _remove_superseded(directory, report.id, report_type, os.path.basename(path))
+    evict_artifacts()
+    return path
+
+
+def _remove_superseded(directory, report_id, report_type, keep):
+    prefix = _prefix(report_id, report_type)
+    for entry in os.scandir(directory):
+        if entry.name.startswith(prefix) and entry.name != keep:
+            _unlink(entry.path)
+
+
+def evict_artifacts(max_bytes: Optional[int] = None) -> int:
+    """Remove least recently used artifacts until the store fits; returns bytes freed."""
+    max_bytes = _max_bytes() if max_bytes is None else max_bytes
+    directory = _artifact_dir()
+    if not os.path.isdir(directory):
+        return 0
+
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and not entry.name.endswith('.tmp'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if _unlink(path):
+            total -= size
+            freed += size
+    if freed:
+        logger.info(f"Evicted {freed} bytes of report artifacts")
+    return freed
+
+
+def delete_report_artifacts(report_id) -> None:
+    directory = _artifact_dir()
+    if not os.path.isdir(directory):
+        return
+    prefix = f'r{report_id}_'
+    for entry in os.scandir(directory):
+        if entry.name.startswith(prefix):
+            _unlink(entry.path)
+
+
+def get_or_render(report, report_type: str, config: dict) -> BinaryIO:
+    """Return an open handle to the artifact, rendering and caching it on a miss."""
+    extension = config['extension']
+    handle = open_artifact(report, report_type, extension)
+    if handle is not None:
+        return handle
+
+    data = config['generator'](report)
+    try:
+        path = store_artifact(report, report_type, extension, data)
+        return open(path, 'rb')
+    except OSError as e:
+        # A read-only or full disk must not break downloads
+        logger.warning(f"Could not cache {report_type} for report {report.id}: {e}")
+        return BytesIO(data)
+
+
+def _unlink(path) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
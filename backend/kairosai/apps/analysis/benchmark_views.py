@@ -4,7 +4,9 @@ from rest_framework.views import APIView
 from django.db.models import Avg, Count
 import logging
 
-from .models import MarketReport
+from .etags import etag_matches, not_modified, queryset_etag, with_etag
+from .models import Industry, Market, MarketReport
+from .dimensions import resolve_industry, resolve_market
 
 logger = logging.getLogger(__name__)
 
@@ -28,14 +30,44 @@ class BenchmarkView(APIView):
     def get(self, request):
         industry = request.query_params.get('industry')
         market = request.query_params.get('market')
-        report_id = request.query_params.get('report_id')
+        ids = {}
+        for name in ('industry_id', 'market_id', 'report_id'):
+            value = request.query_params.get(name)
+            try:
+                ids[name] = int(value) if value else None
+            except ValueError:
+                return Response({'error': f'{name} must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        industry_id, market_id, report_id = ids['industry_id'], ids['market_id'], ids['report_id']
 
         qs = MarketReport.objects.filter(status='completed')
 
-        if industry:
-            qs = qs.filter(industry__icontains=industry)
-        if market:
-            qs = qs.filter(target_market__icontains=market)
+        # Free-text filters resolve through the alias tables to integer keys
+        industry_dim = None
+        market_dim = None
+        if industry_id:
+            industry_dim = Industry.objects.filter(pk=industry_id).first()
+        elif industry:
+            industry_dim = resolve_industry(industry, create=False)
+        if market_id:
+            market_dim = Market.objects.filter(pk=market_id).first()
+        elif market:
+            market_dim = resolve_market(market, create=False)
+
+        if industry or industry_id:
+            qs = qs.filter(normalized_industry=industry_dim) if industry_dim else qs.none()
+        if market or market_id:
+            qs = qs.filter(normalized_market=market_dim) if market_dim else qs.none()
+
+        # Cohort row count + newest update, plus the caller's own report when ranking it
+        etag_scope = [industry_dim.pk if industry_dim else industry or industry_id,
+                      market_dim.pk if market_dim else market or market_id]
+        if report_id:
+            etag_scope += [request.user.pk, report_id, MarketReport.objects.filter(
+                pk=report_id, user=request.user, status='completed'
+            ).values_list('updated_at', flat=True).first()]
+        etag = queryset_etag('benchmarks', qs, 'updated_at', extra=etag_scope)
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
         reports = qs.values_list('detailed_scores', flat=True)
 
@@ -88,10 +120,12 @@ class BenchmarkView(APIView):
             },
         }
 
-        if industry:
-            benchmarks['industry_filter'] = industry
-        if market:
-            benchmarks['market_filter'] = market
+        if industry or industry_id:
+            benchmarks['industry_filter'] = industry_dim.name if industry_dim else industry
+            benchmarks['industry_id'] = industry_dim.id if industry_dim else None
+        if market or market_id:
+            benchmarks['market_filter'] = market_dim.name if market_dim else market
+            benchmarks['market_id'] = market_dim.id if market_dim else None
 
         # Calculate user's percentile if report_id is provided
         if report_id:
@@ -140,4 +174,4 @@ class BenchmarkView(APIView):
             except MarketReport.DoesNotExist:
                 benchmarks['user_percentiles_error'] = 'Report not found or not accessible.'
 
-        return Response(benchmarks, status=status.HTTP_200_OK)
+        return with_etag(Response(benchmarks, status=status.HTTP_200_OK), etag)
@@ -0,0 +1,149 @@
+"""
+Streaming ZIP export of many reports and formats.
+
+The archive is produced incrementally: zipfile writes into a small buffer that
+is drained after every chunk, artifact files are copied in fixed-size pieces and
+at most a handful of renders are in flight, so memory stays flat regardless of
+how many reports are exported.
+"""
+import json
+import logging
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from io import BytesIO
+
+from django.utils.text import slugify
+
+from .artifact_store import open_artifact, store_artifact
+from .prerender import get_render_pool, render_export
+from .report_views import REPORT_TYPES
+
+logger = logging.getLogger(__name__)
+
+JSON_EXPORT = 'json'
+CHUNK_SIZE = 64 * 1024
+MAX_IN_FLIGHT = 4
+
+
+class _ZipStream:
+    """Write-only, non-seekable sink that hands back whatever zipfile has written so far."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+    def chunks(self):
+        data = self.drain()
+        return [data] if data else []
+
+
+def _report_json(report):
+    from .serializers import MarketReportSerializer
+    return json.dumps(MarketReportSerializer(report).data, indent=2, default=str).encode()
+
+
+def _start(report, export_type, pool):
+    """Return a cached file handle, or a future resolving to freshly rendered bytes."""
+    if export_type == JSON_EXPORT:
+        future = Future()
+        future.set_result(_report_json(report))
+        return future
+
+    config = REPORT_TYPES[export_type]
+    handle = open_artifact(report, export_type, config['extension'])
+    if handle is not None:
+        return handle
+    if pool is not None:
+        try:
+            return pool.submit(render_export, export_type, report)
+        except RuntimeError as e:
+            logger.warning(f"Render pool unavailable, rendering inline: {e}")
+
+    future = Future()
+    try:
+        future.set_result(config['generator'](report))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _open_result(report, export_type, pending):
+    """Resolve a pending job to a readable handle, caching newly rendered artifacts."""
+    if not isinstance(pending, Future):
+        return pending
+    data = pending.result()
+    if export_type != JSON_EXPORT:
+        try:
+            path = store_artifact(report, export_type, REPORT_TYPES[export_type]['extension'], data)
+            return open(path, 'rb')
+        except OSError as e:
+            logger.warning(f"Could not cache {export_type} for report {report.id}: {e}")
+    return BytesIO(data)
+
+
+def _archive_name(report, export_type):
+    folder = f"{report.id}-{slugify(report.company_name or 'report') or 'report'}"
+    if export_type == JSON_EXPORT:
+        return f"{folder}/report.json"
+    return f"{folder}/{export_type}.{REPORT_TYPES[export_type]['extension']}"
+
+
+def iter_export_zip(reports, export_types, max_in_flight=MAX_IN_FLIGHT):
+    """Yield the bytes of a ZIP archive containing every export of every report."""
+    stream = _ZipStream()
+    pool = get_render_pool()
+    window = deque()
+    errors = []
+
+    def jobs():
+        for report in reports:
+            for export_type in export_types:
+                yield report, export_type
+
+    job_iter = jobs()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        while True:
+            # Keep a bounded number of renders running ahead of the writer
+            while len(window) < max_in_flight:
+                job = next(job_iter, None)
+                if job is None:
+                    break
+                window.append((*job, _start(*job, pool)))
+            if not window:
+                break
+
+            report, export_type, pending = window.popleft()
+            name = _archive_name(report, export_type)
+            try:
+                source = _open_result(report, export_type, pending)
+            except Exception as e:
+                logger.error(f"Bulk export of {name} failed: {e}")
+                errors.append({'file': name, 'error': str(e)})
+                continue
+
+            with source, archive.open(name, mode='w', force_zip64=True) as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    yield from stream.chunks()
+            yield from stream.chunks()
+
+        if errors:
+            archive.writestr('errors.json', json.dumps(errors, indent=2))
+    yield from stream.chunks()
@@ -0,0 +1,92 @@
+import logging
+import re
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .etags import compute_etag
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES_PER_REPORT_SET = 100
+
+# Follow-ups such as "what about the second one?" depend on the conversation,
+# so their answers are neither served from nor stored in the shared cache.
+_CONTEXT_DEPENDENT = re.compile(
+    r"\b(?:it|its|that|this|these|those|them|they|above|earlier|previous(?:ly)?|before|else|"
+    r"first one|second one|last one|you said|you mentioned|elaborate|more detail)\b"
+)
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace: "What's my score?" -> "whats my score"."""
+    text = re.sub(r"['’]", '', (text or '').lower())
+    return ' '.join(re.sub(r'[^\w\s%$]', ' ', text).split())
+
+
+def is_cacheable(question: str) -> bool:
+    return bool(question) and not _CONTEXT_DEPENDENT.search(question)
+
+
+def _generation_key(user_id) -> str:
+    return f'chat_cache_generation:{user_id}'
+
+
+def chat_cache_key(user_id, report_versions: Sequence[Tuple[int, Any]]) -> str:
+    """Cache key for the set of (id, updated_at) reports a question is answered from."""
+    generation = cache.get(_generation_key(user_id), 0)
+    return 'chat_cache:' + compute_etag(user_id, generation, *sorted(report_versions)).strip('"')
+
+
+def _unit(vector: Sequence[float]) -> Optional[np.ndarray]:
+    try:
+        vector = np.asarray(vector, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    norm = np.linalg.norm(vector) if vector.ndim == 1 else 0
+    return vector / norm if norm else None
+
+
+def lookup(key: str, question: str, embed: Callable[[str], Optional[List[float]]]) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+    """
+    Return the cached response for ``question`` and the question's embedding.
+
+    An exact repeat of a normalized question is served without an embedding
+    call. Otherwise the closest cached question is used if its cosine
+    similarity is at least CHAT_CACHE_SIMILARITY.
+    """
+    entries = cache.get(key)
+    if entries and question in entries['questions']:
+        return entries['responses'][entries['questions'].index(question)], None
+
+    embedding = _unit(embed(question))
+    if not entries or embedding is None or len(embedding) != entries['embeddings'].shape[1]:
+        return None, embedding
+
+    similarities = entries['embeddings'] @ embedding
+    best = int(np.argmax(similarities))
+    if similarities[best] >= settings.CHAT_CACHE_SIMILARITY:
+        logger.info(f"Chat cache hit ({similarities[best]:.3f}): {question!r} ~ {entries['questions'][best]!r}")
+        return entries['responses'][best], embedding
+    return None, embedding
+
+
+def store(key: str, question: str, embedding: Optional[np.ndarray], response: Dict[str, Any]) -> None:
+    """Add an answer to the report set's cache, evicting the oldest beyond MAX_ENTRIES_PER_REPORT_SET."""
+    if embedding is None:
+        return
+    entries = cache.get(key)
+    if not entries or entries['embeddings'].shape[1] != len(embedding):
+        entries = {'questions': [], 'responses': [], 'embeddings': np.empty((0, len(embedding)), dtype=np.float32)}
+    entries['questions'] = (entries['questions'] + [question])[-MAX_ENTRIES_PER_REPORT_SET:]
+    entries['responses'] = (entries['responses'] + [response])[-MAX_ENTRIES_PER_REPORT_SET:]
+    entries['embeddings'] = np.vstack([entries['embeddings'], embedding])[-MAX_ENTRIES_PER_REPORT_SET:]
+    cache.set(key, entries, settings.CHAT_CACHE_TTL)
+
+
+def invalidate_chat_cache(user_id) -> None:
+    """Retire every cached answer for the user's reports, including saves that leave updated_at alone."""
+    cache.set(_generation_key(user_id), uuid.uuid4().hex, None)
@@ -0,0 +1,136 @@
+"""
+Per-conversation chat memory: a rolling summary plus a token-bounded window.
+
+Each prompt carries the conversation's stored summary and the newest turns
+that fit in CHAT_HISTORY_TOKENS (at most MAX_WINDOW_ROWS of them), so its size stays flat however long the
+conversation grows. After each turn, the turns that have dropped out of the
+window are folded into the summary on a background thread. The next prompt
+picks up the new summary; nothing waits on the summarization call.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from .models import ChatConversation, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate; close enough to bound prompt size without a tokenizer.
+CHARS_PER_TOKEN = 4
+# A single long answer is clipped in the window rather than crowding out every other turn.
+MAX_MESSAGE_TOKENS = 400
+# Most turns a window holds, however short; older rows count as dropped out and get summarized.
+MAX_WINDOW_ROWS = 30
+# Don't spend a summarization call on less than this much dropped-out text.
+MIN_SUMMARY_TOKENS = 300
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+
+def _clip(content: str) -> str:
+    limit = MAX_MESSAGE_TOKENS * CHARS_PER_TOKEN
+    return content if len(content) <= limit else content[:limit].rstrip() + ' […]'
+
+
+def _unsummarized(conversation: ChatConversation, before_id: Optional[int] = None):
+    messages = ChatMessage.objects.filter(conversation=conversation)
+    if conversation.summary_through_id:
+        messages = messages.filter(id__gt=conversation.summary_through_id)
+    if before_id:
+        messages = messages.filter(id__lt=before_id)
+    return messages
+
+
+def _split_window(newest_first: List[Dict[str, Any]]):
+    """Split messages (newest first) into the window that fits the budget and row cap, and the older rest."""
+    budget = settings.CHAT_HISTORY_TOKENS
+    window, used = [], 0
+    for message in newest_first:
+        cost = estimate_tokens(_clip(message['content']))
+        if len(window) >= MAX_WINDOW_ROWS or (window and used + cost > budget):
+            break
+        window.append(message)
+        used += cost
+    return window, newest_first[len(window):]
+
+
+def conversation_memory(conversation: Optional[ChatConversation], before_id: Optional[int] = None) -> Dict[str, Any]:
+    """Summary and recent-turn window for a prompt; ``before_id`` excludes the message being answered."""
+    if conversation is None:
+        return {'summary': '', 'messages': []}
+    newest_first = list(
+        _unsummarized(conversation, before_id).order_by('-created_at').values('id', 'message_type', 'content')[:MAX_WINDOW_ROWS]
+    )
+    window, _ = _split_window(newest_first)
+    return {
+        'summary': conversation.summary,
+        'messages': [
+            {'message_type': message['message_type'], 'content': _clip(message['content'])}
+            for message in reversed(window)
+        ],
+    }
+
+
+def update_summary(conversation_id: int) -> bool:
+    """Fold turns that have left the window into the conversation summary. Returns True if it changed."""
+    from ..ai_agents.chatgpt_service import ChatGPTService
+
+    conversation = ChatConversation.objects.filter(pk=conversation_id).only('id', 'summary', 'summary_through_id').first()
+    if conversation is None:
+        return False
+    newest_first = list(_unsummarized(conversation).order_by('-created_at').values('id', 'message_type', 'content'))
+    _, older = _split_window(newest_first)
+    if sum(estimate_tokens(message['content']) for message in older) < MIN_SUMMARY_TOKENS:
+        return False
+
+    older.reverse()
+    summary = ChatGPTService().summarize_conversation(conversation.summary, older)
+    if not summary:
+        return False
+    # Only apply on top of the summary we started from, in case another worker got there first.
+    # update() also leaves updated_at alone, so the conversation list order is unaffected.
+    return ChatConversation.objects.filter(
+        pk=conversation_id, summary_through_id=conversation.summary_through_id
+    ).update(summary=summary, summary_through_id=older[-1]['id']) == 1
+
+
+def _get_executor():
+    global _executor
+    workers = getattr(settings, 'CHAT_SUMMARY_WORKERS', 2)
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chat-summary')
+        return _executor
+
+
+def schedule_summary_update(conversation_id: int) -> None:
+    """Queue a summary update for the conversation unless one is already pending."""
+    executor = _get_executor()
+    if executor is None:
+        return
+    with _executor_lock:
+        if conversation_id in _pending:
+            return
+        _pending.add(conversation_id)
+
+    def run():
+        try:
+            update_summary(conversation_id)
+        except Exception as e:
+            logger.warning(f"Summary update for conversation {conversation_id} failed: {e}")
+        finally:
+            with _executor_lock:
+                _pending.discard(conversation_id)
+
+    executor.submit(run)
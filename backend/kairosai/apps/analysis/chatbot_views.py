@@ -3,14 +3,22 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Q
+from django.db.models.fields.json import KT
 import json
 import logging
 from datetime import datetime
 from typing import Dict, List
 
+from . import chat_cache, chat_memory
+from .dashboard_cache import dashboard_etag, get_dashboard_snapshot, get_dashboard_version
+from .etags import compute_etag, etag_matches, not_modified, with_etag
 from .models import MarketReport, ChatConversation, ChatMessage
+from .pagination import InvalidCursor, KeysetPagination
+from .rag_digest import build_rag_digest
 from .serializers import (
+    parse_fields_param,
     MarketReportListSerializer,
     MarketReportSelectorSerializer,
     ChatConversationSerializer, 
@@ -22,6 +30,14 @@ from ..ai_agents.chatgpt_service import ChatGPTService
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+
+def _as_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
 class MarketReportsAPIView(APIView):
     """API endpoint to get user's market reports for chatbot context"""
     permission_classes = [permissions.IsAuthenticated]
@@ -32,10 +48,15 @@ class MarketReportsAPIView(APIView):
             # If report_id is provided, return that specific report
             if report_id:
                 try:
-                    report = MarketReport.objects.get(id=report_id, user=request.user, status='completed')
+                    reports = MarketReport.objects.filter(id=report_id, user=request.user, status='completed')
+                    version = reports.values('id', 'updated_at').get()
+                    etag = compute_etag('report', version['id'], version['updated_at'])
+                    if etag_matches(request, etag):
+                        return not_modified(etag)
+                    
                     from .serializers import MarketReportSerializer
-                    serializer = MarketReportSerializer(report)
-                    return Response(serializer.data, status=status.HTTP_200_OK)
+                    serializer = MarketReportSerializer(reports.get())
+                    return with_etag(Response(serializer.data, status=status.HTTP_200_OK), etag)
                 except MarketReport.DoesNotExist:
                     return Response(
                         {'error': 'Report not found'},
@@ -44,19 +65,31 @@ class MarketReportsAPIView(APIView):
             
             # Otherwise, return list of reports
             selector_mode = request.query_params.get('selector', 'false').lower() == 'true'
-            
-            reports = MarketReport.objects.filter(user=request.user, status='completed').order_by('-created_at')
-            
-            if selector_mode:
-                # Return simple format for UI selectors
-                serializer = MarketReportSelectorSerializer(reports, many=True)
+            # Return simple format for UI selectors, detailed format otherwise
+            serializer_class = MarketReportSelectorSerializer if selector_mode else MarketReportListSerializer
+            fields = parse_fields_param(request)
+            
+            # Only load the columns the serializer renders, never the large JSON blobs
+            reports = MarketReport.objects.filter(
+                user=request.user, status='completed'
+            ).only(*serializer_class.model_columns(fields)).order_by('-created_at', '-id')
+            
+            response_data = {}
+            if KeysetPagination.is_requested(request):
+                paginator = KeysetPagination('created_at')
+                try:
+                    reports = paginator.paginate_queryset(reports, request)
+                except InvalidCursor:
+                    return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+                response_data = {'next_cursor': paginator.next_cursor, 'has_more': paginator.has_more}
             else:
-                # Return detailed format
-                serializer = MarketReportListSerializer(reports, many=True)
+                reports = list(reports)
             
+            serializer = serializer_class(reports, many=True, fields=fields)
             return Response({
                 'reports': serializer.data,
-                'count': reports.count()
+                'count': len(reports),
+                **response_data,
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -73,47 +106,27 @@ class LatestDashboardDataAPIView(APIView):
     def get(self, request):
         """Get the latest completed market report with full dashboard data"""
         try:
-            # Get the most recent completed report for this user
-            latest_report = MarketReport.objects.filter(
-                user=request.user, 
-                status='completed'
-            ).order_by('-created_at').first()
+            # Version of the most recent completed report for this user
+            version = get_dashboard_version(request.user)
+            
+            if not version:
+                return Response({
+                    'has_data': False,
+                    'message': 'No completed market reports found'
+                }, status=status.HTTP_200_OK)
+            
+            etag = dashboard_etag(request.user, version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
             
-            if not latest_report:
+            response_data = get_dashboard_snapshot(request.user, version)
+            if response_data is None:
                 return Response({
                     'has_data': False,
                     'message': 'No completed market reports found'
                 }, status=status.HTTP_200_OK)
             
-            # Prepare the response in the format expected by the frontend
-            response_data = {
-                'has_data': True,
-                'dashboard_data': {
-                    'company_name': latest_report.company_name,
-                    'industry': latest_report.industry,
-                    'target_market': latest_report.target_market,
-                    'website': latest_report.website,
-                    'customer_segment': latest_report.customer_segment,
-                    'expansion_direction': latest_report.expansion_direction,
-                    'company_size': latest_report.company_size,
-                    'annual_revenue': latest_report.annual_revenue,
-                    'funding_stage': latest_report.funding_stage,
-                    'current_markets': latest_report.current_markets,
-                    'expansion_timeline': latest_report.expansion_timeline,
-                    'budget_range': latest_report.budget_range,
-                    'dashboard': latest_report.dashboard_data,
-                    'detailed_scores': latest_report.detailed_scores,
-                    'research_report': latest_report.research_report,
-                    'key_insights': latest_report.key_insights,
-                    'revenue_projections': latest_report.revenue_projections,
-                    'recommended_actions': latest_report.recommended_actions,
-                },
-                'competitor_summary': latest_report.competitor_analysis or None,
-                'arbitrage_data': latest_report.segment_arbitrage or None,
-                'created_at': latest_report.created_at.isoformat() if latest_report.created_at else None
-            }
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+            return with_etag(Response(response_data, status=status.HTTP_200_OK), etag)
             
         except Exception as e:
             logger.error(f"Error fetching latest dashboard data: {str(e)}")
@@ -129,12 +142,31 @@ class ChatConversationsAPIView(APIView):
     def get(self, request):
         """Get all chat conversations for the user"""
         try:
-            conversations = ChatConversation.objects.filter(user=request.user)
-            serializer = ChatConversationSerializer(conversations, many=True)
+            fields = parse_fields_param(request)
+            columns = set(ChatConversationSerializer.model_columns(fields)) | {'updated_at'}
+            conversations = ChatConversation.objects.filter(
+                user=request.user
+            ).only(*columns).order_by('-updated_at', '-id')
+            if 'messages' in ChatConversationSerializer.select_fields(fields):
+                conversations = conversations.prefetch_related('messages')
+            
+            response_data = {}
+            if KeysetPagination.is_requested(request):
+                # Conversations are listed by recent activity, so page on updated_at
+                paginator = KeysetPagination('updated_at')
+                try:
+                    conversations = paginator.paginate_queryset(conversations, request)
+                except InvalidCursor:
+                    return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+                response_data = {'next_cursor': paginator.next_cursor, 'has_more': paginator.has_more}
+            else:
+                conversations = list(conversations)
             
+            serializer = ChatConversationSerializer(conversations, many=True, fields=fields)
             return Response({
                 'conversations': serializer.data,
-                'count': conversations.count()
+                'count': len(conversations),
+                **response_data,
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -202,7 +234,10 @@ class ChatMessageAPIView(APIView):
             )
             
             # Generate AI response using RAG with optional report selection
-            ai_response, sources = self._generate_rag_response(content, request.user, selected_report_ids)
+            ai_response, sources = self._generate_rag_response(
+                content, request.user, selected_report_ids,
+                conversation=conversation, before_message_id=user_message.id
+            )
             
             # Save AI response
             ai_message = ChatMessage.objects.create(
@@ -212,9 +247,11 @@ class ChatMessageAPIView(APIView):
                 sources=sources
             )
             
-            # Update conversation timestamp
-            conversation.updated_at = datetime.now()
-            conversation.save()
+            # Update conversation timestamp (only that field: the summary is written in the background)
+            conversation.save(update_fields=['updated_at'])
+            
+            # Fold turns that have left the prompt window into the rolling summary
+            transaction.on_commit(lambda: chat_memory.schedule_summary_update(conversation.id))
             
             return Response({
                 'conversation_id': conversation.id,
@@ -229,7 +266,8 @@ class ChatMessageAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _generate_rag_response(self, query: str, user: User, selected_report_ids: List[int] = None) -> tuple[str, List[str]]:
+    def _generate_rag_response(self, query: str, user: User, selected_report_ids: List[int] = None,
+                               conversation: ChatConversation = None, before_message_id: int = None) -> tuple[str, List[str]]:
         """Generate AI response using ChatGPT with RAG from user's market reports"""
         try:
             # Initialize ChatGPT service
@@ -242,46 +280,70 @@ class ChatMessageAPIView(APIView):
                     status='completed',
                     id__in=selected_report_ids
                 )
-                if not reports.exists():
-                    return (
-                        "I couldn't find the selected reports. Please make sure you've selected valid reports.",
-                        []
-                    )
             else:
                 # Get all user's reports if no specific selection
                 reports = MarketReport.objects.filter(user=user, status='completed')
             
-            if not reports.exists():
+            # (id, updated_at) of the report set doubles as the existence check and the cache version
+            report_versions = list(reports.values_list('id', 'updated_at'))
+            if not report_versions:
+                if selected_report_ids:
+                    return (
+                        "I couldn't find the selected reports. Please make sure you've selected valid reports.",
+                        []
+                    )
                 return (
                     "I don't have access to any market analysis reports yet. Please generate some market analysis reports first, and then I'll be able to help you analyze them and answer your questions.",
                     []
                 )
             
+            # Repeat questions about the same reports are answered from the semantic cache
+            question = chat_cache.normalize_question(query)
+            cache_key = embedding = None
+            if chat_cache.is_cacheable(question):
+                cache_key = chat_cache.chat_cache_key(user.pk, report_versions)
+                cached, embedding = chat_cache.lookup(cache_key, question, chatgpt_service.embed_query)
+                if cached:
+                    return cached['content'], cached['sources']
+            
             # Get conversation history for context
-            conversation_history = self._get_conversation_history(user)
+            memory = self._get_conversation_history(conversation, before_message_id)
             
-            # Convert reports to context format
+            # Context is the stored per-report digests plus the two headline scores
+            # the offline fallback answer quotes; no report JSON is loaded or re-serialized
             context_reports = []
-            for report in reports:
+            for report in reports.values(
+                'id', 'company_name', 'industry', 'target_market', 'rag_digest',
+                opportunity=KT('detailed_scores__market_opportunity_score'),
+                intensity=KT('detailed_scores__competitive_intensity'),
+            ):
                 context_reports.append({
-                    'id': report.id,
-                    'title': f"Market Analysis: {report.company_name} expanding to {report.target_market}",
-                    'company_name': report.company_name,
-                    'industry': report.industry,
-                    'target_market': report.target_market,
-                    'summary': report.executive_summary or 'No summary available',
-                    'key_insights': report.key_insights or [],
-                    'scores': report.detailed_scores or {},
-                    'created_at': report.created_at.isoformat() if report.created_at else 'N/A'
+                    'id': report['id'],
+                    'title': f"Market Analysis: {report['company_name']} expanding to {report['target_market']}",
+                    'company_name': report['company_name'],
+                    'industry': report['industry'],
+                    'target_market': report['target_market'],
+                    'digest': report['rag_digest'] or self._build_missing_digest(report['id']),
+                    'scores': {
+                        'market_opportunity_score': _as_float(report['opportunity']),
+                        'competitive_intensity': report['intensity'] or 'Medium',
+                    },
                 })
             
             # Generate ChatGPT response with RAG context
             chatgpt_response = chatgpt_service.generate_response_with_rag(
                 user_query=query,
                 context_reports=context_reports,
-                conversation_history=conversation_history
+                conversation_history=memory['messages'],
+                conversation_summary=memory['summary']
             )
             
+            if cache_key and chatgpt_response.get('model_used') != 'fallback':
+                chat_cache.store(cache_key, question, embedding, {
+                    'content': chatgpt_response['content'],
+                    'sources': chatgpt_response['sources'],
+                })
+            
             return chatgpt_response['content'], chatgpt_response['sources']
             
         except Exception as e:
@@ -291,33 +353,21 @@ class ChatMessageAPIView(APIView):
                 []
             )
     
-    def _get_conversation_history(self, user: User) -> List[Dict]:
-        """Get recent conversation history for context"""
+    def _build_missing_digest(self, report_id: int) -> str:
+        """Digest for a report saved before digests existed (see the backfill_rag_digests command)."""
+        report = MarketReport.objects.get(pk=report_id)
+        digest = build_rag_digest(report)
+        # update() skips the save signals: the report's content has not changed
+        MarketReport.objects.filter(pk=report_id).update(rag_digest=digest)
+        return digest
+    
+    def _get_conversation_history(self, conversation: ChatConversation, before_message_id: int = None) -> Dict:
+        """Rolling summary and token-bounded recent turns of the conversation being answered"""
         try:
-            # Get the most recent conversation for the user
-            recent_conversation = ChatConversation.objects.filter(user=user).order_by('-updated_at').first()
-            
-            if not recent_conversation:
-                return []
-            
-            # Get recent messages from the conversation
-            recent_messages = ChatMessage.objects.filter(
-                conversation=recent_conversation
-            ).order_by('-created_at')[:10]  # Last 10 messages
-            
-            conversation_history = []
-            for message in reversed(recent_messages):  # Reverse to get chronological order
-                conversation_history.append({
-                    'message_type': message.message_type,
-                    'content': message.content,
-                    'created_at': message.created_at.isoformat() if message.created_at else None
-                })
-            
-            return conversation_history
-            
+            return chat_memory.conversation_memory(conversation, before_message_id)
         except Exception as e:
             logger.error(f"Error getting conversation history: {str(e)}")
-            return []
+            return {'summary': '', 'messages': []}
     
     def _find_relevant_reports(self, query: str, reports) -> List[MarketReport]:
         """Find reports relevant to the query (simple keyword matching for now)"""
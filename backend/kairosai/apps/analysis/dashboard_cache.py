@@ -0,0 +1,81 @@
+import logging
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+
+from .etags import compute_etag
+from .models import MarketReport
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TIMEOUT = 60 * 60  # 1 hour; entries are also version-checked on every read
+
+
+def _cache_key(user_id) -> str:
+    return f'dashboard_snapshot:{user_id}'
+
+
+def get_dashboard_version(user) -> Optional[Dict[str, Any]]:
+    """Cheap indexed lookup of the (id, updated_at) of the user's latest completed report."""
+    return MarketReport.objects.filter(
+        user=user, status='completed'
+    ).order_by('-created_at').values('id', 'updated_at').first()
+
+
+def dashboard_etag(user, version: Dict[str, Any]) -> str:
+    return compute_etag('dashboard', user.pk, version['id'], version['updated_at'])
+
+
+def build_dashboard_payload(report: MarketReport) -> Dict[str, Any]:
+    """Serialize a report in the format expected by the frontend dashboard."""
+    return {
+        'has_data': True,
+        'dashboard_data': {
+            'company_name': report.company_name,
+            'industry': report.industry,
+            'target_market': report.target_market,
+            'website': report.website,
+            'customer_segment': report.customer_segment,
+            'expansion_direction': report.expansion_direction,
+            'company_size': report.company_size,
+            'annual_revenue': report.annual_revenue,
+            'funding_stage': report.funding_stage,
+            'current_markets': report.current_markets,
+            'expansion_timeline': report.expansion_timeline,
+            'budget_range': report.budget_range,
+            'dashboard': report.dashboard_data,
+            'detailed_scores': report.detailed_scores,
+            'research_report': report.research_report,
+            'key_insights': report.key_insights,
+            'revenue_projections': report.revenue_projections,
+            'recommended_actions': report.recommended_actions,
+        },
+        'competitor_summary': report.competitor_analysis or None,
+        'arbitrage_data': report.segment_arbitrage or None,
+        'created_at': report.created_at.isoformat() if report.created_at else None
+    }
+
+
+def get_dashboard_snapshot(user, version: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached dashboard payload for ``version``, rebuilding it on a miss.
+
+    Snapshots are stored with the version they were built from, so a stale entry
+    left in another worker's local cache is never served.
+    """
+    key = _cache_key(user.pk)
+    stamp = (version['id'], version['updated_at'].isoformat())
+    cached = cache.get(key)
+    if cached and cached.get('stamp') == stamp:
+        return cached['payload']
+
+    report = MarketReport.objects.filter(id=version['id']).first()
+    if report is None:
+        return None
+    payload = build_dashboard_payload(report)
+    cache.set(key, {'stamp': stamp, 'payload': payload}, SNAPSHOT_TIMEOUT)
+    return payload
+
+
+def invalidate_dashboard_snapshot(user_id) -> None:
+    cache.delete(_cache_key(user_id))
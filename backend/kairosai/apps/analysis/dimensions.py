@@ -0,0 +1,102 @@
+import logging
+import re
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+from .models import Industry, IndustryAlias, Market, MarketAlias
+
+logger = logging.getLogger(__name__)
+
+
+# Canonical name -> known free-text spellings (compared after normalization)
+MARKET_ALIASES = {
+    'United States': ['us', 'usa', 'u.s.', 'u.s.a.', 'united states of america', 'america', 'the united states'],
+    'United Kingdom': ['uk', 'u.k.', 'great britain', 'britain', 'england'],
+    'United Arab Emirates': ['uae', 'u.a.e.', 'emirates', 'dubai'],
+    'South Korea': ['korea', 'republic of korea', 'rok', 's. korea'],
+    'China': ['prc', "people's republic of china", 'mainland china'],
+    'Germany': ['deutschland', 'de'],
+    'Japan': ['jp', 'nippon'],
+    'India': ['bharat'],
+    'Brazil': ['brasil', 'br'],
+    'Mexico': ['mx', 'méxico'],
+    'Canada': ['ca'],
+    'Australia': ['au', 'aus'],
+    'Singapore': ['sg'],
+    'Vietnam': ['viet nam', 'vn'],
+    'Saudi Arabia': ['ksa', 'kingdom of saudi arabia'],
+    'Netherlands': ['the netherlands', 'holland', 'nl'],
+    'France': ['fr'],
+}
+
+INDUSTRY_ALIASES = {
+    'Technology': ['tech', 'information technology', 'it'],
+    'Software': ['saas', 'software as a service', 'enterprise software'],
+    'Food & Beverage': ['f&b', 'food and beverage', 'food & beverages', 'food and beverages', 'restaurants', 'restaurant'],
+    'Retail': ['retail & ecommerce', 'retail and ecommerce'],
+    'E-commerce': ['ecommerce', 'e commerce', 'online retail'],
+    'Financial Services': ['fintech', 'finance', 'banking'],
+    'Healthcare': ['health care', 'health', 'medtech', 'healthtech'],
+    'Education': ['edtech', 'education technology'],
+    'Consumer Goods': ['cpg', 'fmcg', 'consumer packaged goods'],
+    'Manufacturing': ['industrial', 'industrials'],
+}
+
+
+def normalize_dimension_key(value: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so spellings compare equal."""
+    value = re.sub(r"[^\w\s&]", '', (value or '').lower())
+    return ' '.join(value.split())
+
+
+def _build_alias_index(aliases):
+    index = {}
+    for canonical, spellings in aliases.items():
+        index[normalize_dimension_key(canonical)] = canonical
+        for spelling in spellings:
+            index[normalize_dimension_key(spelling)] = canonical
+    return index
+
+
+_MARKET_INDEX = _build_alias_index(MARKET_ALIASES)
+_INDUSTRY_INDEX = _build_alias_index(INDUSTRY_ALIASES)
+
+
+def _resolve(value, model, alias_model, alias_fk, builtin_index, create=True):
+    key = normalize_dimension_key(value)
+    if not key:
+        return None
+
+    # Alias rows hold the first 100 characters of the key, so look them up the same way
+    alias = alias_model.objects.select_related(alias_fk).filter(alias=key[:100]).first()
+    if alias:
+        return getattr(alias, alias_fk)
+
+    canonical = builtin_index.get(key, ' '.join(value.split()))
+    slug = slugify(canonical)[:100]
+    if not slug:
+        return None
+
+    if not create:
+        return model.objects.filter(slug=slug).first()
+
+    try:
+        with transaction.atomic():
+            instance, _ = model.objects.get_or_create(slug=slug, defaults={'name': canonical[:100]})
+            alias_model.objects.get_or_create(alias=key[:100], defaults={alias_fk: instance})
+    except IntegrityError:
+        # Another worker registered the same spelling first
+        instance = model.objects.filter(slug=slug).first()
+    return instance
+
+
+def resolve_industry(value: str, create: bool = True) -> Optional[Industry]:
+    """Return the Industry for a free-text value, registering it when unseen."""
+    return _resolve(value, Industry, IndustryAlias, 'industry', _INDUSTRY_INDEX, create=create)
+
+
+def resolve_market(value: str, create: bool = True) -> Optional[Market]:
+    """Return the Market for a free-text value, registering it when unseen."""
+    return _resolve(value, Market, MarketAlias, 'market', _MARKET_INDEX, create=create)
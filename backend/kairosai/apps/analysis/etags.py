@@ -0,0 +1,49 @@
+import hashlib
+
+from django.db.models import Count, Max
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def compute_etag(*parts) -> str:
+    """Build a strong ETag from version-bearing parts (ids, timestamps, counters)."""
+    raw = '|'.join(part.isoformat() if hasattr(part, 'isoformat') else str(part) for part in parts)
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def queryset_etag(scope, queryset, *versions, extra=()) -> str:
+    """
+    Strong ETag for a queryset from a single aggregate query.
+
+    ``versions`` are timestamp field paths (aggregated with Max) or aggregate
+    expressions such as ``Count('milestones', distinct=True)``. The row count is
+    always included so deletions change the tag.
+    """
+    aggregates = {'rows': Count('pk', distinct=True)}
+    for i, version in enumerate(versions):
+        aggregates[f'v{i}'] = Max(version) if isinstance(version, str) else version
+    values = queryset.order_by().aggregate(**aggregates)
+    return compute_etag(scope, *extra, *(values[key] for key in aggregates))
+
+
+def etag_matches(request, etag: str) -> bool:
+    """True when the client's If-None-Match already names this representation."""
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Weak comparison (RFC 9110): compressed responses carry a W/ prefixed tag
+    return etag.removeprefix('W/') in [tag.strip().removeprefix('W/') for tag in header.split(',')]
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag: str):
+    """Attach the ETag and require clients to revalidate before reusing it."""
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
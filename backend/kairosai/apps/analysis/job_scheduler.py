@@ -0,0 +1,242 @@
+"""
+Tier-aware admission scheduler for research runs.
+
+Analyses run inside the request. Before starting its research, a request
+takes a slot through this scheduler. At most ANALYSIS_MAX_CONCURRENT runs
+are active across all workers, and a request waits for its turn when the
+slots are full.
+
+Each subscription tier is a lane with a weight. Queued runs are dispatched
+in start-time fair queuing order: a run's tag starts at the later of the
+current virtual time and the finish tag of the previous run in its lane,
+and advances by cost / weight. Cost is the run's expected research minutes,
+so a free user's 20-cycle run counts for much more than an enterprise
+user's 3-cycle run. Per-user caps keep one account from holding every slot
+in its lane. A user at their cap is skipped, so the runs behind them are
+not blocked.
+
+State lives in the AnalysisJob table, so gunicorn workers and replicas
+share one queue. Waiting requests heartbeat while they poll, and running
+requests heartbeat from a small ticker thread. If a worker dies mid-run
+(timeout, OOM, a redeploy's SIGKILL) its heartbeat goes stale and the job
+is abandoned within HEARTBEAT_TIMEOUT, so the slot frees up. A run that
+outlives ANALYSIS_JOB_TIMEOUT is abandoned as well.
+"""
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import AnalysisJob
+
+logger = logging.getLogger(__name__)
+
+LANE_WEIGHTS = {'enterprise': 8, 'professional': 4, 'starter': 2, 'free': 1}
+USER_CONCURRENCY = {'enterprise': 3, 'professional': 2, 'starter': 1, 'free': 1}
+# Research time budget per cycles setting (minutes), as configured in CompetitorResearchAgent
+CYCLE_MINUTES = {'3': 7, '5': 10, '7': 15, '10': 20, '20': 40}
+
+POLL_SECONDS = 1.0
+# A queued or running job whose request hasn't heartbeat for this long is abandoned.
+HEARTBEAT_TIMEOUT = timedelta(seconds=30)
+# How often a running request refreshes its heartbeat.
+RUNNING_HEARTBEAT_SECONDS = 10.0
+# Finished jobs are kept this long for wait-time metrics and lane virtual time.
+RETENTION = timedelta(days=1)
+METRICS_WINDOW = timedelta(hours=1)
+
+
+class AnalysisQueueTimeout(Exception):
+    pass
+
+
+def lane_for(user) -> str:
+    tier = getattr(user, 'subscription_tier', None) if getattr(user, 'is_authenticated', False) else None
+    return tier if tier in LANE_WEIGHTS else 'free'
+
+
+def job_cost(cycles: Any = '3', markets: int = 1) -> float:
+    return float(CYCLE_MINUTES.get(str(cycles), CYCLE_MINUTES['3']) * max(1, markets))
+
+
+def _is_stale(row: Dict[str, Any], now) -> bool:
+    return row['heartbeat_at'] < now - HEARTBEAT_TIMEOUT or (
+        row['state'] == 'running' and row['started_at'] < now - timedelta(seconds=settings.ANALYSIS_JOB_TIMEOUT))
+
+
+def _expire_stale(now) -> None:
+    AnalysisJob.objects.filter(
+        Q(heartbeat_at__lt=now - HEARTBEAT_TIMEOUT)
+        | Q(state='running', started_at__lt=now - timedelta(seconds=settings.ANALYSIS_JOB_TIMEOUT)),
+        state__in=['queued', 'running'],
+    ).update(state='abandoned', finished_at=now)
+
+
+def enqueue(user, client: str, cost: float) -> AnalysisJob:
+    lane = lane_for(user)
+    with transaction.atomic():
+        # Serialize tag assignment with dispatch on databases that support row locks.
+        list(AnalysisJob.objects.select_for_update().filter(state__in=['queued', 'running']).values_list('id'))
+        # Virtual time is the start tag of the most recently dispatched run.
+        virtual_now = AnalysisJob.objects.filter(started_at__isnull=False).aggregate(v=Max('virtual_start'))['v'] or 0.0
+        lane_finish = AnalysisJob.objects.filter(lane=lane).exclude(state='abandoned').aggregate(
+            v=Max('virtual_finish'))['v'] or 0.0
+        start = max(virtual_now, lane_finish)
+        return AnalysisJob.objects.create(
+            user=user if getattr(user, 'is_authenticated', False) else None,
+            client=client,
+            lane=lane,
+            cost=cost,
+            virtual_start=start,
+            virtual_finish=start + cost / LANE_WEIGHTS[lane],
+        )
+
+
+def try_start(job: AnalysisJob) -> bool:
+    """Start ``job`` if it is next in fair-queuing order and a slot is free."""
+    now = timezone.now()
+    with transaction.atomic():
+        live = list(
+            AnalysisJob.objects.select_for_update()
+            .filter(state__in=['queued', 'running'])
+            .order_by('virtual_start', 'id')
+            .values('id', 'client', 'lane', 'state', 'heartbeat_at', 'started_at')
+        )
+        _expire_stale(now)
+        running: Dict[str, int] = {}
+        live = [row for row in live if not _is_stale(row, now)]
+        for row in live:
+            if row['state'] == 'running':
+                running[row['client']] = running.get(row['client'], 0) + 1
+
+        if sum(running.values()) < settings.ANALYSIS_MAX_CONCURRENT:
+            for row in live:
+                if row['state'] != 'queued':
+                    continue
+                if running.get(row['client'], 0) >= USER_CONCURRENCY[row['lane']]:
+                    continue
+                if row['id'] == job.id:
+                    AnalysisJob.objects.filter(pk=job.pk).update(state='running', started_at=now, heartbeat_at=now)
+                    job.state, job.started_at = 'running', now
+                    return True
+                break
+        AnalysisJob.objects.filter(pk=job.pk, state='queued').update(heartbeat_at=now)
+    return False
+
+
+def finish(job: AnalysisJob, state: str = 'done') -> None:
+    now = timezone.now()
+    AnalysisJob.objects.filter(pk=job.pk, state__in=['queued', 'running']).update(state=state, finished_at=now)
+    # Keep the table to recent history; a cheap indexed delete on each completion
+    AnalysisJob.objects.filter(enqueued_at__lt=now - RETENTION).exclude(state__in=['queued', 'running']).delete()
+
+
+def _heartbeat(job_id: int, stop: threading.Event) -> None:
+    """Keep a running job's heartbeat fresh until ``stop`` is set."""
+    try:
+        while not stop.wait(RUNNING_HEARTBEAT_SECONDS):
+            try:
+                AnalysisJob.objects.filter(pk=job_id, state='running').update(heartbeat_at=timezone.now())
+            except Exception as e:
+                logger.warning(f"Could not refresh heartbeat of analysis job {job_id}: {e}")
+    finally:
+        connection.close()
+
+
+@contextmanager
+def analysis_slot(user, client: str, cost: float):
+    """Wait for a research slot for ``user``; raises AnalysisQueueTimeout after ANALYSIS_QUEUE_MAX_WAIT seconds."""
+    job = enqueue(user, client, cost)
+    deadline = time.monotonic() + settings.ANALYSIS_QUEUE_MAX_WAIT
+    while not try_start(job):
+        if time.monotonic() >= deadline:
+            finish(job, state='abandoned')
+            raise AnalysisQueueTimeout(f"No analysis slot within {settings.ANALYSIS_QUEUE_MAX_WAIT}s")
+        time.sleep(POLL_SECONDS * random.uniform(0.8, 1.2))
+    waited = (job.started_at - job.enqueued_at).total_seconds()
+    if waited >= POLL_SECONDS:
+        logger.info(f"{job.lane} analysis for {client} started after {waited:.1f}s in queue")
+    stop = threading.Event()
+    ticker = threading.Thread(target=_heartbeat, args=(job.pk, stop), name=f'analysis-heartbeat-{job.pk}', daemon=True)
+    ticker.start()
+    try:
+        yield job
+    finally:
+        stop.set()
+        ticker.join()
+        finish(job)
+
+
+def _client_key(request) -> str:
+    if request.user and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    return f"anon:{forwarded.split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')}"
+
+
+def scheduled_analysis(view_method):
+    """Run an analysis view method inside a scheduler slot; 503 if none frees up in time.
+
+    The slot's AnalysisJob is available to the view as ``request.analysis_job``.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        # A JSON array (or scalar) body is not an analysis request; don't queue it
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Request body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        markets = request.data.get('target_markets')
+        cost = job_cost(request.data.get('cycles', '3'), len(markets) if isinstance(markets, list) else 1)
+        try:
+            with analysis_slot(request.user, _client_key(request), cost) as job:
+                request.analysis_job = job
+                return view_method(self, request, *args, **kwargs)
+        except AnalysisQueueTimeout as e:
+            logger.warning(f"Analysis queue timeout for {_client_key(request)}: {e}")
+            response = Response({'error': 'The analysis queue is full, please try again shortly'},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '60'
+            return response
+    return wrapper
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def lane_metrics() -> Dict[str, Dict[str, Any]]:
+    """Queue depth and wait times per lane; waits cover runs started in the last hour."""
+    now = timezone.now()
+    metrics = {lane: {'weight': weight, 'queued': 0, 'running': 0, 'oldest_queued_seconds': 0.0, 'started_last_hour': 0,
+                      'mean_wait_seconds': 0.0, 'p95_wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+               for lane, weight in LANE_WEIGHTS.items()}
+    waits: Dict[str, List[float]] = {lane: [] for lane in LANE_WEIGHTS}
+    live = AnalysisJob.objects.filter(state__in=['queued', 'running'], heartbeat_at__gte=now - HEARTBEAT_TIMEOUT)
+    for lane, state, enqueued_at in live.values_list('lane', 'state', 'enqueued_at'):
+        metrics[lane][state] += 1
+        if state == 'queued':
+            metrics[lane]['oldest_queued_seconds'] = max(metrics[lane]['oldest_queued_seconds'],
+                                                         (now - enqueued_at).total_seconds())
+    started = AnalysisJob.objects.filter(started_at__gte=now - METRICS_WINDOW)
+    for lane, enqueued_at, started_at in started.values_list('lane', 'enqueued_at', 'started_at'):
+        waits[lane].append((started_at - enqueued_at).total_seconds())
+    for lane, values in waits.items():
+        if values:
+            metrics[lane].update({
+                'started_last_hour': len(values),
+                'mean_wait_seconds': sum(values) / len(values),
+                'p95_wait_seconds': _percentile(values, 0.95),
+                'max_wait_seconds': max(values),
+            })
+    return metrics
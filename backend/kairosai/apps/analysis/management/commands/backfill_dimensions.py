@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from apps.analysis.dimensions import resolve_industry, resolve_market
+from apps.analysis.models import MarketReport, MultiMarketReport
+
+
+class Command(BaseCommand):
+    help = 'Resolve industry / target market free text into the normalized Industry and Market tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='Re-resolve rows that already have dimension keys.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        reports = MarketReport.objects.only('id', 'industry', 'target_market', 'normalized_industry', 'normalized_market')
+        if not options['all']:
+            reports = reports.filter(normalized_industry__isnull=True) | reports.filter(normalized_market__isnull=True)
+
+        # Resolve each distinct spelling once rather than once per row
+        industries = {}
+        markets = {}
+        batch = []
+        updated = 0
+        for report in reports.order_by('id').iterator(chunk_size=batch_size):
+            if report.industry not in industries:
+                industries[report.industry] = resolve_industry(report.industry)
+            if report.target_market not in markets:
+                markets[report.target_market] = resolve_market(report.target_market)
+            report.normalized_industry = industries[report.industry]
+            report.normalized_market = markets[report.target_market]
+            batch.append(report)
+            if len(batch) >= batch_size:
+                MarketReport.objects.bulk_update(batch, ['normalized_industry', 'normalized_market'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            MarketReport.objects.bulk_update(batch, ['normalized_industry', 'normalized_market'])
+            updated += len(batch)
+
+        multi_updated = 0
+        multi_reports = MultiMarketReport.objects.all()
+        if not options['all']:
+            multi_reports = multi_reports.filter(normalized_industry__isnull=True)
+        for multi_report in multi_reports.iterator(chunk_size=batch_size):
+            if multi_report.industry not in industries:
+                industries[multi_report.industry] = resolve_industry(multi_report.industry)
+            multi_report.normalized_industry = industries[multi_report.industry]
+            multi_report.save(update_fields=['normalized_industry'])
+            multi_report.sync_normalized_markets()
+            multi_updated += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {updated} market reports and {multi_updated} multi-market reports '
+            f'({len(industries)} industry spellings, {len(markets)} market spellings).'
+        ))
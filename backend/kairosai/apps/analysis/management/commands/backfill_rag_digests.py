@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from apps.analysis.models import MarketReport
+from apps.analysis.rag_digest import DIGEST_SOURCE_FIELDS, build_rag_digest
+
+
+class Command(BaseCommand):
+    help = 'Build the stored chat digest for completed reports saved before digests existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--all', action='store_true', help='Rebuild digests that already exist.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        reports = MarketReport.objects.filter(status='completed').only('id', 'created_at', *DIGEST_SOURCE_FIELDS)
+        if not options['all']:
+            reports = reports.filter(rag_digest='')
+
+        batch = []
+        updated = 0
+        for report in reports.order_by('id').iterator(chunk_size=batch_size):
+            report.rag_digest = build_rag_digest(report)
+            batch.append(report)
+            if len(batch) >= batch_size:
+                # bulk_update leaves updated_at alone, so cached exports stay valid
+                MarketReport.objects.bulk_update(batch, ['rag_digest'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            MarketReport.objects.bulk_update(batch, ['rag_digest'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Built chat digests for {updated} market reports.'))
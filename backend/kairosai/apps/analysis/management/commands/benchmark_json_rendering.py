@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from apps.analysis.middleware import HAS_BROTLI, compress
+from apps.analysis.models import MarketReport
+from apps.analysis.renderers import ORJSONRenderer
+from apps.analysis.serializers import MarketReportSerializer
+
+
+def _sample_payload():
+    """Serialized report shaped like a large completed analysis."""
+    rng = random.Random(0)
+    vocabulary = ('market demand growth segment pricing channel partner regulatory competitor revenue '
+                  'adoption enterprise consumer logistics margin retention acquisition brand local '
+                  'distribution compliance forecast share expansion risk').split()
+
+    def text(words):
+        return ' '.join(rng.choice(vocabulary) for _ in range(words)) + '.'
+
+    report = MarketReport(
+        id=1, analysis_id='bench', status='completed', company_name='Benchmark Co',
+        industry='Software', target_market='Germany',
+        research_report=' '.join(text(60) for _ in range(600)),
+        full_content=' '.join(text(60) for _ in range(300)),
+        detailed_scores={f'metric_{i}': {'score': i % 10, 'rationale': text(40)} for i in range(40)},
+        competitor_analysis=[
+            {'name': f'Competitor {i}', 'market_share': f'{i}%', 'strengths': [text(30) for _ in range(3)], 'weaknesses': [text(30) for _ in range(2)]}
+            for i in range(30)
+        ],
+        segment_arbitrage=[{'segment': f'Segment {i}', 'gap_score': i / 3, 'analysis': text(120)} for i in range(25)],
+        key_insights=[{'title': f'Insight {i}', 'description': text(80), 'priority': 'high'} for i in range(12)],
+    )
+    return MarketReportSerializer(report).data
+
+
+class Command(BaseCommand):
+    help = 'Compare serialization time and bytes on the wire for the stock and orjson renderers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--report-id', type=int, help='Benchmark an existing report instead of the built-in sample.')
+
+    def handle(self, *args, **options):
+        if options['report_id']:
+            report = MarketReport.objects.filter(pk=options['report_id']).first()
+            if report is None:
+                raise CommandError(f"Report {options['report_id']} not found")
+            data = MarketReportSerializer(report).data
+        else:
+            data = _sample_payload()
+
+        iterations = max(1, options['iterations'])
+        header = f"{'renderer':<16}{'ms/render':>10}{'raw KB':>10}{'gzip KB':>10}{'gzip ms':>10}"
+        if HAS_BROTLI:
+            header += f"{'br KB':>10}{'br ms':>10}"
+        self.stdout.write(header)
+
+        for name, renderer in (('JSONRenderer', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer())):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                body = renderer.render(data)
+            render_ms = (time.perf_counter() - start) * 1000 / iterations
+
+            start = time.perf_counter()
+            gzipped = compress(body, 'gzip')
+            gzip_ms = (time.perf_counter() - start) * 1000
+            line = f"{name:<16}{render_ms:>10.2f}{len(body) / 1024:>10.1f}{len(gzipped) / 1024:>10.1f}{gzip_ms:>10.2f}"
+            if HAS_BROTLI:
+                start = time.perf_counter()
+                compressed = compress(body, 'br')
+                br_ms = (time.perf_counter() - start) * 1000
+                line += f"{len(compressed) / 1024:>10.1f}{br_ms:>10.2f}"
+            self.stdout.write(line)
@@ -0,0 +1,125 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ai_agents.number_extractor import extract_numbers, extract_values
+from apps.analysis.models import MarketReport
+
+
+def _legacy_extract(text):
+    """The previous per-pattern extractor, kept here as the benchmark baseline."""
+    extracted_data = {}
+    market_size_patterns = [
+        r'\$([0-9,.]+)\s*(billion|million|B|M)\s*(TAM|market|size)',
+        r'market.*size.*\$([0-9,.]+)\s*(billion|million|B|M)',
+        r'(\$[0-9,.]+\s*(?:billion|million|B|M)).*market'
+    ]
+    competitor_patterns = [
+        r'([0-9]+)\s*(?:major|key|main)?\s*competitors',
+        r'competitors.*([0-9]+)',
+        r'([0-9]+)\s*companies.*competing'
+    ]
+    for pattern in market_size_patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            extracted_data['market_size_mentions'] = matches[:3]
+            break
+    growth_matches = re.findall(r'([0-9,.]+)%', text)
+    if growth_matches:
+        extracted_data['percentage_mentions'] = [float(m.replace(',', '')) for m in growth_matches[:5]]
+    for pattern in competitor_patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            extracted_data['competitor_counts'] = [int(m) for m in matches[:3]]
+            break
+    return extracted_data
+
+
+VOCABULARY = ('buyers regional distribution channel pricing incumbents regulation adoption enterprise '
+              'procurement logistics partners demand segment retention subscription onboarding').split()
+
+FIGURE_TEMPLATES = [
+    'The {w} market size is estimated at ${n}.{d} billion with {w} {w} across the region.',
+    'Analysts expect {n}% annual growth in {w} {w} over the next five years.',
+    'There are {c} major competitors, and the top three hold a {n}% market share.',
+    'Obtaining the required licenses typically takes {c}-{c2} months for foreign entrants.',
+    'Year 1 revenue of ${n}00K is realistic for {c} locations given {w} {w}.',
+    '{w} {w} {w} {w} {w} {w} {w} {w} {w} {w} {w} {w}.',
+]
+
+PROSE_SENTENCES = [
+    'Local competitors focus on price and service quality in every region.',
+    'The market rewards vendors that localize onboarding and support, and the size of the opportunity depends on channel reach.',
+    'Customer acquisition costs rose 14% as digital advertising became crowded.',
+    'Procurement cycles at enterprise buyers remain long and relationship driven.',
+]
+
+
+def _dense_report(size_kb):
+    """Figures in most sentences, short sections."""
+    rng = random.Random(0)
+    parts, size = [], 0
+    while size < size_kb * 1024:
+        template = rng.choice(FIGURE_TEMPLATES)
+        sentence = re.sub(r'\{w\}', lambda _: rng.choice(VOCABULARY), template).format(
+            n=rng.randint(1, 40), d=rng.randint(0, 9), c=rng.randint(2, 12), c2=rng.randint(13, 24),
+        )
+        parts.append(sentence)
+        size += len(sentence) + 1
+        if rng.random() < 0.1:
+            parts.append('\n\n## Section\n')
+    return ' '.join(parts)
+
+
+def _prose_report(size_kb, paragraph_chars):
+    """Long deep-research paragraphs that mention markets and competitors but few matching figures."""
+    rng = random.Random(1)
+    paragraphs, size = [], 0
+    while size < size_kb * 1024:
+        sentences, length = [], 0
+        while length < paragraph_chars:
+            sentence = rng.choice(PROSE_SENTENCES)
+            sentences.append(sentence)
+            length += len(sentence) + 1
+        paragraph = ' '.join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return '\n\n'.join(paragraphs)
+
+
+class Command(BaseCommand):
+    help = 'Compare the single-pass number extractor with the legacy regex extractor on large reports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-kb', type=int, default=150, help='Size of each generated sample report.')
+        parser.add_argument('--paragraph-chars', type=int, default=8000, help='Paragraph length of the prose sample.')
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--report-id', type=int, help='Benchmark an existing report instead of the generated samples.')
+
+    def handle(self, *args, **options):
+        if options['report_id']:
+            report = MarketReport.objects.filter(pk=options['report_id']).only('research_report').first()
+            if report is None:
+                raise CommandError(f"Report {options['report_id']} not found")
+            samples = [(f"report {report.pk}", report.research_report or '')]
+        else:
+            samples = [
+                ('dense', _dense_report(options['size_kb'])),
+                ('prose', _prose_report(options['size_kb'], options['paragraph_chars'])),
+            ]
+
+        iterations = max(1, options['iterations'])
+        self.stdout.write(f"{'sample':<12}{'KB':>6}{'values':>8}{'extractor':>14}{'ms/run':>10}{'MB/s':>8}")
+        for label, text in samples:
+            values = len(extract_values(text))
+            for name, extractor in (('legacy', _legacy_extract), ('single-pass', extract_numbers)):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    extractor(text)
+                elapsed = (time.perf_counter() - start) / iterations
+                self.stdout.write(
+                    f"{label:<12}{len(text) / 1024:>6.0f}{values:>8}{name:>14}"
+                    f"{elapsed * 1000:>10.1f}{len(text) / 1e6 / elapsed:>8.1f}"
+                )
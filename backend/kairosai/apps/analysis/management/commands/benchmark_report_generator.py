@@ -0,0 +1,81 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analysis.models import MarketReport
+from apps.analysis.report_views import REPORT_TYPES
+
+
+def _sample_report():
+    """Unsaved report with every field the generators read populated."""
+    return MarketReport(
+        company_name='Benchmark Co',
+        industry='Software',
+        target_market='Germany',
+        company_size='50-200',
+        annual_revenue='$10M-$50M',
+        dashboard_data={
+            'market_opportunity_score': 7,
+            'entry_complexity_score': 5,
+            'competitive_intensity': 'Medium',
+            'revenue_potential': '$5M-$12M',
+        },
+        revenue_projections={'year_1': '$1.2M', 'year_3': '$6.5M', 'market_share_y1': '0.4%', 'market_share_y3': '2.1%'},
+        key_insights=[
+            {'title': f'Insight {i}', 'description': 'Demand is growing steadily across mid-market buyers. ' * 4,
+             'priority': 'high' if i % 2 else 'medium', 'type': 'risk' if i % 3 == 0 else 'opportunity'}
+            for i in range(8)
+        ],
+        recommended_actions={
+            'immediate': ['Register local entity', 'Hire country manager'],
+            'short_term': ['Launch pilot with three design partners'],
+            'long_term': ['Expand to DACH region'],
+        },
+    )
+
+
+class Command(BaseCommand):
+    help = 'Report ms per render and peak memory for each export type.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--report-id', type=int, help='Render an existing report instead of the built-in sample.')
+        parser.add_argument('--types', help='Comma-separated export types (default: all).')
+
+    def handle(self, *args, **options):
+        if options['report_id']:
+            report = MarketReport.objects.filter(pk=options['report_id']).first()
+            if report is None:
+                raise CommandError(f"Report {options['report_id']} not found")
+        else:
+            report = _sample_report()
+
+        types = options['types'].split(',') if options['types'] else list(REPORT_TYPES)
+        unknown = [t for t in types if t not in REPORT_TYPES]
+        if unknown:
+            raise CommandError(f"Unknown report type(s): {', '.join(unknown)}")
+
+        iterations = max(1, options['iterations'])
+        self.stdout.write(f"{'type':<20}{'first ms':>10}{'ms/render':>12}{'peak KiB':>10}{'bytes':>10}")
+        for report_type in types:
+            generator = REPORT_TYPES[report_type]['generator']
+
+            # First call includes building the per-process templates
+            start = time.perf_counter()
+            output = generator(report)
+            first_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                generator(report)
+            per_render_ms = (time.perf_counter() - start) * 1000 / iterations
+
+            tracemalloc.start()
+            generator(report)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{report_type:<20}{first_ms:>10.1f}{per_render_ms:>12.1f}{peak / 1024:>10.0f}{len(output):>10}"
+            )
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0005_marketreport_is_shared_marketreport_share_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Industry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Industries',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Market',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MarketAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='analysis.market')),
+            ],
+            options={
+                'verbose_name_plural': 'Market Aliases',
+                'ordering': ['alias'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndustryAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('industry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='analysis.industry')),
+            ],
+            options={
+                'verbose_name_plural': 'Industry Aliases',
+                'ordering': ['alias'],
+            },
+        ),
+        migrations.AddField(
+            model_name='marketreport',
+            name='normalized_industry',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='market_reports', to='analysis.industry'),
+        ),
+        migrations.AddField(
+            model_name='marketreport',
+            name='normalized_market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='market_reports', to='analysis.market'),
+        ),
+        migrations.AddField(
+            model_name='multimarketreport',
+            name='normalized_industry',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='multi_market_reports', to='analysis.industry'),
+        ),
+        migrations.AddField(
+            model_name='multimarketreport',
+            name='normalized_markets',
+            field=models.ManyToManyField(blank=True, related_name='multi_market_reports', to='analysis.market'),
+        ),
+    ]
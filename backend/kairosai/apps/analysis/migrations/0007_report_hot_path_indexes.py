@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0006_industry_market_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatconversation',
+            index=models.Index(fields=['user', '-updated_at'], name='chat_conv_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['conversation', 'created_at'], name='chat_msg_conv_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketreport',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='mr_user_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketreport',
+            index=models.Index(fields=['-created_at'], name='mr_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketreport',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['normalized_industry', 'normalized_market'], name='mr_completed_dimension_idx'),
+        ),
+    ]
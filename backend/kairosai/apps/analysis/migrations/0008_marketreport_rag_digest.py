@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0007_report_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketreport',
+            name='rag_digest',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0009_chatconversation_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMRateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, unique=True)),
+                ('requests', models.FloatField()),
+                ('tokens', models.FloatField()),
+                ('refilled_at', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'LLM Rate Limit Bucket',
+                'verbose_name_plural': 'LLM Rate Limit Buckets',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0011_analysis_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=50)),
+                ('tier', models.CharField(max_length=20)),
+                ('model', models.CharField(max_length=100)),
+                ('variant', models.CharField(default='control', max_length=20)),
+                ('latency_ms', models.IntegerField()),
+                ('prompt_tokens', models.IntegerField(blank=True, null=True)),
+                ('completion_tokens', models.IntegerField(blank=True, null=True)),
+                ('cost_usd', models.FloatField(blank=True, null=True)),
+                ('succeeded', models.BooleanField(default=True)),
+                ('validation_failed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'LLM Call',
+                'verbose_name_plural': 'LLM Calls',
+                'indexes': [models.Index(fields=['created_at', 'task'], name='llm_call_created_task_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0012_llm_call'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmcall',
+            name='cached_tokens',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='llmcall',
+            name='prompt_template',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
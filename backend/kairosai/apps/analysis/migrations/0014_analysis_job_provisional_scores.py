@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0013_llm_call_prompt_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='final_scores',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='provisional_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='provisional_iteration',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='provisional_scores',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='score_delta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -4,6 +4,73 @@ import json
 
 User = get_user_model()
 
+
+class Industry(models.Model):
+    """Normalized industry dimension shared by reports and benchmarks"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'Industries'
+
+    def __str__(self):
+        return self.name
+
+
+class IndustryAlias(models.Model):
+    """Normalized free-text spelling that resolves to an Industry"""
+    alias = models.CharField(max_length=100, unique=True)
+    industry = models.ForeignKey(Industry, on_delete=models.CASCADE, related_name='aliases')
+
+    class Meta:
+        ordering = ['alias']
+        verbose_name_plural = 'Industry Aliases'
+
+    def __str__(self):
+        return f"{self.alias} → {self.industry.name}"
+
+
+class Market(models.Model):
+    """Normalized target market dimension shared by reports and benchmarks"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class MarketAlias(models.Model):
+    """Normalized free-text spelling that resolves to a Market"""
+    alias = models.CharField(max_length=100, unique=True)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='aliases')
+
+    class Meta:
+        ordering = ['alias']
+        verbose_name_plural = 'Market Aliases'
+
+    def __str__(self):
+        return f"{self.alias} → {self.market.name}"
+
+
+def _remember_dimension_source(instance, fields):
+    """Keep the free text the dimension keys were resolved from, to spot edits on save."""
+    instance._dimension_source = {name: instance.__dict__[name] for name in fields if name in instance.__dict__}
+
+
+def _dimension_stale(instance, field, dimension_id) -> bool:
+    value = getattr(instance, field)
+    source = getattr(instance, '_dimension_source', {})
+    if field in source and source[field] != value:
+        return True
+    return dimension_id is None and bool(value)
+
+
 class MarketReport(models.Model):
     """Model to store generated market analysis reports"""
     
@@ -36,6 +103,10 @@ class MarketReport(models.Model):
     website = models.URLField(blank=True, null=True)
     current_positioning = models.TextField(blank=True)
     brand_description = models.TextField(blank=True)
+
+    # Normalized dimensions resolved from industry / target_market
+    normalized_industry = models.ForeignKey(Industry, on_delete=models.SET_NULL, null=True, blank=True, related_name='market_reports')
+    normalized_market = models.ForeignKey(Market, on_delete=models.SET_NULL, null=True, blank=True, related_name='market_reports')
     
     # Additional company details (optional fields from AnalysisForm)
     customer_segment = models.CharField(max_length=50, blank=True, null=True)
@@ -70,6 +141,7 @@ class MarketReport(models.Model):
     # Executive summary and content for RAG
     executive_summary = models.TextField(blank=True)
     full_content = models.TextField(blank=True)  # Full text content for RAG
+    rag_digest = models.TextField(blank=True)  # Compact chat context, rebuilt on save (see rag_digest.py)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -80,9 +152,46 @@ class MarketReport(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Market Report'
         verbose_name_plural = 'Market Reports'
+        indexes = [
+            # "My completed reports, newest first" - dashboard, report lists, chat RAG
+            models.Index(fields=['user', 'status', '-created_at'], name='mr_user_status_recent_idx'),
+            # Admin report listing across all users
+            models.Index(fields=['-created_at'], name='mr_recent_idx'),
+            # Benchmarks aggregate completed reports per normalized dimension
+            models.Index(
+                fields=['normalized_industry', 'normalized_market'],
+                name='mr_completed_dimension_idx',
+                condition=models.Q(status='completed'),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.company_name} - {self.target_market} ({self.analysis_type})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        _remember_dimension_source(instance, ('industry', 'target_market'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Partial saves (update_fields) leave the dimension keys alone
+        if kwargs.get('update_fields') is None:
+            from .dimensions import resolve_industry, resolve_market
+            if _dimension_stale(self, 'industry', self.normalized_industry_id):
+                self.normalized_industry = resolve_industry(self.industry)
+            if _dimension_stale(self, 'target_market', self.normalized_market_id):
+                self.normalized_market = resolve_market(self.target_market)
+            _remember_dimension_source(self, ('industry', 'target_market'))
+        # Rebuild the chat digest when a completed report's digested content may have changed
+        update_fields = kwargs.get('update_fields')
+        if self.status == 'completed':
+            from .rag_digest import DIGEST_SOURCE_FIELDS, build_rag_digest
+            if update_fields is None or DIGEST_SOURCE_FIELDS.intersection(update_fields):
+                self.rag_digest = build_rag_digest(self)
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'rag_digest'}
+        super().save(*args, **kwargs)
     
     def get_summary_for_rag(self):
         """Get a summary of the report for RAG context"""
@@ -103,6 +212,8 @@ class MultiMarketReport(models.Model):
     company_name = models.CharField(max_length=200)
     industry = models.CharField(max_length=100)
     target_markets = models.JSONField(default=list)  # List of target market names
+    normalized_industry = models.ForeignKey(Industry, on_delete=models.SET_NULL, null=True, blank=True, related_name='multi_market_reports')
+    normalized_markets = models.ManyToManyField(Market, blank=True, related_name='multi_market_reports')
     comparison_matrix = models.JSONField(default=dict, blank=True)  # Side-by-side scores
     ranking = models.JSONField(default=list, blank=True)  # Ordered recommendation
     individual_reports = models.ManyToManyField(MarketReport, blank=True, related_name='multi_market_groups')
@@ -118,6 +229,25 @@ class MultiMarketReport(models.Model):
     def __str__(self):
         return f"{self.company_name} - {', '.join(self.target_markets[:3])}..."
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        _remember_dimension_source(instance, ('industry',))
+        return instance
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and _dimension_stale(self, 'industry', self.normalized_industry_id):
+            from .dimensions import resolve_industry
+            self.normalized_industry = resolve_industry(self.industry)
+            _remember_dimension_source(self, ('industry',))
+        super().save(*args, **kwargs)
+
+    def sync_normalized_markets(self):
+        """Point normalized_markets at the resolved target_markets."""
+        from .dimensions import resolve_market
+        markets = [resolve_market(name) for name in self.target_markets or [] if name]
+        self.normalized_markets.set([m for m in markets if m is not None])
+
 
 class ChatConversation(models.Model):
     """Model to store chat conversations with the AI assistant"""
@@ -125,6 +255,9 @@ class ChatConversation(models.Model):
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_conversations')
     title = models.CharField(max_length=200, blank=True)
+    # Rolling summary of every message up to and including summary_through (see chat_memory.py)
+    summary = models.TextField(blank=True)
+    summary_through = models.ForeignKey('ChatMessage', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -132,6 +265,9 @@ class ChatConversation(models.Model):
         ordering = ['-updated_at']
         verbose_name = 'Chat Conversation'
         verbose_name_plural = 'Chat Conversations'
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='chat_conv_user_recent_idx'),
+        ]
     
     def __str__(self):
         return f"Chat {self.id} - {self.user.email}"
@@ -155,6 +291,90 @@ class ChatMessage(models.Model):
         ordering = ['created_at']
         verbose_name = 'Chat Message'
         verbose_name_plural = 'Chat Messages'
+        indexes = [
+            models.Index(fields=['conversation', 'created_at'], name='chat_msg_conv_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.message_type}: {self.content[:50]}..."
+
+
+class LLMRateLimitBucket(models.Model):
+    """Token-bucket state for one LLM model, shared by every worker process (see ai_agents/rate_limiter.py)"""
+    model = models.CharField(max_length=100, unique=True)
+    requests = models.FloatField()  # Requests available now
+    tokens = models.FloatField()  # Tokens available now; negative after an oversized request
+    refilled_at = models.FloatField()  # Unix time the levels were last refilled
+
+    class Meta:
+        verbose_name = 'LLM Rate Limit Bucket'
+        verbose_name_plural = 'LLM Rate Limit Buckets'
+
+    def __str__(self):
+        return f"{self.model}: {self.requests:.0f} requests, {self.tokens:.0f} tokens"
+
+
+class AnalysisJob(models.Model):
+    """A research run admitted through the tier-aware scheduler (see analysis/job_scheduler.py)"""
+    STATES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('abandoned', 'Abandoned'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='analysis_jobs')
+    client = models.CharField(max_length=100)  # Per-user concurrency key; the remote address for anonymous runs
+    lane = models.CharField(max_length=20, choices=User.TIER_CHOICES)
+    cost = models.FloatField()  # Expected research minutes
+    virtual_start = models.FloatField()  # Fair-queuing tags; lower start tags are dispatched first
+    virtual_finish = models.FloatField()
+    state = models.CharField(max_length=20, choices=STATES, default='queued')
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(auto_now_add=True)  # Last poll while queued, last ticker beat while running
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Headline scores from partial research while the run is in flight (see analysis/speculative.py)
+    provisional_scores = models.JSONField(null=True, blank=True)
+    provisional_iteration = models.IntegerField(default=0)
+    provisional_at = models.DateTimeField(null=True, blank=True)
+    final_scores = models.JSONField(null=True, blank=True)
+    score_delta = models.JSONField(null=True, blank=True)  # final - last provisional, per score field
+
+    class Meta:
+        verbose_name = 'Analysis Job'
+        verbose_name_plural = 'Analysis Jobs'
+        indexes = [
+            models.Index(fields=['state', 'virtual_start'], name='analysis_job_state_vstart_idx'),
+            models.Index(fields=['enqueued_at'], name='analysis_job_enqueued_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.lane} job for {self.client} ({self.state})"
+
+
+class LLMCall(models.Model):
+    """One routed model call with its routing decision, for comparing routes (see ai_agents/model_router.py)"""
+    task = models.CharField(max_length=50)
+    tier = models.CharField(max_length=20)  # Cycles tier, or 'default' for tasks without one
+    model = models.CharField(max_length=100)
+    variant = models.CharField(max_length=20, default='control')  # 'experiment' when an A/B route was drawn
+    prompt_template = models.CharField(max_length=100, blank=True)  # Versioned id of the static prompt prefix
+    latency_ms = models.IntegerField()
+    prompt_tokens = models.IntegerField(null=True, blank=True)
+    completion_tokens = models.IntegerField(null=True, blank=True)
+    cached_tokens = models.IntegerField(null=True, blank=True)  # Prompt tokens served from the provider's prompt cache
+    cost_usd = models.FloatField(null=True, blank=True)  # Null when the provider reported no usage
+    succeeded = models.BooleanField(default=True)
+    validation_failed = models.BooleanField(default=False)  # Output needed a JSON re-ask or was unusable
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'LLM Call'
+        verbose_name_plural = 'LLM Calls'
+        indexes = [
+            models.Index(fields=['created_at', 'task'], name='llm_call_created_task_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} → {self.model} ({self.latency_ms} ms)"
@@ -0,0 +1,72 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPagination:
+    """
+    Keyset (seek) pagination over a (timestamp, id) pair, newest first.
+
+    Each page is a single indexed range scan regardless of how deep the client
+    has paged, and no COUNT query is issued. Pagination is opt-in: views only
+    paginate when the request carries ``page_size`` or ``cursor``.
+    """
+    default_page_size = 20
+    max_page_size = 100
+
+    def __init__(self, ordering_field='created_at'):
+        self.ordering_field = ordering_field
+        self.next_cursor = None
+        self.has_more = False
+
+    @staticmethod
+    def is_requested(request):
+        return 'cursor' in request.query_params or 'page_size' in request.query_params
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.ordering_field)
+        raw = f"{value.isoformat()}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, pk = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+            timestamp = parse_datetime(value)
+            if not isinstance(timestamp, datetime):
+                raise ValueError(value)
+            return timestamp, int(pk)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise InvalidCursor(str(e))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get('page_size', self.default_page_size))
+        except (TypeError, ValueError):
+            size = self.default_page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request):
+        """Return one page of objects; raises InvalidCursor for a malformed cursor."""
+        field = self.ordering_field
+        queryset = queryset.order_by(f'-{field}', '-pk')
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            timestamp, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'pk__lt': pk})
+            )
+
+        page_size = self.get_page_size(request)
+        page = list(queryset[:page_size + 1])
+        self.has_more = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_more else None
+        return page
@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import Dict
 
 from .models import MarketReport, MultiMarketReport
+from .job_scheduler import scheduled_analysis
 from apps.accounts.permissions import HasAnalysisQuota
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,7 @@ class MultiMarketAnalysisView(APIView):
     """Run analysis for 2-5 markets in parallel and return comparison."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @scheduled_analysis
     def post(self, request):
         try:
             company_name = request.data.get('company_name')
@@ -118,6 +120,7 @@ class MultiMarketAnalysisView(APIView):
                 status='completed',
             )
             multi_report.individual_reports.set(individual_reports)
+            multi_report.sync_normalized_markets()
 
             return Response({
                 'id': multi_report.id,
@@ -155,77 +158,62 @@ class MultiMarketAnalysisView(APIView):
 
 
 class ScenarioModelView(APIView):
-    """Re-score a report with modified assumptions."""
+    """Re-score a report with modified assumptions, or a grid of them, using the local scenario model."""
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
         try:
             report_id = request.data.get('report_id')
             variable_changes = request.data.get('variable_changes', {})
+            grid = request.data.get('grid')
 
             if not report_id:
                 return Response({'error': 'report_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+            if not isinstance(variable_changes, dict):
+                return Response({'error': 'variable_changes must be an object'}, status=status.HTTP_400_BAD_REQUEST)
 
-            report = MarketReport.objects.filter(id=report_id, user=request.user).first()
+            report = MarketReport.objects.filter(id=report_id, user=request.user).only('id', 'detailed_scores').first()
             if not report:
                 return Response({'error': 'Report not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            from apps.ai_agents.scoring_agent import MarketScoringAgent
-            scoring_agent = MarketScoringAgent()
+            from apps.ai_agents.scenario_engine import ScenarioError, run_grid, run_scenario
 
             original_scores = report.detailed_scores or {}
+            original = {
+                'market_opportunity_score': original_scores.get('market_opportunity_score', 5.0),
+                'competitive_intensity_score': original_scores.get('competitive_intensity_score', 5.0),
+                'entry_complexity_score': original_scores.get('entry_complexity_score', 5.0),
+                'revenue_potential_y1': original_scores.get('revenue_potential_y1', 'N/A'),
+                'revenue_potential_y3': original_scores.get('revenue_potential_y3', 'N/A'),
+            }
 
-            # Modify assumptions based on variable_changes
-            modified_context = f"""
-Original analysis for {report.company_name} entering {report.target_market} ({report.industry}).
-
-Original Scores:
-- Market Opportunity: {original_scores.get('market_opportunity_score', 'N/A')}/10
-- Competitive Intensity: {original_scores.get('competitive_intensity_score', 'N/A')}/10
-- Entry Complexity: {original_scores.get('entry_complexity_score', 'N/A')}/10
-
-The user wants to model a scenario with these changes:
-"""
-            for key, value in variable_changes.items():
-                modified_context += f"- {key}: {value}\n"
-
-            modified_context += """
-Re-evaluate the scores considering these changes. Provide updated scores reflecting the scenario adjustments.
-"""
-            # Use scoring agent to re-score
-            adjusted_scores = scoring_agent.score_research_report(modified_context, {
-                'company_name': report.company_name,
-                'industry': report.industry,
-                'target_market': report.target_market,
-            })
+            try:
+                if grid is not None:
+                    return Response({
+                        'report_id': report_id,
+                        'original_scores': original,
+                        'scenarios': run_grid(original_scores, grid),
+                    }, status=status.HTTP_200_OK)
+                result = run_scenario(original_scores, variable_changes)
+            except ScenarioError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            adjusted_scores = result['adjusted_scores']
 
             # Calculate deltas
             deltas = {}
             for key in ['market_opportunity_score', 'competitive_intensity_score', 'entry_complexity_score']:
-                orig = original_scores.get(key, 5.0)
-                adj = adjusted_scores.get(key, 5.0)
                 try:
-                    deltas[key] = round(float(adj) - float(orig), 1)
+                    deltas[key] = round(float(adjusted_scores[key]) - float(original[key]), 1)
                 except (ValueError, TypeError):
                     deltas[key] = 0
 
             return Response({
                 'report_id': report_id,
-                'original_scores': {
-                    'market_opportunity_score': original_scores.get('market_opportunity_score', 5.0),
-                    'competitive_intensity_score': original_scores.get('competitive_intensity_score', 5.0),
-                    'entry_complexity_score': original_scores.get('entry_complexity_score', 5.0),
-                    'revenue_potential_y1': original_scores.get('revenue_potential_y1', 'N/A'),
-                    'revenue_potential_y3': original_scores.get('revenue_potential_y3', 'N/A'),
-                },
-                'adjusted_scores': {
-                    'market_opportunity_score': adjusted_scores.get('market_opportunity_score', 5.0),
-                    'competitive_intensity_score': adjusted_scores.get('competitive_intensity_score', 5.0),
-                    'entry_complexity_score': adjusted_scores.get('entry_complexity_score', 5.0),
-                    'revenue_potential_y1': adjusted_scores.get('revenue_potential_y1', 'N/A'),
-                    'revenue_potential_y3': adjusted_scores.get('revenue_potential_y3', 'N/A'),
-                },
+                'original_scores': original,
+                'adjusted_scores': adjusted_scores,
                 'deltas': deltas,
+                'contributions': result['contributions'],
                 'variable_changes': variable_changes,
             }, status=status.HTTP_200_OK)
 
@@ -238,6 +226,7 @@ class DeepDiveView(APIView):
     """Run a specific deep-dive research module on an existing report."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @scheduled_analysis
     def post(self, request):
         try:
             report_id = request.data.get('report_id')
@@ -295,17 +284,19 @@ class DeepDiveView(APIView):
 
 
 class FinancialModelView(APIView):
-    """Generate financial modeling data (sensitivity + scenarios) for a report."""
+    """Generate financial modeling data (sensitivity + scenarios) for a report via Monte Carlo simulation."""
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, report_id):
         try:
-            report = MarketReport.objects.filter(id=report_id, user=request.user).first()
+            report = MarketReport.objects.filter(id=report_id, user=request.user).only(
+                'id', 'company_name', 'industry', 'target_market',
+                'dashboard_data', 'revenue_projections', 'detailed_scores',
+            ).first()
             if not report:
                 return Response({'error': 'Report not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            from apps.ai_agents.financial_agent import FinancialModelingAgent
-            agent = FinancialModelingAgent()
+            from apps.ai_agents.revenue_simulation import build_financial_model
 
             report_data = {
                 'company_name': report.company_name,
@@ -316,14 +307,14 @@ class FinancialModelView(APIView):
                 'detailed_scores': report.detailed_scores,
             }
 
-            sensitivity = agent.generate_sensitivity_analysis(report_data)
-            scenarios = agent.generate_scenario_projections(report_data)
+            financial_model = build_financial_model(report_data)
 
-            return Response({
-                'report_id': report_id,
-                'sensitivity_analysis': sensitivity,
-                'scenario_projections': scenarios,
-            }, status=status.HTTP_200_OK)
+            # The numbers are computed locally; the LLM only adds commentary on request.
+            if request.query_params.get('narrative', '').lower() in ('1', 'true', 'yes'):
+                from apps.ai_agents.financial_agent import FinancialModelingAgent
+                financial_model['narrative'] = FinancialModelingAgent().generate_narrative(report_data, financial_model)
+
+            return Response({'report_id': report_id, **financial_model}, status=status.HTTP_200_OK)
 
         except Exception as e:
             logger.error(f"Error in financial model: {e}")
@@ -334,6 +325,7 @@ class PlaybookView(APIView):
     """Generate a market entry playbook for an existing report."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @scheduled_analysis
     def post(self, request, report_id):
         try:
             report = MarketReport.objects.filter(id=report_id, user=request.user).first()
@@ -0,0 +1,103 @@
+"""
+Background pre-rendering of report exports.
+
+Rendering is CPU-bound (ReportLab / python-pptx), so exports are produced in a
+process pool and written to the artifact store from the parent process. Jobs
+never touch the database in the worker; the report instance is pickled over.
+
+Workers are started from a forkserver, not forked from the web process: under
+gunicorn's gthread workers another thread may hold a lock (logging, the DB
+driver, the import lock) at the moment of fork(), and the child would then
+deadlock on it the first time it takes that lock.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def render_export(report_type, report):
+    from .report_views import REPORT_TYPES
+    return REPORT_TYPES[report_type]['generator'](report)
+
+
+def get_render_pool():
+    global _executor
+    workers = getattr(settings, 'REPORT_PRERENDER_WORKERS', 2)
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                mp_context=multiprocessing.get_context('forkserver'))
+        return _executor
+
+
+def _reset_pool(executor):
+    """Drop a broken pool so the next get_render_pool() starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+def prerender_report_exports(report):
+    """Queue every export type the owner's tier allows that is not already cached."""
+    from .artifact_store import artifact_path, store_artifact
+    from .report_views import REPORT_TYPES, allowed_report_types
+
+    executor = get_render_pool()
+    if executor is None or report.user_id is None:
+        return []
+
+    queued = []
+    for report_type in allowed_report_types(report.user):
+        extension = REPORT_TYPES[report_type]['extension']
+        path = artifact_path(report, report_type, extension)
+        if os.path.exists(path):
+            continue
+        with _executor_lock:
+            if path in _pending:
+                continue
+            _pending.add(path)
+
+        def _done(future, report_type=report_type, extension=extension, path=path):
+            with _executor_lock:
+                _pending.discard(path)
+            try:
+                store_artifact(report, report_type, extension, future.result())
+            except Exception as e:
+                logger.warning(f"Pre-render of {report_type} for report {report.id} failed: {e}")
+
+        try:
+            future = executor.submit(render_export, report_type, report)
+        except RuntimeError as e:
+            # Pool is shutting down or a worker died; downloads fall back to rendering
+            with _executor_lock:
+                _pending.discard(path)
+            if isinstance(e, BrokenProcessPool):
+                _reset_pool(executor)
+            logger.warning(f"Could not queue pre-render for report {report.id}: {e}")
+            continue
+        future.add_done_callback(_done)
+        queued.append(report_type)
+
+    if queued:
+        logger.info(f"Queued pre-render of {', '.join(queued)} for report {report.id}")
+    return queued
@@ -0,0 +1,116 @@
+"""
+Compact, token-efficient text digest of a report for the chat assistant.
+
+The digest is built once when a completed report is saved (see
+MarketReport.save) and stored on the report, so answering a chat message
+only concatenates stored digests. Lists are joined on one line and long
+rationales are trimmed, instead of pretty-printing the score JSON.
+"""
+from typing import Any, Dict, Iterable, List
+
+from django.utils import timezone
+
+# Fields whose change makes a stored digest stale.
+DIGEST_SOURCE_FIELDS = frozenset({
+    'status', 'company_name', 'industry', 'target_market', 'executive_summary',
+    'key_insights', 'detailed_scores', 'revenue_projections',
+})
+
+MAX_SUMMARY_CHARS = 600
+MAX_RATIONALE_CHARS = 220
+MAX_LIST_ITEMS = 5
+MAX_ITEM_CHARS = 120
+
+RATIONALES = (
+    ('market_opportunity_rationale', 'opportunity'),
+    ('competitive_intensity_rationale', 'competition'),
+    ('entry_complexity_rationale', 'complexity'),
+    ('revenue_rationale', 'revenue'),
+)
+LISTS = (
+    ('key_assumptions', 'Assumptions'),
+    ('critical_success_factors', 'Success factors'),
+    ('major_risks', 'Risks'),
+)
+# Bookkeeping fields that carry nothing useful for answering questions.
+SKIPPED_FIELDS = frozenset({'error_info', 'evidence', 'score_outliers', 'provisional'})
+
+
+def _trim(text: Any, limit: int) -> str:
+    text = ' '.join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+
+def _join(items: Iterable[Any]) -> str:
+    return '; '.join(_trim(item, MAX_ITEM_CHARS) for item in list(items)[:MAX_LIST_ITEMS] if item)
+
+
+def _insight_text(insight: Any) -> str:
+    if isinstance(insight, dict):
+        title, description = insight.get('title', ''), insight.get('description', '')
+        return f"{title}: {description}" if title and description else title or description
+    return str(insight)
+
+
+def build_rag_digest(report) -> str:
+    """Digest of a report's headline facts, scores, rationale and insights."""
+    scores: Dict[str, Any] = report.detailed_scores or {}
+    revenue: Dict[str, Any] = report.revenue_projections or {}
+    # New reports are digested before the insert sets created_at
+    created = (report.created_at or timezone.now()).date().isoformat()
+    used = set(SKIPPED_FIELDS)
+
+    lines: List[str] = [
+        f"## Market Analysis: {report.company_name} expanding to {report.target_market} ({report.industry}), {created}",
+    ]
+    if report.executive_summary:
+        lines.append(f"Summary: {_trim(report.executive_summary, MAX_SUMMARY_CHARS)}")
+
+    def score(field, suffix=''):
+        used.add(field)
+        value = scores.get(field)
+        return f"{value}{suffix}" if value not in (None, '') else None
+
+    competition = ' '.join(filter(None, [score('competitive_intensity'), score('competitive_intensity_score', '/10')]))
+    parts = [
+        ('opportunity', score('market_opportunity_score', '/10')),
+        ('competition', competition),
+        ('entry complexity', score('entry_complexity_score', '/10')),
+        ('confidence', score('confidence_level')),
+    ]
+    if any(value for _, value in parts):
+        lines.append('Scores: ' + '; '.join(f"{label} {value}" for label, value in parts if value))
+
+    revenue_parts = []
+    for label, keys in (('Y1', ('year_1', 'revenue_potential_y1')), ('Y3', ('year_3', 'revenue_potential_y3')),
+                        ('share Y1', ('market_share_y1', 'market_share_target_y1')),
+                        ('share Y3', ('market_share_y3', 'market_share_target_y3'))):
+        used.add(keys[1])
+        value = revenue.get(keys[0]) or scores.get(keys[1])
+        if value:
+            revenue_parts.append(f"{label} {value}")
+    if revenue_parts:
+        lines.append('Revenue: ' + '; '.join(revenue_parts))
+
+    reasons = []
+    for field, label in RATIONALES:
+        used.add(field)
+        if scores.get(field):
+            reasons.append(f"{label}: {_trim(scores[field], MAX_RATIONALE_CHARS)}")
+    if reasons:
+        lines.append('Why: ' + ' | '.join(reasons))
+
+    for field, label in LISTS:
+        used.add(field)
+        if isinstance(scores.get(field), list) and scores[field]:
+            lines.append(f"{label}: {_join(scores[field])}")
+
+    insights = [_insight_text(insight) for insight in report.key_insights or []]
+    if insights:
+        lines.append(f"Insights: {_join(insights)}")
+
+    other = [f"{key}: {_trim(value, MAX_ITEM_CHARS)}" for key, value in scores.items()
+             if key not in used and isinstance(value, (str, int, float)) and value != '']
+    if other:
+        lines.append('Other: ' + '; '.join(other))
+    return '\n'.join(lines)
@@ -0,0 +1,34 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Decimals, lazy translation strings, querysets, etc. - same coercions as DRF
+    return _fallback_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer backed by orjson.
+
+    orjson serializes dicts, lists, datetimes and UUIDs natively in C; anything
+    else goes through DRF's encoder. Falls back to the stock renderer when orjson
+    is not installed or a pretty-printed indent is requested.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if HAS_ORJSON else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not HAS_ORJSON or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=self.options)
@@ -1,5 +1,6 @@
 from io import BytesIO
 from datetime import datetime
+from functools import lru_cache
 
 try:
     from reportlab.lib.pagesizes import letter
@@ -21,6 +22,9 @@ try:
 except ImportError:
     HAS_PPTX = False
 
+# Bump whenever generated layouts change so cached artifacts are re-rendered
+TEMPLATE_VERSION = '1'
+
 
 def _get_score_color(score):
     """Return color based on score value (0-10)."""
@@ -42,19 +46,80 @@ def _get_go_nogo(market_score, complexity_score):
     return 'NO-GO', 'High'
 
 
+# Templates: style sheets, table styles and the base PPTX are built once per
+# process and shared by every render (they are only read during a build).
+
+@lru_cache(maxsize=None)
+def _pdf_styles():
+    base = getSampleStyleSheet()
+    label = ParagraphStyle('Label', parent=base['Normal'], fontSize=9, textColor=HexColor('#6b7280'))
+    return {
+        'title': ParagraphStyle('CustomTitle', parent=base['Title'], fontSize=20, spaceAfter=6, textColor=HexColor('#111827')),
+        'heading': ParagraphStyle('CustomHeading', parent=base['Heading2'], fontSize=14, spaceBefore=16, spaceAfter=8, textColor=HexColor('#111827')),
+        'body': ParagraphStyle('CustomBody', parent=base['Normal'], fontSize=10, leading=14, textColor=HexColor('#374151')),
+        'label': label,
+        'label_centered': ParagraphStyle('Conf', parent=label, alignment=TA_CENTER),
+        'base_title': base['Title'],
+    }
+
+
+@lru_cache(maxsize=None)
+def _decision_style(color):
+    return ParagraphStyle('Decision', parent=_pdf_styles()['base_title'], fontSize=28, textColor=HexColor(color), alignment=TA_CENTER)
+
+
+@lru_cache(maxsize=None)
+def _table_style(name):
+    commands = {
+        # Label/value tables with both columns colored and padded
+        'profile': [
+            ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
+            ('TEXTCOLOR', (1, 0), (1, -1), HexColor('#111827')),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ],
+        'scores': [
+            ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ],
+        'memo': [
+            ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ],
+    }
+    return TableStyle(commands[name])
+
+
+@lru_cache(maxsize=None)
+def _base_presentation_bytes():
+    prs = Presentation()
+    prs.slide_width = Inches(13.333)
+    prs.slide_height = Inches(7.5)
+    buffer = BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def _new_pdf_doc(buffer):
+    return SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
+
+
 def generate_executive_summary_pdf(report):
     """Generate executive summary PDF. Returns bytes."""
     if not HAS_REPORTLAB:
         raise ImportError("reportlab is required for PDF generation. Install with: pip install reportlab")
 
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Title'], fontSize=20, spaceAfter=6, textColor=HexColor('#111827'))
-    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=14, spaceBefore=16, spaceAfter=8, textColor=HexColor('#111827'))
-    body_style = ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=10, leading=14, textColor=HexColor('#374151'))
-    label_style = ParagraphStyle('Label', parent=styles['Normal'], fontSize=9, textColor=HexColor('#6b7280'))
+    doc = _new_pdf_doc(buffer)
+    styles = _pdf_styles()
+    title_style = styles['title']
+    heading_style = styles['heading']
+    body_style = styles['body']
+    label_style = styles['label']
 
     story = []
     dashboard = report.dashboard_data or {}
@@ -79,13 +144,7 @@ def generate_executive_summary_pdf(report):
         ['Annual Revenue', report.annual_revenue or 'N/A'],
     ]
     t = Table(company_data, colWidths=[2*inch, 4*inch])
-    t.setStyle(TableStyle([
-        ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
-        ('TEXTCOLOR', (1, 0), (1, -1), HexColor('#111827')),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    t.setStyle(_table_style('profile'))
     story.append(t)
     story.append(Spacer(1, 16))
 
@@ -102,13 +161,7 @@ def generate_executive_summary_pdf(report):
         ['Y3 Revenue Target', revenue.get('year_3', 'N/A')],
     ]
     t = Table(metrics_data, colWidths=[3*inch, 3*inch])
-    t.setStyle(TableStyle([
-        ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
-        ('TEXTCOLOR', (1, 0), (1, -1), HexColor('#111827')),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    t.setStyle(_table_style('profile'))
     story.append(t)
     story.append(Spacer(1, 16))
 
@@ -153,13 +206,12 @@ def generate_go_nogo_pdf(report):
         raise ImportError("reportlab is required for PDF generation. Install with: pip install reportlab")
 
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Title'], fontSize=20, spaceAfter=6, textColor=HexColor('#111827'))
-    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=14, spaceBefore=16, spaceAfter=8, textColor=HexColor('#111827'))
-    body_style = ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=10, leading=14, textColor=HexColor('#374151'))
-    label_style = ParagraphStyle('Label', parent=styles['Normal'], fontSize=9, textColor=HexColor('#6b7280'))
+    doc = _new_pdf_doc(buffer)
+    styles = _pdf_styles()
+    title_style = styles['title']
+    heading_style = styles['heading']
+    body_style = styles['body']
+    label_style = styles['label']
 
     story = []
     dashboard = report.dashboard_data or {}
@@ -177,9 +229,8 @@ def generate_go_nogo_pdf(report):
     story.append(Spacer(1, 20))
 
     # Decision Box
-    decision_style = ParagraphStyle('Decision', parent=styles['Title'], fontSize=28, textColor=HexColor(decision_color), alignment=TA_CENTER)
-    story.append(Paragraph(decision, decision_style))
-    story.append(Paragraph(f'Confidence: {confidence}', ParagraphStyle('Conf', parent=label_style, alignment=TA_CENTER)))
+    story.append(Paragraph(decision, _decision_style(decision_color)))
+    story.append(Paragraph(f'Confidence: {confidence}', styles['label_centered']))
     story.append(Spacer(1, 20))
 
     # Scores
@@ -191,12 +242,7 @@ def generate_go_nogo_pdf(report):
         ['Revenue Potential', dashboard.get('revenue_potential', 'N/A')],
     ]
     t = Table(scores_data, colWidths=[3*inch, 3*inch])
-    t.setStyle(TableStyle([
-        ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    t.setStyle(_table_style('scores'))
     story.append(t)
     story.append(Spacer(1, 16))
 
@@ -222,13 +268,12 @@ def generate_investment_memo_pdf(report):
         raise ImportError("reportlab is required for PDF generation. Install with: pip install reportlab")
 
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Title'], fontSize=20, spaceAfter=6, textColor=HexColor('#111827'))
-    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=14, spaceBefore=16, spaceAfter=8, textColor=HexColor('#111827'))
-    body_style = ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=10, leading=14, textColor=HexColor('#374151'))
-    label_style = ParagraphStyle('Label', parent=styles['Normal'], fontSize=9, textColor=HexColor('#6b7280'))
+    doc = _new_pdf_doc(buffer)
+    styles = _pdf_styles()
+    title_style = styles['title']
+    heading_style = styles['heading']
+    body_style = styles['body']
+    label_style = styles['label']
 
     story = []
     dashboard = report.dashboard_data or {}
@@ -262,11 +307,7 @@ def generate_investment_memo_pdf(report):
         ['Revenue Potential', dashboard.get('revenue_potential', 'N/A')],
     ]
     t = Table(market_data, colWidths=[3*inch, 3*inch])
-    t.setStyle(TableStyle([
-        ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    t.setStyle(_table_style('memo'))
     story.append(t)
     story.append(Spacer(1, 16))
 
@@ -281,11 +322,7 @@ def generate_investment_memo_pdf(report):
         ['Break-even', '12-18 months' if market_score >= 7 else '18-24 months' if market_score >= 5 else '24+ months'],
     ]
     t = Table(fin_data, colWidths=[3*inch, 3*inch])
-    t.setStyle(TableStyle([
-        ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#6b7280')),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    t.setStyle(_table_style('memo'))
     story.append(t)
     story.append(Spacer(1, 16))
 
@@ -325,9 +362,7 @@ def generate_board_presentation_pptx(report):
     if not HAS_PPTX:
         raise ImportError("python-pptx is required for PPTX generation. Install with: pip install python-pptx")
 
-    prs = Presentation()
-    prs.slide_width = Inches(13.333)
-    prs.slide_height = Inches(7.5)
+    prs = Presentation(BytesIO(_base_presentation_bytes()))
 
     dashboard = report.dashboard_data or {}
     revenue = report.revenue_projections or {}
@@ -1,9 +1,12 @@
-from django.http import HttpResponse
+from datetime import date
+
+from django.http import FileResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from apps.accounts.permissions import IsAdminOrOwner
+from .artifact_store import get_or_render
 from .models import MarketReport
 from .report_generator import (
     generate_executive_summary_pdf,
@@ -43,6 +46,21 @@ REPORT_TYPES = {
 TIER_ORDER = ['free', 'starter', 'professional', 'enterprise']
 
 
+def tier_allows(user, report_type):
+    """Whether the user's subscription tier (or admin role) unlocks an export type."""
+    if user.is_admin:
+        return True
+    min_tier = REPORT_TYPES[report_type]['min_tier']
+    user_tier = getattr(user, 'subscription_tier', 'free')
+    user_tier_index = TIER_ORDER.index(user_tier) if user_tier in TIER_ORDER else 0
+    min_tier_index = TIER_ORDER.index(min_tier) if min_tier in TIER_ORDER else 0
+    return user_tier_index >= min_tier_index
+
+
+def allowed_report_types(user):
+    return [report_type for report_type in REPORT_TYPES if tier_allows(user, report_type)]
+
+
 class DownloadReportView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -64,26 +82,57 @@ class DownloadReportView(APIView):
 
         # Check tier
         config = REPORT_TYPES[report_type]
-        min_tier = config['min_tier']
-        user_tier = getattr(request.user, 'subscription_tier', 'free')
-
-        if not request.user.is_admin:
-            user_tier_index = TIER_ORDER.index(user_tier) if user_tier in TIER_ORDER else 0
-            min_tier_index = TIER_ORDER.index(min_tier) if min_tier in TIER_ORDER else 0
-            if user_tier_index < min_tier_index:
-                return Response(
-                    {'error': f'This report requires {min_tier} tier or higher. Current tier: {user_tier}'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        if not tier_allows(request.user, report_type):
+            user_tier = getattr(request.user, 'subscription_tier', 'free')
+            return Response(
+                {'error': f'This report requires {config["min_tier"]} tier or higher. Current tier: {user_tier}'},
+                status=status.HTTP_403_FORBIDDEN
+            )
 
         try:
-            file_bytes = config['generator'](report)
+            artifact = get_or_render(report, report_type, config)
         except ImportError as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
             return Response({'error': f'Report generation failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         filename = f'{report.company_name}-{report_type}.{config["extension"]}'
-        response = HttpResponse(file_bytes, content_type=config['content_type'])
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return FileResponse(artifact, as_attachment=True, filename=filename, content_type=config['content_type'])
+
+
+class BulkExportView(APIView):
+    """GET: Stream a ZIP of the user's completed reports in every requested format."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .bulk_export import JSON_EXPORT, iter_export_zip
+
+        if not request.user.is_admin and getattr(request.user, 'subscription_tier', 'free') != 'enterprise':
+            return Response({'error': 'Bulk export requires the enterprise tier.'}, status=status.HTTP_403_FORBIDDEN)
+
+        valid_types = list(REPORT_TYPES.keys()) + [JSON_EXPORT]
+        requested = request.query_params.get('types')
+        export_types = [t.strip() for t in requested.split(',') if t.strip()] if requested else valid_types
+        invalid = [t for t in export_types if t not in valid_types]
+        if invalid:
+            return Response(
+                {'error': f'Invalid report type(s): {", ".join(invalid)}. Valid types: {", ".join(valid_types)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        reports = MarketReport.objects.filter(user=request.user, status='completed').order_by('-created_at')
+        report_ids = request.query_params.get('report_ids')
+        if report_ids:
+            try:
+                reports = reports.filter(id__in=[int(i) for i in report_ids.split(',') if i.strip()])
+            except ValueError:
+                return Response({'error': 'report_ids must be a comma-separated list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not reports.exists():
+            return Response({'error': 'No completed reports to export'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(
+            iter_export_zip(reports.iterator(chunk_size=20), export_types),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = f'attachment; filename="kairosai-reports-{date.today().isoformat()}.zip"'
         return response
@@ -1,6 +1,49 @@
 from rest_framework import serializers
 from .models import MarketReport, ChatConversation, ChatMessage
 
+
+def parse_fields_param(request):
+    """Return the set of field names requested via ``?fields=a,b,c`` or None."""
+    raw = request.query_params.get('fields') if request is not None else None
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Restrict serializer output to a caller-selected subset of its fields."""
+
+    # Model columns each computed field needs when building .only() lists
+    field_dependencies = {}
+
+    def __init__(self, *args, **kwargs):
+        requested = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if requested:
+            allowed = set(requested) | {'id'}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, requested=None):
+        """Serializer field names that will be rendered for a request."""
+        names = list(cls.Meta.fields)
+        if requested:
+            names = [name for name in names if name in requested or name == 'id']
+        return names
+
+    @classmethod
+    def model_columns(cls, requested=None):
+        """Concrete model columns to load with .only() for the rendered fields."""
+        concrete = {f.name for f in cls.Meta.model._meta.concrete_fields}
+        columns = {'id', 'created_at'}
+        for name in cls.select_fields(requested):
+            if name in concrete:
+                columns.add(name)
+            columns.update(cls.field_dependencies.get(name, ()))
+        return sorted(columns)
+
+
 class MarketReportSerializer(serializers.ModelSerializer):
     """Serializer for MarketReport model"""
     
@@ -9,7 +52,7 @@ class MarketReportSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'analysis_id', 'user', 'analysis_type', 'status',
             'company_name', 'industry', 'target_market', 'website',
-            'current_positioning', 'brand_description',
+            'normalized_industry', 'normalized_market', 'current_positioning', 'brand_description',
             'customer_segment', 'expansion_direction', 'company_size',
             'annual_revenue', 'funding_stage', 'current_markets',
             'key_products', 'competitive_advantage', 'expansion_timeline',
@@ -21,7 +64,7 @@ class MarketReportSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'completed_at']
 
-class MarketReportListSerializer(serializers.ModelSerializer):
+class MarketReportListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Simplified serializer for listing market reports"""
     
     class Meta:
@@ -29,13 +72,15 @@ class MarketReportListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'analysis_id', 'analysis_type', 'status',
             'company_name', 'industry', 'target_market',
+            'normalized_industry', 'normalized_market',
             'customer_segment', 'expansion_direction',
             'executive_summary', 'created_at', 'completed_at'
         ]
 
-class MarketReportSelectorSerializer(serializers.ModelSerializer):
+class MarketReportSelectorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Ultra-simple serializer for report selection UI"""
     display_name = serializers.SerializerMethodField()
+    field_dependencies = {'display_name': ('company_name', 'target_market', 'industry')}
     
     class Meta:
         model = MarketReport
@@ -55,7 +100,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         fields = ['id', 'message_type', 'content', 'sources', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-class ChatConversationSerializer(serializers.ModelSerializer):
+class ChatConversationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for ChatConversation model"""
     messages = ChatMessageSerializer(many=True, read_only=True)
     
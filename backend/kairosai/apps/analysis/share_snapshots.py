@@ -0,0 +1,170 @@
+"""
+Static snapshots of shared reports.
+
+Publishing a share link writes the public payload once, pre-serialized and
+pre-compressed, under ``SHARED_SNAPSHOT_DIR/<token>/<version>.<format>``. The
+version is a content hash, so a given snapshot file never changes; a small
+``current`` pointer names the live version. Anonymous views of the share link
+read files only.
+
+Superseded versions are removed by a later publish once they are older than
+SUPERSEDED_GRACE_SECONDS, so a reader that has just read the old pointer can
+still open its file, and concurrent publishers never delete each other's
+files.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMATS = {
+    'json': 'application/json',
+    'html': 'text/html; charset=utf-8',
+}
+# Preference order when the client accepts several encodings
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Superseded snapshot files are kept this long after they were written
+SUPERSEDED_GRACE_SECONDS = 600
+
+_TOKEN_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+_VERSION_RE = re.compile(r'^[0-9a-f]{16}$')
+
+
+def _snapshot_root() -> str:
+    return getattr(settings, 'SHARED_SNAPSHOT_DIR', os.path.join(settings.MEDIA_ROOT, 'shared_snapshots'))
+
+
+def _token_dir(token: str) -> Optional[str]:
+    # Tokens come straight from the URL; never let them escape the store
+    if not token or not _TOKEN_RE.match(token):
+        return None
+    return os.path.join(_snapshot_root(), token)
+
+
+def shared_report_payload(report) -> dict:
+    """Public subset of a report exposed through a share link."""
+    return {
+        'company_name': report.company_name,
+        'industry': report.industry,
+        'target_market': report.target_market,
+        'analysis_type': report.analysis_type,
+        'status': report.status,
+        'dashboard_data': report.dashboard_data,
+        'competitor_analysis': report.competitor_analysis,
+        'segment_arbitrage': report.segment_arbitrage,
+        'revenue_projections': report.revenue_projections,
+        'key_insights': report.key_insights,
+        'recommended_actions': report.recommended_actions,
+        'created_at': report.created_at.isoformat(),
+    }
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def publish_snapshot(report) -> Optional[str]:
+    """Write the report's share snapshot and point the token at it; returns the version."""
+    if not report.is_shared or not report.share_token:
+        return None
+    directory = _token_dir(report.share_token)
+    if directory is None:
+        return None
+
+    payload = shared_report_payload(report)
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    version = hashlib.sha256(body).hexdigest()[:16]
+    os.makedirs(directory, exist_ok=True)
+
+    if read_current_version(report.share_token) == version:
+        return version
+
+    html = render_to_string('analysis/shared_report.html', {'report': payload}).encode()
+    for fmt, data in (('json', body), ('html', html)):
+        path = os.path.join(directory, f'{version}.{fmt}')
+        _write_atomic(path, data)
+        _write_atomic(path + '.gz', gzip.compress(data, compresslevel=9))
+        if HAS_BROTLI:
+            _write_atomic(path + '.br', brotli.compress(data, quality=9))
+
+    _write_atomic(os.path.join(directory, 'current'), version.encode())
+
+    _prune_superseded(directory, version)
+    return version
+
+
+def _prune_superseded(directory: str, version: str) -> None:
+    cutoff = time.time() - SUPERSEDED_GRACE_SECONDS
+    for entry in os.scandir(directory):
+        # In-flight writes of another publisher are .tmp files; leave them alone
+        if entry.name == 'current' or entry.name.startswith(version) or entry.name.endswith('.tmp'):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+
+
+def read_current_version(token: str) -> Optional[str]:
+    directory = _token_dir(token)
+    if directory is None:
+        return None
+    try:
+        with open(os.path.join(directory, 'current'), 'rb') as f:
+            version = f.read().decode().strip()
+    except FileNotFoundError:
+        return None
+    return version if _VERSION_RE.match(version) else None
+
+
+def open_snapshot(token: str, version: str, fmt: str, accept_encoding: str = ''):
+    """Open the best pre-compressed variant; returns (file, content_encoding) or (None, None)."""
+    directory = _token_dir(token)
+    if directory is None or fmt not in SNAPSHOT_FORMATS or not _VERSION_RE.match(version or ''):
+        return None, None
+    path = os.path.join(directory, f'{version}.{fmt}')
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted:
+            try:
+                return open(path + suffix, 'rb'), encoding
+            except FileNotFoundError:
+                continue
+    try:
+        return open(path, 'rb'), None
+    except FileNotFoundError:
+        return None, None
+
+
+def delete_snapshot(token: Optional[str]) -> None:
+    directory = _token_dir(token) if token else None
+    if directory and os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
@@ -2,14 +2,28 @@ from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.conf import settings
+from django.http import FileResponse
+from django.urls import reverse
 import uuid
 import logging
 
+from .etags import etag_matches, not_modified
 from .models import MarketReport
+from .share_snapshots import (
+    SNAPSHOT_FORMATS,
+    delete_snapshot,
+    open_snapshot,
+    publish_snapshot,
+    read_current_version,
+    shared_report_payload,
+)
 from apps.teams.models import TeamMember
 
 logger = logging.getLogger(__name__)
 
+# Share and snapshot URLs are cached briefly, so an unshared report drops out of public caches
+SHARED_CACHE_CONTROL = 'public, max-age=300'
+
 
 class ShareReportView(APIView):
     """POST: Generate a shareable link for a report."""
@@ -32,6 +46,8 @@ class ShareReportView(APIView):
             )
 
         if report.is_shared and report.share_token:
+            if read_current_version(report.share_token) is None:
+                publish_snapshot(report)
             share_url = f"{settings.FRONTEND_URL}/shared/{report.share_token}"
             return Response({
                 'share_token': report.share_token,
@@ -72,9 +88,11 @@ class UnshareReportView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
+        revoked_token = report.share_token
         report.share_token = None
         report.is_shared = False
         report.save(update_fields=['share_token', 'is_shared', 'updated_at'])
+        delete_snapshot(revoked_token)
 
         return Response({
             'message': 'Report unshared successfully.',
@@ -86,25 +104,69 @@ class SharedReportView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, share_token):
-        try:
-            report = MarketReport.objects.get(share_token=share_token, is_shared=True)
-        except MarketReport.DoesNotExist:
+        # Snapshot files are deleted on unshare only on the host that handled it; the database decides
+        shared = MarketReport.objects.filter(share_token=share_token, is_shared=True)
+        if not shared.exists():
+            return Response(
+                {'error': 'Shared report not found or link has been revoked.'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        # Published snapshots are served straight from the static store
+        version = read_current_version(share_token)
+        if version is None:
+            report = shared.first()
+            if report is None:
+                return Response(
+                    {'error': 'Shared report not found or link has been revoked.'},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            # Links shared before snapshots existed are published on first view
+            try:
+                version = publish_snapshot(report)
+            except OSError as e:
+                logger.warning(f"Could not publish snapshot for report {report.id}: {e}")
+                return Response(shared_report_payload(report), status=status.HTTP_200_OK)
+
+        etag = f'"{version}"'
+        if etag_matches(request, etag):
+            return _snapshot_headers(not_modified(etag), share_token, version, SHARED_CACHE_CONTROL)
+
+        response = _snapshot_response(request, share_token, version, 'json', SHARED_CACHE_CONTROL)
+        if response is None:
             return Response(
                 {'error': 'Shared report not found or link has been revoked.'},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        return response
 
-        return Response({
-            'company_name': report.company_name,
-            'industry': report.industry,
-            'target_market': report.target_market,
-            'analysis_type': report.analysis_type,
-            'status': report.status,
-            'dashboard_data': report.dashboard_data,
-            'competitor_analysis': report.competitor_analysis,
-            'segment_arbitrage': report.segment_arbitrage,
-            'revenue_projections': report.revenue_projections,
-            'key_insights': report.key_insights,
-            'recommended_actions': report.recommended_actions,
-            'created_at': report.created_at.isoformat(),
-        }, status=status.HTTP_200_OK)
+
+class SharedSnapshotView(APIView):
+    """GET: Versioned snapshot file of a shared report (JSON or HTML)."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, share_token, version, fmt):
+        # Snapshot files are deleted on unshare only on the host that handled it; the database decides
+        if not MarketReport.objects.filter(share_token=share_token, is_shared=True).exists():
+            return Response({'error': 'Snapshot not found.'}, status=status.HTTP_404_NOT_FOUND)
+        response = _snapshot_response(request, share_token, version, fmt, SHARED_CACHE_CONTROL)
+        if response is None:
+            return Response({'error': 'Snapshot not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return response
+
+
+def _snapshot_headers(response, share_token, version, cache_control):
+    response['ETag'] = f'"{version}"'
+    response['Cache-Control'] = cache_control
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Location'] = reverse('analysis:shared-report-snapshot', args=[share_token, version, 'json'])
+    return response
+
+
+def _snapshot_response(request, share_token, version, fmt, cache_control):
+    handle, encoding = open_snapshot(share_token, version, fmt, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if handle is None:
+        return None
+    response = FileResponse(handle, filename=f'{version}.{fmt}', content_type=SNAPSHOT_FORMATS[fmt])
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return _snapshot_headers(response, share_token, version, cache_control)
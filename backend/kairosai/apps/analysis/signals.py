@@ -0,0 +1,64 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .artifact_store import delete_report_artifacts
+from .chat_cache import invalidate_chat_cache
+from .dashboard_cache import invalidate_dashboard_snapshot
+from .models import MarketReport
+from .prerender import prerender_report_exports
+from .share_snapshots import delete_snapshot, publish_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=MarketReport)
+@receiver(post_delete, sender=MarketReport)
+def invalidate_report_caches(sender, instance, **kwargs):
+    """Drop cached views of a user's reports whenever one is written or deleted."""
+    if instance.user_id:
+        invalidate_dashboard_snapshot(instance.user_id)
+        invalidate_chat_cache(instance.user_id)
+
+
+@receiver(post_save, sender=MarketReport)
+def prerender_completed_report(sender, instance, update_fields=None, **kwargs):
+    """Render the owner's exports in the background once a report is completed."""
+    if instance.status != 'completed':
+        return
+    # Partial saves that leave updated_at alone keep existing artifacts valid
+    if update_fields is not None and 'updated_at' not in update_fields:
+        return
+    transaction.on_commit(lambda: prerender_report_exports(instance))
+
+
+@receiver(post_save, sender=MarketReport)
+def republish_share_snapshot(sender, instance, **kwargs):
+    """Keep the static snapshot of a shared report in step with the report."""
+    if instance.is_shared and instance.share_token:
+        transaction.on_commit(lambda: _publish_snapshot(instance.pk, instance.share_token))
+
+
+def _publish_snapshot(report_id, share_token):
+    # Re-read the share state: an unshare committed since this save must not be re-published
+    shared = MarketReport.objects.filter(pk=report_id, share_token=share_token, is_shared=True)
+    try:
+        report = shared.first()
+        if report is None:
+            return
+        publish_snapshot(report)
+        if not shared.exists():
+            # Unshared while publishing; its delete may have run before these files were written
+            delete_snapshot(share_token)
+    except Exception as e:
+        # The share link falls back to publishing on its next view
+        logger.warning(f"Could not publish share snapshot for report {report_id}: {e}")
+
+
+@receiver(post_delete, sender=MarketReport)
+def delete_rendered_artifacts(sender, instance, **kwargs):
+    """Rendered exports and share snapshots of a deleted report are never served again."""
+    delete_report_artifacts(instance.pk)
+    delete_snapshot(instance.share_token)
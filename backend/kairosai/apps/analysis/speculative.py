@@ -0,0 +1,117 @@
+"""
+Provisional scores from partial research.
+
+Most score-relevant facts (market size, growth, competitor counts) turn up
+in the first research iterations, long before the final report is written.
+The iterative researcher hands its findings to ``on_findings`` after every
+iteration. ``listener`` builds that callback: it scores the findings so far
+with the rule-based local scorer, which costs no model calls and takes
+milliseconds, and stores the headline scores on the run's AnalysisJob. The
+dashboard polls them from the analysis-progress endpoint while research
+continues. When the run completes, the LLM scores replace them.
+
+``record_final`` stores the final scores and their difference from the last
+provisional scores. ``provisional_accuracy`` aggregates those differences,
+so the admin queue endpoint shows how far the early numbers can be trusted.
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .models import AnalysisJob
+
+logger = logging.getLogger(__name__)
+
+SCORE_FIELDS = ('market_opportunity_score', 'competitive_intensity_score', 'entry_complexity_score')
+DASHBOARD_FIELDS = SCORE_FIELDS + ('competitive_intensity', 'revenue_potential_y1')
+
+
+def _headline(scores: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: scores[field] for field in DASHBOARD_FIELDS if field in scores}
+
+
+def _save_provisional(job: AnalysisJob, iteration: int, scores: Dict[str, Any]) -> None:
+    AnalysisJob.objects.filter(pk=job.pk).update(
+        provisional_scores=scores, provisional_iteration=iteration, provisional_at=timezone.now())
+
+
+def listener(job: Optional[AnalysisJob], scoring_agent, company_info: Dict[str, Any]):
+    """``on_findings`` callback that publishes provisional scores on ``job``; None without a job."""
+    if job is None:
+        return None
+    save = sync_to_async(_save_provisional, thread_sensitive=False)
+
+    async def on_findings(iteration: int, findings: List[str]) -> None:
+        text = '\n\n'.join(f for f in findings if f)
+        if not text.strip():
+            return
+        try:
+            scores = _headline(scoring_agent.provisional_scores(text, company_info))
+            await save(job, iteration, scores)
+        except Exception as e:
+            # Provisional scores are a preview; they must never fail the research run
+            logger.warning(f"Could not publish provisional scores for job {job.pk}: {e}")
+
+    return on_findings
+
+
+def record_final(job: Optional[AnalysisJob], scores: Dict[str, Any]) -> None:
+    """Store the final scores on ``job`` and their difference from its last provisional scores."""
+    if job is None:
+        return
+    try:
+        provisional = AnalysisJob.objects.filter(pk=job.pk).values_list('provisional_scores', flat=True).first()
+        delta = None
+        if provisional:
+            delta = {field: round(float(scores[field]) - float(provisional[field]), 2)
+                     for field in SCORE_FIELDS if field in scores and field in provisional}
+        AnalysisJob.objects.filter(pk=job.pk).update(final_scores=_headline(scores), score_delta=delta)
+    except Exception as e:
+        logger.warning(f"Could not record final scores for job {job.pk}: {e}")
+
+
+def progress(job: AnalysisJob) -> Dict[str, Any]:
+    return {
+        'job_id': job.pk,
+        'state': job.state,
+        'enqueued_at': job.enqueued_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'provisional_scores': job.provisional_scores,
+        'provisional_iteration': job.provisional_iteration,
+        'provisional_at': job.provisional_at,
+        'final_scores': job.final_scores,
+        'score_delta': job.score_delta,
+    }
+
+
+def provisional_accuracy(hours: int = 24) -> Dict[str, Any]:
+    """Mean absolute and signed final - provisional difference per score, over runs finished in the last ``hours``.
+
+    Finished jobs are kept for a day (job_scheduler.RETENTION), which bounds the window.
+    """
+    deltas = AnalysisJob.objects.filter(
+        finished_at__gte=timezone.now() - timedelta(hours=hours), score_delta__isnull=False,
+    ).values_list('score_delta', flat=True)
+    values: Dict[str, List[float]] = {field: [] for field in SCORE_FIELDS}
+    runs = 0
+    for delta in deltas:
+        if not delta:
+            continue
+        runs += 1
+        for field, value in delta.items():
+            if field in values:
+                values[field].append(value)
+    return {
+        'runs': runs,
+        'fields': {
+            field: {
+                'mean_abs_delta': sum(abs(v) for v in vs) / len(vs) if vs else None,
+                'mean_delta': sum(vs) / len(vs) if vs else None,
+            }
+            for field, vs in values.items()
+        },
+    }
@@ -1,3 +1,1324 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import brotli
+import httpx
+import openai
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.ai_agents import json_repair, local_scorer, model_router, number_extractor, rate_limiter, resilience
+from apps.ai_agents.research_agent import COMPETITOR_SCHEMA, CompetitorResearchAgent
+from apps.ai_agents.scoring_agent import MarketScoringAgent
+from apps.monitoring.models import ExecutionPlan, MarketAlert, MarketMonitor, Milestone
+from . import chat_memory, job_scheduler, report_generator, speculative
+from .artifact_store import artifact_path, evict_artifacts, open_artifact, store_artifact
+from .chatbot_views import ChatMessageAPIView
+from .management.commands.benchmark_report_generator import _sample_report
+from .dimensions import resolve_industry, resolve_market
+from .models import (
+    AnalysisJob, ChatConversation, ChatMessage, LLMCall, MarketAlias, MarketReport, MultiMarketReport,
+)
+from .renderers import ORJSONRenderer
+from .report_views import REPORT_TYPES
+from .share_snapshots import publish_snapshot, read_current_version
+
+
+class QueryPlanTestMixin:
+    """Helpers for asserting that hot-path querysets hit the expected indexes."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables would otherwise always be sequentially scanned
+                cursor.execute('SET enable_seqscan = off')
+            plan = queryset.explain()
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET enable_seqscan = on')
+        self.assertIn(index_name, plan, f'Expected {index_name} in query plan:\n{plan}')
+
+
+class MarketReportHotPathTests(QueryPlanTestMixin, TestCase):
+    """Query plan and query count regressions for the MarketReport hot paths."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner@example.com', 'pw', first_name='O', last_name='Wner')
+        cls.other = User.objects.create_user('other@example.com', 'pw', first_name='Ot', last_name='Her')
+        cls.admin = User.objects.create_user('admin@example.com', 'pw', first_name='Ad', last_name='Min', role='admin')
+        for i in range(6):
+            for user in (cls.user, cls.other):
+                MarketReport.objects.create(
+                    analysis_id=f'{user.pk}_{i}',
+                    user=user,
+                    status='completed' if i % 3 else 'processing',
+                    company_name=f'Company {i}',
+                    industry='SaaS' if i % 2 else 'Food & Beverage',
+                    target_market='USA' if i % 2 else 'Germany',
+                    detailed_scores={'market_opportunity_score': 5 + i},
+                )
+        cls.report = MarketReport.objects.filter(user=cls.user, status='completed').first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_completed_reports_for_user_use_composite_index(self):
+        qs = MarketReport.objects.filter(user=self.user, status='completed').order_by('-created_at')
+        self.assertUsesIndex(qs, 'mr_user_status_recent_idx')
+        self.assertNotIn('TEMP B-TREE', qs.explain().upper())
+
+    def test_admin_listing_uses_recent_index(self):
+        qs = MarketReport.objects.select_related('user').order_by('-created_at')[:20]
+        self.assertUsesIndex(qs, 'mr_recent_idx')
+
+    def test_benchmark_dimension_filter_uses_partial_index(self):
+        qs = MarketReport.objects.filter(
+            status='completed',
+            normalized_industry=resolve_industry('SaaS', create=False),
+            normalized_market=resolve_market('United States', create=False),
+        ).values_list('detailed_scores', flat=True)
+        self.assertUsesIndex(qs, 'mr_completed_dimension_idx')
+
+    def test_conversation_history_uses_indexes(self):
+        conversation = ChatConversation.objects.create(user=self.user, title='t')
+        self.assertUsesIndex(
+            ChatConversation.objects.filter(user=self.user).order_by('-updated_at'),
+            'chat_conv_user_recent_idx',
+        )
+        self.assertUsesIndex(
+            ChatMessage.objects.filter(conversation=conversation).order_by('-created_at'),
+            'chat_msg_conv_created_idx',
+        )
+
+    def test_report_list_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('analysis:market-reports'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 4)
+
+    def test_report_detail_query_count(self):
+        # Version lookup + full row fetch
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('analysis:market-report-detail', args=[self.report.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_latest_dashboard_query_count(self):
+        cache.clear()
+        # Version lookup + snapshot build on a cold cache, version lookup only once warm
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('analysis:latest-dashboard'))
+        self.assertTrue(response.data['has_data'])
+        with self.assertNumQueries(1):
+            self.client.get(reverse('analysis:latest-dashboard'))
+
+    def test_playbook_lookup_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('analysis:playbook', args=[self.report.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_monitor_create_lookup_query_count(self):
+        # Report ownership lookup + insert
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('monitoring:monitor-list-create'), {'report_id': self.report.id})
+        self.assertEqual(response.status_code, 201)
+
+    def test_admin_reports_query_count(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('admin_reports'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_rag_response_query_count(self):
+        conversation = ChatConversation.objects.create(user=self.user, title='t')
+        ChatMessage.objects.create(conversation=conversation, message_type='user', content='hi')
+        cache.clear()
+        with mock.patch('apps.analysis.chatbot_views.ChatGPTService') as service:
+            service.return_value.generate_response_with_rag.return_value = {'content': 'ok', 'sources': []}
+            service.return_value.embed_query.return_value = None
+            # report versions + the conversation's unsummarized messages + report fetch
+            with self.assertNumQueries(3):
+                content, _ = ChatMessageAPIView()._generate_rag_response('score?', self.user, conversation=conversation)
+        self.assertEqual(content, 'ok')
+
+
+class DimensionResolutionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dims@example.com', 'pw', first_name='Di', last_name='Ms')
+
+    def report(self, analysis_id, **fields):
+        return MarketReport.objects.create(analysis_id=analysis_id, user=self.user, status='completed',
+                                           company_name='Acme', **fields)
+
+    def test_aliases_resolve_to_one_dimension(self):
+        usa = resolve_market('USA')
+        self.assertEqual(usa.name, 'United States')
+        self.assertEqual(resolve_market('  the United States '), usa)
+        self.assertEqual(resolve_industry('F&B'), resolve_industry('food and beverage'))
+        self.assertIsNone(resolve_market('Atlantis', create=False))
+
+    def test_long_spelling_resolves_through_its_truncated_alias(self):
+        name = 'Greater ' + 'Very Long Region Name ' * 8
+        market = resolve_market(name)
+        MarketAlias.objects.filter(market=market).update(market=resolve_market('Germany'))
+        # The second lookup must hit the stored (truncated) alias rather than the slug
+        self.assertEqual(resolve_market(name).name, 'Germany')
+        self.assertEqual(MarketAlias.objects.filter(alias__startswith='greater very long').count(), 1)
+
+    def test_editing_free_text_re_resolves_dimension(self):
+        report = self.report('dims_1', industry='SaaS', target_market='USA')
+        report = MarketReport.objects.get(pk=report.pk)
+        report.target_market = 'UK'
+        report.industry = ''
+        report.save()
+        report.refresh_from_db()
+        self.assertEqual(report.normalized_market.name, 'United Kingdom')
+        self.assertIsNone(report.normalized_industry)
+
+        multi = MultiMarketReport.objects.create(user=self.user, company_name='Acme', industry='fintech',
+                                                 target_markets=['USA'])
+        multi = MultiMarketReport.objects.get(pk=multi.pk)
+        multi.industry = 'edtech'
+        multi.save()
+        self.assertEqual(MultiMarketReport.objects.get(pk=multi.pk).normalized_industry.name, 'Education')
+
+    def test_backfill_resolves_rows_without_dimension_keys(self):
+        report = self.report('dims_2', industry='saas', target_market='Deutschland')
+        MarketReport.objects.filter(pk=report.pk).update(normalized_industry=None, normalized_market=None)
+        call_command('backfill_dimensions', stdout=io.StringIO())
+        report.refresh_from_db()
+        self.assertEqual((report.normalized_industry.name, report.normalized_market.name), ('Software', 'Germany'))
+
+    def test_benchmarks_filter_by_alias_and_id(self):
+        self.report('dims_3', industry='SaaS', target_market='USA', detailed_scores={'market_opportunity_score': 8})
+        self.report('dims_4', industry='SaaS', target_market='Germany', detailed_scores={'market_opportunity_score': 4})
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('analysis:benchmarks')
+        by_alias = client.get(url, {'market': 'u.s.a.', 'industry': 'software as a service'}).json()
+        self.assertEqual((by_alias['total_reports'], by_alias['market_filter']), (1, 'United States'))
+        by_id = client.get(url, {'market_id': resolve_market('Germany').pk}).json()
+        self.assertEqual(by_id['market_opportunity_score']['median'], 4.0)
+        self.assertEqual(client.get(url, {'market': 'Atlantis'}).json()['total_reports'], 0)
+
+    def test_benchmarks_reject_non_integer_ids(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('analysis:benchmarks')
+        for name in ('industry_id', 'market_id', 'report_id'):
+            response = client.get(url, {name: 'abc'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], f'{name} must be an integer')
+
+
+class SemanticChatCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('chatcache@example.com', 'pw', first_name='Ch', last_name='At')
+        cls.report = MarketReport.objects.create(
+            analysis_id='chat_cache_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='Germany',
+        )
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('apps.analysis.chatbot_views.ChatGPTService')
+        self.service = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.service.generate_response_with_rag.return_value = {'content': 'Score is 7.2', 'sources': ['Acme'], 'model_used': 'gpt-4'}
+        vectors = {'whats my market opportunity score': [1.0, 0.0, 0.1], 'market opportunity score': [0.98, 0.05, 0.12],
+                   'biggest risks': [0.0, 1.0, 0.0]}
+        self.service.embed_query.side_effect = lambda q: vectors[q]
+
+    def ask(self, question):
+        return ChatMessageAPIView()._generate_rag_response(question, self.user)[0]
+
+    def test_similar_and_repeat_questions_are_served_from_cache(self):
+        self.assertEqual(self.ask("What's my market opportunity score?"), 'Score is 7.2')
+        self.ask('Market opportunity score')
+        self.ask('whats my market opportunity score')
+        self.assertEqual(self.service.generate_response_with_rag.call_count, 1)
+        # The exact repeat needs no embedding call
+        self.assertEqual(self.service.embed_query.call_count, 2)
+        self.ask('Biggest risks?')
+        self.assertEqual(self.service.generate_response_with_rag.call_count, 2)
+
+    def test_report_change_and_follow_ups_bypass_cache(self):
+        self.ask("What's my market opportunity score?")
+        self.ask('Can you elaborate on that?')
+        self.assertEqual(self.service.generate_response_with_rag.call_count, 2)
+        self.report.save(update_fields=['executive_summary'])
+        self.ask("What's my market opportunity score?")
+        self.assertEqual(self.service.generate_response_with_rag.call_count, 3)
+
+
+class RagDigestTests(TestCase):
+    def test_digest_is_stored_on_completion_and_used_as_chat_context(self):
+        user = User.objects.create_user('digest@example.com', 'pw', first_name='Di', last_name='Gest')
+        report = MarketReport.objects.create(
+            analysis_id='digest_1', user=user, status='processing',
+            company_name='Acme', industry='SaaS', target_market='Germany',
+        )
+        self.assertEqual(report.rag_digest, '')
+        report.status = 'completed'
+        report.detailed_scores = {
+            'market_opportunity_score': 7.2, 'competitive_intensity': 'Medium', 'competitive_intensity_score': 5.0,
+            'revenue_potential_y1': '$420K-$1.2M', 'major_risks': ['Price war', 'Currency'], 'error_info': 'x',
+        }
+        report.save(update_fields=['status', 'detailed_scores'])
+        digest = MarketReport.objects.get(pk=report.pk).rag_digest
+        self.assertIn('Scores: opportunity 7.2/10; competition Medium 5.0/10', digest)
+        self.assertIn('Revenue: Y1 $420K-$1.2M', digest)
+        self.assertIn('Risks: Price war; Currency', digest)
+        self.assertNotIn('error_info', digest)
+
+        with mock.patch('apps.analysis.chatbot_views.ChatGPTService') as service:
+            service.return_value.embed_query.return_value = None
+            service.return_value.generate_response_with_rag.return_value = {'content': 'ok', 'sources': []}
+            ChatMessageAPIView()._generate_rag_response('score?', user)
+        context = service.return_value.generate_response_with_rag.call_args.kwargs['context_reports']
+        self.assertEqual(context[0]['digest'], digest)
+        self.assertEqual(context[0]['scores'], {'market_opportunity_score': 7.2, 'competitive_intensity': 'Medium'})
+
+
+@override_settings(CHAT_HISTORY_TOKENS=200)
+class ChatMemoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('memory@example.com', 'pw', first_name='Me', last_name='Mory')
+        MarketReport.objects.create(
+            analysis_id='memory_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='Germany',
+        )
+        cls.conversation = ChatConversation.objects.create(user=cls.user, title='long')
+        for i in range(20):
+            ChatMessage.objects.create(conversation=cls.conversation, message_type='user', content=f'Question {i}')
+            ChatMessage.objects.create(conversation=cls.conversation, message_type='assistant', content=f'Answer {i} ' + 'x' * 400)
+        # A newer conversation must not leak into this one's history
+        other = ChatConversation.objects.create(user=cls.user, title='other')
+        ChatMessage.objects.create(conversation=other, message_type='user', content='Unrelated')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @mock.patch('apps.analysis.chatbot_views.ChatGPTService')
+    @mock.patch('apps.ai_agents.chatgpt_service.ChatGPTService.summarize_conversation', return_value='User is weighing Germany.')
+    def test_prompt_uses_summary_and_bounded_window_of_posted_conversation(self, summarize, service):
+        service.return_value.embed_query.return_value = None
+        service.return_value.generate_response_with_rag.return_value = {'content': 'ok', 'sources': []}
+        with mock.patch('apps.analysis.chat_memory._get_executor', return_value=_InlineExecutor()), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('analysis:chat-messages'), {
+                'content': 'And the risks?', 'conversation_id': self.conversation.id,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        kwargs = service.return_value.generate_response_with_rag.call_args.kwargs
+        history = kwargs['conversation_history']
+        self.assertEqual(history[-1]['content'].split()[:2], ['Answer', '19'])
+        self.assertLessEqual(sum(len(m['content']) for m in history), 200 * 4 + 400)
+        self.assertNotIn('Unrelated', [m['content'] for m in history])
+
+        # Turns that fell out of the window were summarized after the response
+        older = summarize.call_args.args[1]
+        self.assertEqual(older[0]['content'], 'Question 0')
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.summary, 'User is weighing Germany.')
+        memory = chat_memory.conversation_memory(self.conversation)
+        self.assertEqual(memory['summary'], 'User is weighing Germany.')
+        self.assertEqual(memory['messages'][-1]['content'], 'ok')
+
+
+    @override_settings(CHAT_HISTORY_TOKENS=1500)
+    @mock.patch('apps.ai_agents.chatgpt_service.ChatGPTService.summarize_conversation', return_value='Short chat.')
+    def test_short_turns_beyond_row_cap_are_summarized(self, summarize):
+        conversation = ChatConversation.objects.create(user=self.user, title='chatty')
+        for i in range(40):
+            ChatMessage.objects.create(conversation=conversation, message_type='user', content=f'Question {i} ' + 'y' * 40)
+            ChatMessage.objects.create(conversation=conversation, message_type='assistant', content=f'Answer {i} ' + 'y' * 40)
+        # 80 rows fit the token budget, but only the newest MAX_WINDOW_ROWS are prompted
+        window = chat_memory.conversation_memory(conversation)['messages']
+        self.assertEqual(len(window), chat_memory.MAX_WINDOW_ROWS)
+
+        self.assertTrue(chat_memory.update_summary(conversation.id))
+        older = summarize.call_args.args[1]
+        self.assertEqual(len(older), 80 - chat_memory.MAX_WINDOW_ROWS)
+        # The summary runs right up to the oldest prompted turn, leaving no gap
+        self.assertEqual(older[-1]['content'].split()[:2], ['Answer', '24'])
+        self.assertEqual(window[0]['content'].split()[:2], ['Question', '25'])
+        conversation.refresh_from_db()
+        memory = chat_memory.conversation_memory(conversation)
+        self.assertEqual(memory['summary'], 'Short chat.')
+        self.assertEqual(memory['messages'], window)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor paging and sparse fieldsets on the report and conversation lists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pager@example.com', 'pw', first_name='Pa', last_name='Ger')
+        for i in range(5):
+            MarketReport.objects.create(
+                analysis_id=f'page_{i}', user=cls.user, status='completed',
+                company_name=f'Company {i}', industry='SaaS', target_market='USA',
+                research_report=f'report body {i}',
+            )
+        for i in range(3):
+            conversation = ChatConversation.objects.create(user=cls.user, title=f'c{i}')
+            ChatMessage.objects.create(conversation=conversation, message_type='user', content='hi')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_walk_returns_every_report_once(self):
+        url = reverse('analysis:market-reports')
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            seen.extend(r['id'] for r in response.data['reports'])
+            cursor = response.data['next_cursor']
+            if not response.data['has_more']:
+                break
+        expected = list(MarketReport.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('analysis:market-reports'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(reverse('analysis:market-reports'), {'fields': 'company_name'})
+        self.assertEqual(set(response.data['reports'][0]), {'id', 'company_name'})
+
+    def test_unpaginated_list_keeps_legacy_shape(self):
+        response = self.client.get(reverse('analysis:market-reports'))
+        self.assertEqual(response.data['count'], 5)
+        self.assertNotIn('next_cursor', response.data)
+
+    def test_conversation_messages_are_prefetched(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('analysis:chat-conversations'))
+        self.assertEqual(len(response.data['conversations']), 3)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('analysis:chat-conversations'), {'fields': 'title', 'page_size': 2})
+        self.assertEqual(set(response.data['conversations'][0]), {'id', 'title'})
+        self.assertTrue(response.data['has_more'])
+
+
+class DashboardSnapshotTests(TestCase):
+    """Snapshot caching, invalidation and conditional GET for the dashboard."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dash@example.com', 'pw', first_name='Da', last_name='Sh')
+        cls.report = MarketReport.objects.create(
+            analysis_id='dash_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='USA',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('analysis:latest-dashboard')
+
+    def test_unchanged_poll_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_report_update_refreshes_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+        report = MarketReport.objects.get(pk=self.report.pk)
+        report.competitor_analysis = [{'name': 'Rival'}]
+        report.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['competitor_summary'], [{'name': 'Rival'}])
+
+    def test_report_delete_clears_snapshot(self):
+        self.client.get(self.url)
+        MarketReport.objects.filter(pk=self.report.pk).delete()
+        response = self.client.get(self.url)
+        self.assertFalse(response.data['has_data'])
+
+
+class ConditionalGetTests(TestCase):
+    """Strong ETags and If-None-Match handling on read-heavy endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('etag@example.com', 'pw', first_name='E', last_name='Tag')
+        cls.report = MarketReport.objects.create(
+            analysis_id='etag_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='USA',
+            detailed_scores={'market_opportunity_score': 7},
+            is_shared=True, share_token='tok123',
+        )
+        cls.monitor = MarketMonitor.objects.create(user=cls.user, report=cls.report)
+        cls.alert = MarketAlert.objects.create(monitor=cls.monitor, alert_type='economic', title='t', description='d')
+        cls.plan = ExecutionPlan.objects.create(user=cls.user, report=cls.report)
+        cls.milestone = Milestone.objects.create(plan=cls.plan, title='m', description='d', phase=1)
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings_override = self.settings(SHARED_SNAPSHOT_DIR=tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertRevalidates(self, url, queries=1):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_report_detail_and_shared_link(self):
+        self.assertRevalidates(reverse('analysis:market-report-detail', args=[self.report.id]))
+        # Shared links revalidate against the published snapshot after one share-token lookup
+        etag = self.assertRevalidates(reverse('analysis:shared-report', args=['tok123']), queries=1)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('analysis:shared-report', args=['tok123']), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_benchmarks(self):
+        url = reverse('analysis:benchmarks')
+        etag = self.assertRevalidates(url)
+        MarketReport.objects.create(
+            analysis_id='etag_2', user=self.user, status='completed',
+            detailed_scores={'market_opportunity_score': 3},
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_monitoring_lists(self):
+        for name in ('monitor-list-create', 'alert-list', 'execution-plan-list',
+                     'competitor-tracker-list', 'competitor-update-list'):
+            self.assertRevalidates(reverse(f'monitoring:{name}'))
+
+    def test_alert_read_changes_etag(self):
+        url = reverse('monitoring:alert-list')
+        etag = self.client.get(url)['ETag']
+        self.client.patch(reverse('monitoring:alert-mark-read', args=[self.alert.id]))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_milestone_update_changes_plan_etag(self):
+        url = reverse('monitoring:execution-plan-detail', args=[self.plan.id])
+        etag = self.assertRevalidates(url)
+        self.client.patch(reverse('monitoring:milestone-update', args=[self.milestone.id]), {'notes': 'done'}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ReportArtifactCacheTests(TestCase):
+    """Rendered exports are cached on disk and keyed on the report version."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'export@example.com', 'pw', first_name='Ex', last_name='Port', subscription_tier='enterprise',
+        )
+        cls.report = MarketReport.objects.create(
+            analysis_id='export_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='USA',
+        )
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = self.settings(REPORT_ARTIFACT_DIR=self.tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('analysis:download-report', args=[self.report.id, 'go-nogo'])
+
+    def test_repeat_download_skips_rendering(self):
+        with mock.patch('apps.analysis.report_views.REPORT_TYPES', {
+            'go-nogo': dict(REPORT_TYPES['go-nogo'], generator=mock.Mock(return_value=b'%PDF-1'))
+        }) as types:
+            first = b''.join(self.client.get(self.url).streaming_content)
+            second = b''.join(self.client.get(self.url).streaming_content)
+            self.assertEqual(types['go-nogo']['generator'].call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_report_update_renders_new_version(self):
+        report = MarketReport.objects.get(pk=self.report.pk)
+        path = artifact_path(report, 'go-nogo', 'pdf')
+        report.key_insights = ['new']
+        report.save()
+        self.assertNotEqual(path, artifact_path(report, 'go-nogo', 'pdf'))
+
+    def test_eviction_bounds_store_size(self):
+        store_artifact(self.report, 'go-nogo', 'pdf', b'x' * 100)
+        store_artifact(self.report, 'executive-summary', 'pdf', b'y' * 100)
+        evict_artifacts(max_bytes=150)
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 1)
+
+
+class _InlineExecutor:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@mock.patch('apps.analysis.report_generator.datetime', mock.Mock(now=mock.Mock(return_value=datetime(2026, 1, 5))))
+class ReportTemplateCacheTests(SimpleTestCase):
+    cached = ('_pdf_styles', '_decision_style', '_table_style', '_base_presentation_bytes')
+
+    def setUp(self):
+        from reportlab import rl_config
+
+        # Invariant mode drops ReportLab's timestamps and random document ids
+        patcher = mock.patch.object(rl_config, 'invariant', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for name in self.cached:
+            getattr(report_generator, name).cache_clear()
+
+    def render_all(self, report):
+        rendered = {}
+        for report_type, spec in REPORT_TYPES.items():
+            data = spec['generator'](report)
+            if spec['extension'] == 'pptx':
+                # Compare the package parts; zip entries carry the save time
+                with zipfile.ZipFile(io.BytesIO(data)) as package:
+                    data = {name: package.read(name) for name in package.namelist()}
+            rendered[report_type] = data
+        return rendered
+
+    def test_cached_templates_render_identical_output(self):
+        report = _sample_report()
+        cold = self.render_all(report)
+        # A different decision and colours in between must not leak into the next render
+        other = _sample_report()
+        other.dashboard_data = {**other.dashboard_data, 'market_opportunity_score': 2, 'entry_complexity_score': 9}
+        self.assertNotEqual(self.render_all(other)['go-nogo'], cold['go-nogo'])
+        self.assertEqual(self.render_all(report), cold)
+
+        for name in self.cached:
+            self.assertGreater(getattr(report_generator, name).cache_info().hits, 0, name)
+        self.assertEqual(report_generator._pdf_styles.cache_info().misses, 1)
+
+    def test_uncached_render_matches_cached_render(self):
+        report = _sample_report()
+        warm = self.render_all(report)
+        # Rebuilding every template from scratch gives byte-identical exports
+        with mock.patch.multiple(report_generator, **{
+            name: getattr(report_generator, name).__wrapped__ for name in self.cached
+        }):
+            self.assertEqual(self.render_all(report), warm)
+
+
+class ExportPrerenderTests(TestCase):
+    """Completed reports have their tier-allowed exports rendered into the artifact store."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = self.settings(REPORT_ARTIFACT_DIR=self.tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_completion_fills_cache_for_allowed_types(self):
+        user = User.objects.create_user('pre@example.com', 'pw', first_name='P', last_name='R', subscription_tier='starter')
+        fake_types = {name: dict(config, generator=mock.Mock(return_value=b'data'))
+                      for name, config in REPORT_TYPES.items()}
+        with mock.patch('apps.analysis.prerender.get_render_pool', return_value=_InlineExecutor()), \
+                mock.patch('apps.analysis.report_views.REPORT_TYPES', fake_types):
+            with self.captureOnCommitCallbacks(execute=True):
+                report = MarketReport.objects.create(analysis_id='pre_1', user=user, status='completed', company_name='Acme')
+        cached = sorted(name.split('_')[1] for name in os.listdir(self.tmpdir.name))
+        self.assertEqual(cached, ['executive-summary', 'go-nogo', 'investment-memo'])
+        handle = open_artifact(report, 'go-nogo', 'pdf')
+        self.assertIsNotNone(handle)
+        handle.close()
+
+
+class BulkExportTests(TestCase):
+    """Streaming ZIP export across reports and formats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'bulk@example.com', 'pw', first_name='Bu', last_name='Lk', subscription_tier='enterprise',
+        )
+        for i in range(2):
+            MarketReport.objects.create(
+                analysis_id=f'bulk_{i}', user=cls.user, status='completed',
+                company_name=f'Acme {i}', industry='SaaS', target_market='USA',
+            )
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = self.settings(REPORT_ARTIFACT_DIR=self.tmpdir.name, REPORT_PRERENDER_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('analysis:bulk-export')
+
+    def _export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_archive_contains_every_report_and_format(self):
+        generator = mock.Mock(return_value=b'%PDF-1')
+        with mock.patch.dict(REPORT_TYPES['go-nogo'], generator=generator):
+            archive = self._export(types='go-nogo,json')
+            self.assertEqual(len(archive.namelist()), 4)
+            self.assertEqual(generator.call_count, 2)
+            # Second export is served entirely from the artifact cache
+            self._export(types='go-nogo')
+            self.assertEqual(generator.call_count, 2)
+        name = next(n for n in archive.namelist() if n.endswith('json'))
+        self.assertIn('company_name', json.loads(archive.read(name)))
+
+    def test_requires_enterprise_tier(self):
+        self.user.subscription_tier = 'starter'
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class SharedSnapshotTests(TestCase):
+    """Shared reports are served from pre-compressed static snapshots."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('share@example.com', 'pw', first_name='Sh', last_name='Are')
+        cls.report = MarketReport.objects.create(
+            analysis_id='share_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='USA',
+        )
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = self.settings(SHARED_SNAPSHOT_DIR=self.tmpdir.name, REPORT_PRERENDER_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('analysis:share-report', args=[self.report.id]))
+        self.token = response.data['share_token']
+        self.url = reverse('analysis:shared-report', args=[self.token])
+        self.anonymous = APIClient()
+
+    def test_snapshot_served_precompressed_after_share_check(self):
+        # One indexed share-token lookup; the body comes from the static store
+        with self.assertNumQueries(1):
+            response = self.anonymous.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+        body = json.loads(brotli.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(body['company_name'], 'Acme')
+
+    def test_versioned_snapshot_is_cached_briefly(self):
+        location = self.anonymous.get(self.url)['Content-Location']
+        response = self.anonymous.get(location)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+        html = self.anonymous.get(location.replace('.json', '.html'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn(b'Acme', gzip.decompress(b''.join(html.streaming_content)))
+
+        # Unshared on another host: the files are still here, but the link is dead
+        MarketReport.objects.filter(pk=self.report.pk).update(is_shared=False)
+        self.assertEqual(self.anonymous.get(location).status_code, 404)
+
+    def test_superseded_version_kept_for_grace_period(self):
+        old_version = read_current_version(self.token)
+        directory = os.path.join(self.tmpdir.name, self.token)
+        in_flight = tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False).name
+        report = MarketReport.objects.get(pk=self.report.pk)
+        report.key_insights = [{'title': 'New'}]
+        new_version = publish_snapshot(report)
+        self.assertNotEqual(new_version, old_version)
+        self.assertTrue(os.path.exists(os.path.join(directory, f'{old_version}.json')))
+
+        with mock.patch('apps.analysis.share_snapshots.SUPERSEDED_GRACE_SECONDS', -1):
+            report.key_insights = [{'title': 'Newer'}]
+            publish_snapshot(report)
+        self.assertFalse(os.path.exists(os.path.join(directory, f'{old_version}.json')))
+        self.assertTrue(os.path.exists(in_flight))
+
+    def test_report_update_republishes(self):
+        etag = self.anonymous.get(self.url)['ETag']
+        report = MarketReport.objects.get(pk=self.report.pk)
+        report.key_insights = [{'title': 'New'}]
+        with self.captureOnCommitCallbacks(execute=True):
+            report.save()
+        response = self.anonymous.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['key_insights'], [{'title': 'New'}])
+
+    def test_share_link_revoked_on_another_host(self):
+        self.anonymous.get(self.url)
+        MarketReport.objects.filter(pk=self.report.pk).update(is_shared=False, share_token=None)
+        self.assertIsNotNone(read_current_version(self.token))
+        self.assertEqual(self.anonymous.get(self.url).status_code, 404)
+
+    def test_save_racing_an_unshare_does_not_republish(self):
+        report = MarketReport.objects.get(pk=self.report.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            report.save()
+        self.client.post(reverse('analysis:unshare-report', args=[self.report.id]))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(read_current_version(self.token))
+
+    def test_unshare_deletes_snapshot(self):
+        location = self.anonymous.get(self.url)['Content-Location']
+        self.client.post(reverse('analysis:unshare-report', args=[self.report.id]))
+        self.assertEqual(self.anonymous.get(self.url).status_code, 404)
+        self.assertEqual(self.anonymous.get(location).status_code, 404)
+
+
+class RenderingAndCompressionTests(TestCase):
+    """orjson rendering and negotiated response compression."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('zip@example.com', 'pw', first_name='Zi', last_name='P')
+        cls.report = MarketReport.objects.create(
+            analysis_id='zip_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='USA',
+            research_report='Demand is growing across the mid-market. ' * 200,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('analysis:market-report-detail', args=[self.report.id])
+
+    def test_orjson_renderer_matches_stock_output(self):
+        data = {'when': timezone.now(), 'amount': Decimal('1.50'), 1: 'int key', 'nested': [{'a': None}]}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_brotli_preferred_and_etag_revalidates(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(brotli.decompress(response.content))['company_name'], 'Acme')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_brotli_not_larger_than_gzip(self):
+        from .management.commands.benchmark_json_rendering import _sample_payload
+        from .middleware import compress
+
+        body = ORJSONRenderer().render(_sample_payload())
+        self.assertLessEqual(len(compress(body, 'br')), len(compress(body, 'gzip')))
+
+    def test_gzip_fallback_and_identity(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(self.client.get(self.url).has_header('Content-Encoding'))
+
+
+@override_settings(LLM_RATE_LIMIT_BACKEND='local')
+class LocalScorerTests(TestCase):
+    report = (
+        'The German SaaS market size is $2.3 billion TAM, growing at a 12% CAGR. '
+        'There are 8 major competitors. Setup takes 6-9 months to obtain licenses.'
+    )
+
+    def test_rubric_scores_from_report_facts(self):
+        scores = local_scorer.score_text(self.report)
+        self.assertGreaterEqual(scores['market_opportunity_score'], 7.0)
+        self.assertEqual(scores['competitive_intensity'], 'Medium')
+        self.assertTrue(5.0 <= scores['entry_complexity_score'] <= 8.0)
+        self.assertEqual(len(scores['evidence']), 3)
+
+    def test_outliers_only_flagged_for_evidence_backed_scores(self):
+        local = local_scorer.score_facts({'market_size_usd': 5e6, 'signals': {}})
+        outliers = local_scorer.find_outliers({'market_opportunity_score': 9.5, 'entry_complexity_score': 9.5}, local)
+        self.assertEqual(list(outliers), ['market_opportunity_score'])
+
+    @mock.patch('apps.ai_agents.scoring_agent.openai.OpenAI')
+    def test_llm_failure_falls_back_to_rule_based_scores(self, openai_client):
+        openai_client.return_value.chat.completions.create.side_effect = RuntimeError('rate limited')
+        scores = MarketScoringAgent().score_research_report(self.report, {'company_name': 'Acme'})
+        self.assertEqual(scores['error_info'], 'rate limited')
+        self.assertGreaterEqual(scores['market_opportunity_score'], 7.0)
+        self.assertEqual(scores['confidence_level'], 'Low')
+
+
+class NumberExtractorTests(SimpleTestCase):
+    def test_typed_values_with_labels_and_sentences(self):
+        values = number_extractor.extract_values(
+            'The market size is $2.3 billion, growing at 8-15% a year. The leader holds a 25% share.\n\n'
+            'There are 8 major competitors. Licensing takes 6-9 months.'
+        )
+        summary = [(v['kind'], v['value'], v['label'], v['sentence']) for v in values]
+        self.assertEqual(summary, [
+            ('money', 2.3e9, 'market_size', 0),
+            ('percent', 11.5, 'growth', 0),
+            ('percent', 25.0, 'market_share', 1),
+            ('count', 8.0, 'competitors', 3),
+            ('count', 9.0, 'setup_months', 4),
+        ])
+        self.assertEqual(values[2]['context'], 'The leader holds a 25% share.')
+
+    def test_market_derivatives_are_not_market_size(self):
+        for text in ('Marketing reached $5 billion.', 'The marketplace sold $3 billion.'):
+            self.assertIsNone(number_extractor.extract_values(text)[0]['label'], text)
+        self.assertEqual(number_extractor.extract_values('Markets reached $5 billion.')[0]['label'], 'market_size')
+        self.assertNotIn('market_size_usd', number_extractor.extract_numbers('Marketing spend hit $5 billion.'))
+
+    def test_summary_feeds_local_scorer(self):
+        summary = number_extractor.extract_numbers('A $40 million market. Revenue reached $2 million.')
+        self.assertEqual(summary['market_size_usd'], [4e7])
+        self.assertEqual(local_scorer.facts_from_text('', summary)['market_size_usd'], 4e7)
+
+
+@override_settings(LLM_RATE_LIMIT_BACKEND='local')
+class JSONRepairTests(TestCase):
+    def test_fenced_truncated_array_keeps_complete_items(self):
+        text = (
+            'Here are the competitors:\n```json\n[{"name": "Acme {EU}", "market_share": "25%", "tags": [1, 2],},\n'
+            ' {"name": "Beta", "description": "Regional '
+        )
+        competitors = json_repair.parse(text, COMPETITOR_SCHEMA)
+        self.assertEqual([c['name'] for c in competitors], ['Acme {EU}', 'Beta'])
+        self.assertEqual(competitors[0]['tags'], [1, 2])
+        self.assertEqual(competitors[1]['market_share'], 'unknown')
+
+    @mock.patch('apps.ai_agents.scoring_agent.openai.OpenAI')
+    def test_unparseable_scores_trigger_one_reask(self, openai_client):
+        create = openai_client.return_value.chat.completions.create
+        create.side_effect = [
+            mock.Mock(choices=[mock.Mock(message=mock.Mock(content='Opportunity is strong: 8/10.'))]),
+            mock.Mock(choices=[mock.Mock(message=mock.Mock(content=json.dumps({'result': {
+                'market_opportunity_score': 8.0, 'competitive_intensity_score': 5.0, 'entry_complexity_score': 6.0,
+            }})))]),
+        ]
+        scores = MarketScoringAgent().score_research_report('A $2.3 billion market.', {'company_name': 'Acme'})
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual(create.call_args.kwargs['response_format'], {'type': 'json_object'})
+        self.assertEqual(scores['market_opportunity_score'], 8.0)
+        self.assertNotIn('error_info', scores)
+
+
+class LLMRateLimiterTests(TestCase):
+    limits = {'rpm': 60, 'tpm': 1000}
+
+    def test_background_leaves_headroom_for_interactive(self):
+        store = rate_limiter.LocalBucketStore()
+        self.assertEqual(store.try_acquire('m', self.limits, 650, rate_limiter.PRIORITY_RESERVE['background']), 0)
+        self.assertGreater(store.try_acquire('m', self.limits, 100, rate_limiter.PRIORITY_RESERVE['background']), 0)
+        self.assertEqual(store.try_acquire('m', self.limits, 300, rate_limiter.PRIORITY_RESERVE['interactive']), 0)
+
+    @override_settings(LLM_RATE_LIMITS={'gpt-4o': {'rpm': 60, 'tpm': 1000}})
+    def test_shared_bucket_is_reconciled_with_reported_usage(self):
+        openai_client = mock.Mock()
+        openai_client.chat.completions.create.return_value = mock.Mock(usage=mock.Mock(total_tokens=120))
+        client = rate_limiter.RateLimitedClient(openai_client, priority='standard')
+        client.chat.completions.create(model='gpt-4o', messages=[{'role': 'user', 'content': 'x' * 400}], max_tokens=300)
+
+        # 400 tokens estimated up front, 120 actually used
+        self.assertAlmostEqual(rate_limiter.get_limiter().store.levels()['gpt-4o']['tokens'], 880, delta=5)
+        admin = User.objects.create_user('ops@example.com', 'pw', first_name='Op', last_name='S', role='admin')
+        api = APIClient()
+        api.force_authenticate(admin)
+        metrics = api.get(reverse('admin_llm_status')).data['rate_limiter']
+        self.assertGreaterEqual(metrics['waits']['gpt-4o:standard']['calls'], 1)
+        self.assertEqual(metrics['waits_scope'], 'process')
+        self.assertIn('gpt-4o', metrics['buckets'])
+
+    def test_model_without_configured_limits_is_only_observed(self):
+        limiter = rate_limiter.RateLimiter(rate_limiter.LocalBucketStore(), max_wait=0)
+        self.assertEqual(limiter.acquire('gpt-4o', 10 ** 9, 'background'), 0.0)
+        self.assertEqual(limiter.store.levels(), {})
+        self.assertEqual(limiter.metrics()['waits']['gpt-4o:background']['calls'], 1)
+
+        with self.settings(LLM_RATE_LIMITS={'gpt-4o': self.limits}):
+            limiter.acquire('gpt-4o', 900, 'background')
+            with self.assertRaises(rate_limiter.RateLimitTimeout):
+                limiter.acquire('gpt-4o', 900, 'background')
+
+
+@override_settings(ANALYSIS_MAX_CONCURRENT=1)
+class AnalysisJobSchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.free = User.objects.create_user('free@example.com', 'pw', first_name='Fr', last_name='Ee')
+        cls.enterprise = User.objects.create_user('ent@example.com', 'pw', first_name='En', last_name='T',
+                                                  subscription_tier='enterprise')
+
+    def enqueue(self, user, cycles='3'):
+        return job_scheduler.enqueue(user, f'user:{user.pk}', job_scheduler.job_cost(cycles))
+
+    def test_weighted_lanes_and_per_user_caps(self):
+        running = self.enqueue(self.free)
+        self.assertTrue(job_scheduler.try_start(running))
+        free_next = self.enqueue(self.free, cycles='20')
+        enterprise_first, enterprise_second = self.enqueue(self.enterprise), self.enqueue(self.enterprise)
+        # The only slot is taken
+        self.assertFalse(job_scheduler.try_start(enterprise_first))
+        job_scheduler.finish(running)
+
+        # The enterprise lane's tags advance 8x slower, so both of its runs go ahead of the free 20-cycle run
+        self.assertFalse(job_scheduler.try_start(free_next))
+        self.assertTrue(job_scheduler.try_start(enterprise_first))
+        with override_settings(ANALYSIS_MAX_CONCURRENT=3):
+            self.assertTrue(job_scheduler.try_start(enterprise_second))
+            self.assertTrue(job_scheduler.try_start(free_next))
+            # Free users are capped at one run each, even with a slot free
+            self.assertFalse(job_scheduler.try_start(self.enqueue(self.free)))
+
+        lanes = job_scheduler.lane_metrics()
+        self.assertEqual(lanes['enterprise']['running'], 2)
+        self.assertEqual((lanes['free']['running'], lanes['free']['queued']), (1, 1))
+        self.assertEqual(lanes['free']['started_last_hour'], 2)
+
+    def test_queue_timeout_returns_503(self):
+        job_scheduler.try_start(self.enqueue(self.enterprise))
+        client = APIClient()
+        client.force_authenticate(self.free)
+        with override_settings(ANALYSIS_QUEUE_MAX_WAIT=0):
+            response = client.post(reverse('analysis:competitor-analysis'), {'company_name': 'Acme'}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(job_scheduler.lane_metrics()['free']['queued'], 0)
+
+    def test_running_job_without_heartbeat_frees_its_slot(self):
+        crashed = self.enqueue(self.enterprise)
+        self.assertTrue(job_scheduler.try_start(crashed))
+        # The worker running it was killed, so its ticker stopped
+        AnalysisJob.objects.filter(pk=crashed.pk).update(
+            heartbeat_at=timezone.now() - job_scheduler.HEARTBEAT_TIMEOUT * 2)
+        self.assertTrue(job_scheduler.try_start(self.enqueue(self.free)))
+        self.assertEqual(AnalysisJob.objects.get(pk=crashed.pk).state, 'abandoned')
+
+    def test_array_body_is_not_a_server_error(self):
+        client = APIClient()
+        client.force_authenticate(self.free)
+        response = client.post(reverse('analysis:competitor-analysis'), [{'company_name': 'Acme'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+# The heartbeat ticker writes from its own thread, so rows must be committed
+class AnalysisJobHeartbeatTests(TransactionTestCase):
+    @mock.patch('apps.analysis.job_scheduler.RUNNING_HEARTBEAT_SECONDS', 0.05)
+    def test_running_job_heartbeats_until_it_finishes(self):
+        stale = timezone.now() - job_scheduler.HEARTBEAT_TIMEOUT * 2
+        with job_scheduler.analysis_slot(None, 'anon:1', job_scheduler.job_cost()) as job:
+            AnalysisJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+            deadline = time.monotonic() + 5
+            while AnalysisJob.objects.get(pk=job.pk).heartbeat_at == stale and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertGreater(AnalysisJob.objects.get(pk=job.pk).heartbeat_at, stale)
+        self.assertEqual(AnalysisJob.objects.get(pk=job.pk).state, 'done')
+
+
+# Provisional scores are saved from the research event loop's worker thread, so rows must be committed
+class SpeculativeScoringTests(TransactionTestCase):
+    @mock.patch('apps.ai_agents.scoring_agent.openai.OpenAI')
+    def test_provisional_scores_published_then_compared_with_final(self, openai_client):
+        user = User.objects.create_user('spec@example.com', 'pw', first_name='Sp', last_name='Ec')
+        job = job_scheduler.enqueue(user, f'user:{user.pk}', job_scheduler.job_cost())
+        self.assertTrue(job_scheduler.try_start(job))
+        on_findings = speculative.listener(job, MarketScoringAgent(), {'company_name': 'Acme'})
+        asyncio.run(on_findings(2, [LocalScorerTests.report]))
+
+        client = APIClient()
+        client.force_authenticate(user)
+        progress = client.get(reverse('analysis:analysis-progress')).json()['jobs'][0]
+        self.assertEqual((progress['state'], progress['provisional_iteration']), ('running', 2))
+        provisional = progress['provisional_scores']
+        self.assertGreaterEqual(provisional['market_opportunity_score'], 7.0)
+        self.assertIsNone(progress['final_scores'])
+
+        final = {**provisional, 'market_opportunity_score': provisional['market_opportunity_score'] - 1.5}
+        speculative.record_final(job, final)
+        job_scheduler.finish(job)
+        job.refresh_from_db()
+        self.assertAlmostEqual(job.score_delta['market_opportunity_score'], -1.5)
+        self.assertEqual(job.score_delta['entry_complexity_score'], 0)
+        accuracy = speculative.provisional_accuracy()
+        self.assertEqual(accuracy['runs'], 1)
+        self.assertAlmostEqual(accuracy['fields']['market_opportunity_score']['mean_abs_delta'], 1.5)
+
+
+@override_settings(LLM_RATE_LIMIT_BACKEND='local', LLM_BREAKER_FAILURES=2)
+class LLMResilienceTests(TestCase):
+    def setUp(self):
+        resilience.reset()
+        self.addCleanup(resilience.reset)
+        sleep = mock.patch('apps.ai_agents.resilience.time.sleep')
+        sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def outage(self):
+        return openai.APIConnectionError(request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions'))
+
+    def test_transient_errors_are_retried_and_others_are_not(self):
+        attempt = mock.Mock(side_effect=[self.outage(), 'ok'])
+        self.assertEqual(resilience.call('gpt-4o', attempt), 'ok')
+        attempt = mock.Mock(side_effect=ValueError('bad request'))
+        with self.assertRaises(ValueError):
+            resilience.call('gpt-4o', attempt)
+        self.assertEqual(attempt.call_count, 1)
+        self.assertEqual(resilience.breaker_states()['gpt-4o']['state'], 'closed')
+
+    @mock.patch('apps.ai_agents.scoring_agent.openai.OpenAI')
+    def test_open_circuit_fails_fast_to_local_scores(self, openai_client):
+        create = openai_client.return_value.chat.completions.create
+        create.side_effect = self.outage()
+        agent = MarketScoringAgent()
+        agent.score_research_report('The market size is $2.3 billion.', {'company_name': 'Acme'})
+        self.assertEqual(resilience.breaker_states()['gpt-4o']['state'], 'open')
+
+        calls = create.call_count
+        scores = agent.score_research_report('The market size is $2.3 billion.', {'company_name': 'Acme'})
+        self.assertEqual(create.call_count, calls)
+        self.assertIn('circuit is open', scores['error_info'])
+
+    def test_slow_call_is_hedged_after_p95(self):
+        for _ in range(resilience.MIN_HEDGE_SAMPLES):
+            resilience._record_latency('gpt-4', 0.01)
+        release = threading.Event()
+        answers = iter(['slow', 'fast'])
+
+        def attempt():
+            answer = next(answers)
+            if answer == 'slow':
+                release.wait(5)
+            return answer
+
+        self.assertEqual(resilience.call('gpt-4', attempt, hedge=True), 'fast')
+        release.set()
+
+    def test_hedge_loser_is_cancelled(self):
+        for _ in range(resilience.MIN_HEDGE_SAMPLES):
+            resilience._record_latency('gpt-4', 0.01)
+        futures = []
+
+        def submit(fn):
+            future = Future()
+            if not futures:
+                threading.Timer(0.2, future.set_result, ['primary']).start()
+            futures.append(future)
+            return future
+
+        executor = mock.Mock(submit=mock.Mock(side_effect=submit))
+        with mock.patch('apps.ai_agents.resilience._get_executor', return_value=executor):
+            self.assertEqual(resilience.call('gpt-4', mock.Mock(), hedge=True), 'primary')
+        self.assertEqual(len(futures), 2)
+        self.assertTrue(futures[1].cancelled())
+
+    def test_call_that_waited_for_the_limiter_is_not_hedged(self):
+        for _ in range(resilience.MIN_HEDGE_SAMPLES):
+            resilience._record_latency('gpt-4', 0.01)
+        attempt = mock.Mock(side_effect=lambda: threading.Event().wait(0.1) or 'ok')
+        try_acquire = mock.Mock(return_value=True)
+        result = resilience.call('gpt-4', attempt, hedge=True, acquire=lambda: 1.5, try_acquire=try_acquire)
+        self.assertEqual(result, 'ok')
+        self.assertEqual(attempt.call_count, 1)
+        try_acquire.assert_not_called()
+        # Only the call itself was timed, not the wait
+        self.assertLess(max(resilience._latencies['gpt-4']), 1.0)
+
+    @override_settings(LLM_BREAKER_RESET_SECONDS=0)
+    def test_rate_limit_timeout_is_not_counted_by_the_breaker(self):
+        attempt = mock.Mock(side_effect=self.outage())
+        with self.assertRaises(openai.APIConnectionError):
+            resilience.call('gpt-4o', attempt)
+        self.assertEqual(resilience.breaker_states()['gpt-4o']['state'], 'open')
+
+        timeout = mock.Mock(side_effect=rate_limiter.RateLimitTimeout('gpt-4o rate limit'))
+        with self.assertRaises(rate_limiter.RateLimitTimeout):
+            resilience.call('gpt-4o', attempt, acquire=timeout)
+        # The probe never reached the service: no verdict, and the next call may probe
+        self.assertEqual(resilience.breaker_states()['gpt-4o']['state'], 'half_open')
+        self.assertEqual(resilience.call('gpt-4o', lambda: 'ok', acquire=lambda: 0.0), 'ok')
+        self.assertEqual(resilience.breaker_states()['gpt-4o']['state'], 'closed')
+
+
+class ModelRouterTests(TestCase):
+    def test_routes_by_task_and_cycles_tier(self):
+        self.assertEqual(model_router.route('chat_followup')['model'], 'gpt-4o-mini')
+        quick, deep = model_router.route('market_research', '3'), model_router.route('market_research', '20')
+        self.assertEqual((quick['tier'], quick['roles']['fast']), ('quick', 'gpt-4o-mini'))
+        self.assertEqual((deep['tier'], deep['roles']['fast']), ('deep', 'gpt-4o'))
+
+    @override_settings(LLM_ROUTE_EXPERIMENTS={'competitor_listing': {'model': 'gpt-4o', 'share': 1.0}},
+                       LLM_ROUTES={'market_research': {'deep': 'gpt-4'}})
+    def test_single_model_for_research_task_replaces_main_role(self):
+        with mock.patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'SERPER_API_KEY': 'test-key'}):
+            agent = CompetitorResearchAgent('20')
+        listing, research = agent.routes['competitor_listing'], agent.routes['market_research']
+        deep_listing = model_router.ROUTES['competitor_listing']['deep']
+        self.assertEqual((listing['variant'], listing['roles']), ('experiment', {**deep_listing, 'main': 'gpt-4o'}))
+        self.assertEqual((research['model'], research['roles']['fast']), ('gpt-4', 'gpt-4o'))
+
+        with self.settings(LLM_ROUTES={'market_research': {'default': {'main': 'gpt-4o'}}}):
+            with self.assertRaises(ValueError):
+                model_router.route('market_research')
+
+    @override_settings(LLM_RATE_LIMIT_BACKEND='local',
+                       LLM_ROUTE_EXPERIMENTS={'scoring': {'model': 'gpt-4o-mini', 'share': 1.0}})
+    @mock.patch('apps.ai_agents.scoring_agent.openai.OpenAI')
+    def test_calls_are_recorded_with_their_route(self, openai_client):
+        usage = mock.Mock(prompt_tokens=1000, completion_tokens=100, total_tokens=1100)
+        create = openai_client.return_value.chat.completions.create
+        create.side_effect = [
+            mock.Mock(usage=usage, choices=[mock.Mock(message=mock.Mock(content='Opportunity is strong: 8/10.'))]),
+            mock.Mock(usage=usage, choices=[mock.Mock(message=mock.Mock(content=json.dumps({'result': {
+                'market_opportunity_score': 8.0, 'competitive_intensity_score': 5.0, 'entry_complexity_score': 6.0,
+            }})))]),
+        ]
+        MarketScoringAgent().score_research_report('A $2.3 billion market.', {'company_name': 'Acme', 'cycles': '7'})
+        self.assertEqual(create.call_args_list[0].kwargs['model'], 'gpt-4o-mini')
+        self.assertNotIn('route', create.call_args_list[0].kwargs)
+
+        scoring = LLMCall.objects.get(task='scoring')
+        self.assertEqual((scoring.tier, scoring.variant, scoring.validation_failed), ('standard', 'experiment', True))
+        self.assertAlmostEqual(scoring.cost_usd, 0.00021)
+        self.assertTrue(LLMCall.objects.filter(task='json_repair', validation_failed=False).exists())
+
+        admin = User.objects.create_user('ab@example.com', 'pw', first_name='A', last_name='B', role='admin')
+        api = APIClient()
+        api.force_authenticate(admin)
+        routes = api.get(reverse('admin_llm_routing')).data['routes']
+        scoring_row = next(row for row in routes if row['task'] == 'scoring')
+        self.assertEqual((scoring_row['calls'], scoring_row['validation_failure_rate']), (1, 1.0))
+
+    @override_settings(LLM_RATE_LIMIT_BACKEND='local')
+    @mock.patch('apps.ai_agents.scoring_agent.openai.OpenAI')
+    def test_scoring_prompt_prefix_is_static_and_cache_hits_are_reported(self, openai_client):
+        usage = mock.Mock(prompt_tokens=3000, completion_tokens=200, total_tokens=3200,
+                          prompt_tokens_details=mock.Mock(cached_tokens=2048))
+        create = openai_client.return_value.chat.completions.create
+        create.return_value = mock.Mock(usage=usage, choices=[mock.Mock(message=mock.Mock(content=json.dumps({
+            'market_opportunity_score': 8.0, 'competitive_intensity_score': 5.0, 'entry_complexity_score': 6.0,
+        })))])
+        agent = MarketScoringAgent()
+        agent.score_research_report('A $2.3 billion market.', {'company_name': 'Acme', 'target_market': 'Germany'})
+        agent.score_research_report('A $40 million market.', {'company_name': 'Beta', 'target_market': 'Brazil'})
+
+        first, second = (call.kwargs['messages'] for call in create.call_args_list)
+        self.assertEqual(first[0], second[0])
+        self.assertNotIn('Acme', first[0]['content'])
+        self.assertIn('Acme', first[1]['content'])
+
+        [row] = model_router.prompt_cache_report()
+        self.assertTrue(row['prompt_template'].startswith('scoring/v2#'))
+        self.assertEqual((row['calls'], row['cached_tokens']), (2, 4096))
+        self.assertAlmostEqual(row['cached_ratio'], 2048 / 3000)
+
+
+class ScenarioModelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('scenario@example.com', 'pw', first_name='Sc', last_name='En')
+        cls.report = MarketReport.objects.create(
+            analysis_id='scenario_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='Germany',
+            detailed_scores={
+                'market_opportunity_score': 7.2, 'competitive_intensity_score': 5.0, 'entry_complexity_score': 6.0,
+                'revenue_potential_y1': '$420K-$1.2M', 'revenue_potential_y3': '$4M-$12M',
+            },
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('analysis:scenario-model')
+
+    def test_baseline_assumptions_leave_scores_unchanged(self):
+        response = self.client.post(self.url, {'report_id': self.report.id, 'variable_changes': {
+            'budget': 'moderate', 'entry_mode': 'solo', 'timeline': '12 months', 'team_size': '5 people',
+        }}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['deltas'].values()), {0.0})
+        self.assertEqual(response.data['adjusted_scores']['revenue_potential_y1'], '$420K-$1.2M')
+
+    def test_joint_venture_lowers_complexity(self):
+        response = self.client.post(self.url, {'report_id': self.report.id, 'variable_changes': {'entry_mode': 'joint_venture'}}, format='json')
+        self.assertEqual(response.data['deltas']['entry_complexity_score'], -1.0)
+        self.assertIn('entry_mode_joint_venture', response.data['contributions'])
+
+    def test_grid_evaluates_every_combination(self):
+        response = self.client.post(self.url, {'report_id': self.report.id, 'grid': {
+            'budget': ['low', 'high'], 'timeline': [6, 12, 18],
+        }}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['scenarios']), 6)
+        self.assertEqual(response.data['scenarios'][-1]['variable_changes'], {'budget': 'high', 'timeline': 18})
+
+    def test_unknown_variable_rejected(self):
+        response = self.client.post(self.url, {'report_id': self.report.id, 'variable_changes': {'weather': 'sunny'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class FinancialModelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('finance@example.com', 'pw', first_name='Fi', last_name='N')
+        cls.report = MarketReport.objects.create(
+            analysis_id='finance_1', user=cls.user, status='completed',
+            company_name='Acme', industry='SaaS', target_market='Germany',
+            revenue_projections={'year_1': '$420K-$1.2M', 'year_3': '$4M-$12M'},
+            detailed_scores={'competitive_intensity_score': 6.5, 'entry_complexity_score': 7.0, 'market_opportunity_score': 8.0},
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('analysis:financial-model', args=[self.report.id])
+
+    @mock.patch('apps.ai_agents.financial_agent.openai.OpenAI')
+    def test_simulated_scenarios_bracket_the_stated_range(self, openai_client):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        openai_client.assert_not_called()
+
+        percentiles = response.data['simulation']['percentiles']['year_3']
+        self.assertLess(percentiles['p10'], percentiles['p50'])
+        self.assertLess(percentiles['p50'], percentiles['p90'])
+        # The stated range is read as P10-P90, so the simulation should land close to it.
+        self.assertAlmostEqual(percentiles['p10'] / 4e6, 1, delta=0.1)
+        self.assertAlmostEqual(percentiles['p90'] / 12e6, 1, delta=0.1)
+        self.assertEqual(set(response.data['scenario_projections']), {'conservative', 'base', 'optimistic'})
+
+        scores = [v['sensitivity_score'] for v in response.data['sensitivity_analysis']['variables']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(scores[0], 10.0)
+
+    def test_results_are_deterministic_per_report(self):
+        first = self.client.get(self.url).data['scenario_projections']
+        self.assertEqual(self.client.get(self.url).data['scenario_projections'], first)
@@ -4,6 +4,7 @@ from .views import (
     MarketAnalysisAPIView, 
     DeepMarketAnalysisAPIView,
     HealthCheckAPIView, 
+    AnalysisProgressAPIView,
     quick_market_analysis,
     KeyInsightsAPIView,
     CompetitorAnalysisAPIView,
@@ -16,8 +17,8 @@ from .chatbot_views import (
     ChatMessageAPIView,
     ChatHistoryAPIView,
 )
-from .report_views import DownloadReportView
-from .sharing_views import ShareReportView, UnshareReportView, SharedReportView
+from .report_views import BulkExportView, DownloadReportView
+from .sharing_views import ShareReportView, UnshareReportView, SharedReportView, SharedSnapshotView
 from .benchmark_views import BenchmarkView
 from .phase3_views import (
     MultiMarketAnalysisView,
@@ -36,6 +37,7 @@ urlpatterns = [
     path('market-analysis/', MarketAnalysisAPIView.as_view(), name='market-analysis'),
     path('deep-analysis/', DeepMarketAnalysisAPIView.as_view(), name='deep-analysis'),
     path('quick-analysis/', quick_market_analysis, name='quick-analysis'),
+    path('analysis-progress/', AnalysisProgressAPIView.as_view(), name='analysis-progress'),
     path('key-insights/', KeyInsightsAPIView.as_view(), name='key-insights'),
     path('competitor-analysis/', CompetitorAnalysisAPIView.as_view(), name='competitor-analysis'),
     path('segment-arbitrage/', SegmentArbitrageAPIView.as_view(), name='segment-arbitrage'),
@@ -50,6 +52,7 @@ urlpatterns = [
 
     # Report downloads
     path('reports/<int:report_id>/download/<str:report_type>/', DownloadReportView.as_view(), name='download-report'),
+    path('reports/export/', BulkExportView.as_view(), name='bulk-export'),
 
     # Phase 3: Advanced Analysis
     path('multi-market-analysis/', MultiMarketAnalysisView.as_view(), name='multi-market-analysis'),
@@ -65,5 +68,6 @@ urlpatterns = [
     path('reports/<int:report_id>/share/', ShareReportView.as_view(), name='share-report'),
     path('reports/<int:report_id>/unshare/', UnshareReportView.as_view(), name='unshare-report'),
     path('shared/<str:share_token>/', SharedReportView.as_view(), name='shared-report'),
+    path('shared/<str:share_token>/v/<slug:version>.<slug:fmt>', SharedSnapshotView.as_view(), name='shared-report-snapshot'),
     path('benchmarks/', BenchmarkView.as_view(), name='benchmarks'),
 ]
\ No newline at end of file
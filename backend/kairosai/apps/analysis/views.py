@@ -10,6 +10,8 @@ from datetime import datetime
 from typing import Dict
 
 from .models import MarketReport
+from .job_scheduler import scheduled_analysis
+from . import speculative
 from apps.accounts.permissions import HasAnalysisQuota
 
 logger = logging.getLogger(__name__)
@@ -45,6 +47,7 @@ class ComprehensiveAnalysisAPIView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated, HasAnalysisQuota]
     
+    @scheduled_analysis
     def post(self, request):
         try:
             # Validate input data
@@ -93,6 +96,8 @@ class ComprehensiveAnalysisAPIView(APIView):
                 asyncio.set_event_loop(loop)
             
             research_agent = CompetitorResearchAgent(cycles=cycles)
+            scoring_agent = MarketScoringAgent()
+            job = getattr(request, 'analysis_job', None)
             
             # Run ALL THREE analyses in parallel using asyncio.gather
             logger.info("Running market research, competitor analysis, and arbitrage analysis in parallel...")
@@ -103,7 +108,8 @@ class ComprehensiveAnalysisAPIView(APIView):
                         company=company_info['company_name'],
                         industry=company_info['industry'],
                         target_country=company_info['target_market'],
-                        company_info=company_info
+                        company_info=company_info,
+                        on_findings=speculative.listener(job, scoring_agent, company_info)
                     ),
                     research_agent.generate_competitor_report(
                         company=company_info['company_name'],
@@ -122,9 +128,9 @@ class ComprehensiveAnalysisAPIView(APIView):
             
             logger.info("✅ All three analyses complete!")
             
-            # Generate scores
-            scoring_agent = MarketScoringAgent()
+            # Generate scores; they replace the provisional scores published during research
             scores = scoring_agent.score_research_report(market_research, company_info)
+            speculative.record_final(job, scores)
             
             # Generate analysis ID
             analysis_id = f"{company_info['company_name']}_{company_info['target_market']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -397,6 +403,7 @@ class MarketAnalysisAPIView(APIView):
     """
     permission_classes = [permissions.AllowAny]  # Allow both authenticated and unauthenticated access
     
+    @scheduled_analysis
     def post(self, request):
         try:
             # Validate input data
@@ -451,20 +458,23 @@ class MarketAnalysisAPIView(APIView):
             
             # Run the research agent with enhanced prompts
             research_agent = CompetitorResearchAgent(cycles=cycles)
+            scoring_agent = MarketScoringAgent()
+            job = getattr(request, 'analysis_job', None)
             
-            # Execute the research with company context
+            # Execute the research with company context, publishing provisional scores as findings come in
             research_report = loop.run_until_complete(
                 research_agent.research_market(
                     company=company_info['company_name'],
                     industry=company_info['industry'],
                     target_country=company_info['target_market'],
-                    company_info=company_info
+                    company_info=company_info,
+                    on_findings=speculative.listener(job, scoring_agent, company_info)
                 )
             )
             
             # Generate scores using the scoring agent
-            scoring_agent = MarketScoringAgent()
             scores = scoring_agent.score_research_report(research_report, company_info)
+            speculative.record_final(job, scores)
             
             # Generate analysis ID for tracking
             analysis_id = f"{company_info['company_name']}_{company_info['target_market']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -779,6 +789,7 @@ class DeepMarketAnalysisAPIView(APIView):
     """
     permission_classes = [permissions.AllowAny]
     
+    @scheduled_analysis
     def post(self, request):
         try:
             # Validate input data
@@ -885,6 +896,16 @@ class HealthCheckAPIView(APIView):
             'features': ['market_analysis', 'deep_analysis', 'scoring_agent', 'research_agent']
         })
 
+class AnalysisProgressAPIView(APIView):
+    """Provisional and final scores of the user's recent analysis runs, for polling while research runs"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        from .models import AnalysisJob
+        
+        jobs = AnalysisJob.objects.filter(user=request.user).order_by('-enqueued_at')[:5]
+        return Response({'jobs': [speculative.progress(job) for job in jobs]})
+
 # Alternative function-based view approach
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -924,6 +945,7 @@ def quick_market_analysis(request):
 class KeyInsightsAPIView(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @scheduled_analysis
     def post(self, request):
         serializer = MarketAnalysisRequestSerializer()
         errors = serializer.validate_data(request.data)
@@ -952,16 +974,19 @@ class KeyInsightsAPIView(APIView):
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
             research_agent = CompetitorResearchAgent(cycles=cycles)
+            scoring_agent = MarketScoringAgent()
+            job = getattr(request, 'analysis_job', None)
             research_report = loop.run_until_complete(
                 research_agent.research_market(
                     company=company_info['company_name'],
                     industry=company_info['industry'],
                     target_country=company_info['target_market'],
-                    company_info=company_info
+                    company_info=company_info,
+                    on_findings=speculative.listener(job, scoring_agent, company_info)
                 )
             )
-            scoring_agent = MarketScoringAgent()
             scores = scoring_agent.score_research_report(research_report, company_info)
+            speculative.record_final(job, scores)
             insights = self._extract_key_insights(scores)
             return Response({'key_insights': insights}, status=status.HTTP_200_OK)
         except Exception as e:
@@ -974,6 +999,7 @@ class CompetitorAnalysisAPIView(APIView):
     """
     permission_classes = [permissions.AllowAny]
 
+    @scheduled_analysis
     def post(self, request):
         serializer = MarketAnalysisRequestSerializer()
         errors = serializer.validate_data(request.data)
@@ -1058,6 +1084,7 @@ class SegmentArbitrageAPIView(APIView):
     """
     permission_classes = [permissions.AllowAny]
 
+    @scheduled_analysis
     def post(self, request):
         serializer = MarketAnalysisRequestSerializer()
         errors = serializer.validate_data(request.data)
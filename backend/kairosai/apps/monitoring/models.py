@@ -17,6 +17,7 @@ class MarketMonitor(models.Model):
     frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES, default='weekly')
     last_checked = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -47,6 +48,7 @@ class MarketAlert(models.Model):
     source_url = models.URLField(null=True, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -88,6 +90,7 @@ class Milestone(models.Model):
     actual_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['phase', 'created_at']
@@ -103,6 +106,7 @@ class CompetitorTracker(models.Model):
     is_active = models.BooleanField(default=True)
     last_checked = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
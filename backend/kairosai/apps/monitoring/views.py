@@ -7,6 +7,7 @@ from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.analysis.etags import etag_matches, not_modified, queryset_etag, with_etag
 from apps.analysis.models import MarketReport
 from .models import (
     MarketMonitor,
@@ -34,6 +35,13 @@ class MonitorListCreateView(APIView):
                 unread_alert_count=Count('alerts', filter=Q(alerts__is_read=False)),
             )
         )
+        etag = queryset_etag(
+            'monitors', MarketMonitor.objects.filter(user=request.user),
+            'updated_at', 'report__updated_at', 'alerts__updated_at', Count('alerts', distinct=True),
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         data = [
             {
                 'id': m.id,
@@ -50,7 +58,7 @@ class MonitorListCreateView(APIView):
             }
             for m in monitors
         ]
-        return Response(data, status=status.HTTP_200_OK)
+        return with_etag(Response(data, status=status.HTTP_200_OK), etag)
 
     def post(self, request):
         report_id = request.data.get('report_id')
@@ -162,7 +170,7 @@ class MonitorDetailView(APIView):
             update_fields.append('frequency')
 
         if update_fields:
-            monitor.save(update_fields=update_fields)
+            monitor.save(update_fields=update_fields + ['updated_at'])
 
         return Response({
             'id': monitor.id,
@@ -194,6 +202,10 @@ class AlertListView(APIView):
         if unread_filter and unread_filter.lower() == 'true':
             alerts = alerts.filter(is_read=False)
 
+        etag = queryset_etag('alerts', alerts, 'updated_at', 'monitor__report__updated_at', extra=[unread_filter])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         data = [
             {
                 'id': a.id,
@@ -211,7 +223,7 @@ class AlertListView(APIView):
             }
             for a in alerts[:100]
         ]
-        return Response(data, status=status.HTTP_200_OK)
+        return with_etag(Response(data, status=status.HTTP_200_OK), etag)
 
 
 class AlertMarkReadView(APIView):
@@ -228,7 +240,7 @@ class AlertMarkReadView(APIView):
             return Response({'error': 'Alert not found'}, status=status.HTTP_404_NOT_FOUND)
 
         alert.is_read = True
-        alert.save(update_fields=['is_read'])
+        alert.save(update_fields=['is_read', 'updated_at'])
 
         return Response({
             'id': alert.id,
@@ -247,6 +259,13 @@ class ExecutionPlanView(APIView):
             .select_related('report')
             .prefetch_related('milestones')
         )
+        etag = queryset_etag(
+            'execution-plans', plans,
+            'updated_at', 'report__updated_at', 'milestones__updated_at', Count('milestones', distinct=True),
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         data = []
         for plan in plans:
             milestones = plan.milestones.all()
@@ -265,7 +284,7 @@ class ExecutionPlanView(APIView):
                 'created_at': plan.created_at.isoformat(),
                 'updated_at': plan.updated_at.isoformat(),
             })
-        return Response(data, status=status.HTTP_200_OK)
+        return with_etag(Response(data, status=status.HTTP_200_OK), etag)
 
     def post(self, request):
         report_id = request.data.get('report_id')
@@ -366,13 +385,15 @@ class ExecutionPlanDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
-        plan = (
-            ExecutionPlan.objects
-            .filter(pk=pk, user=request.user)
-            .select_related('report')
-            .prefetch_related('milestones')
-            .first()
+        plans = ExecutionPlan.objects.filter(pk=pk, user=request.user)
+        etag = queryset_etag(
+            'execution-plan', plans,
+            'updated_at', 'report__updated_at', 'milestones__updated_at', Count('milestones', distinct=True),
         )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        plan = plans.select_related('report').prefetch_related('milestones').first()
         if not plan:
             return Response({'error': 'Execution plan not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -380,7 +401,7 @@ class ExecutionPlanDetailView(APIView):
         total = milestones.count()
         completed = milestones.filter(is_completed=True).count()
 
-        return Response({
+        return with_etag(Response({
             'id': plan.id,
             'report_id': plan.report_id,
             'company_name': plan.report.company_name,
@@ -409,7 +430,7 @@ class ExecutionPlanDetailView(APIView):
             ],
             'created_at': plan.created_at.isoformat(),
             'updated_at': plan.updated_at.isoformat(),
-        })
+        }), etag)
 
     def patch(self, request, pk):
         plan = (
@@ -438,7 +459,7 @@ class ExecutionPlanDetailView(APIView):
                 update_fields.append('started_at')
 
         if update_fields:
-            plan.save(update_fields=update_fields)
+            plan.save(update_fields=update_fields + ['updated_at'])
 
         return Response({
             'id': plan.id,
@@ -496,7 +517,7 @@ class MilestoneUpdateView(APIView):
                 )
 
         if update_fields:
-            milestone.save(update_fields=update_fields)
+            milestone.save(update_fields=update_fields + ['updated_at'])
 
         # Auto-update plan status based on milestones
         plan = milestone.plan
@@ -506,14 +527,14 @@ class MilestoneUpdateView(APIView):
 
         if completed_count == total_count and total_count > 0:
             plan.status = 'completed'
-            plan.save(update_fields=['status'])
+            plan.save(update_fields=['status', 'updated_at'])
         elif completed_count > 0 and plan.status == 'not_started':
             plan.status = 'in_progress'
             if not plan.started_at:
                 plan.started_at = datetime.now()
-                plan.save(update_fields=['status', 'started_at'])
+                plan.save(update_fields=['status', 'started_at', 'updated_at'])
             else:
-                plan.save(update_fields=['status'])
+                plan.save(update_fields=['status', 'updated_at'])
 
         return Response({
             'id': milestone.id,
@@ -538,6 +559,13 @@ class CompetitorTrackerListView(APIView):
             .select_related('report')
             .annotate(update_count=Count('updates'))
         )
+        etag = queryset_etag(
+            'competitor-trackers', CompetitorTracker.objects.filter(user=request.user),
+            'updated_at', 'report__updated_at', Count('updates', distinct=True),
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         data = [
             {
                 'id': t.id,
@@ -552,7 +580,7 @@ class CompetitorTrackerListView(APIView):
             }
             for t in trackers
         ]
-        return Response(data, status=status.HTTP_200_OK)
+        return with_etag(Response(data, status=status.HTTP_200_OK), etag)
 
     def post(self, request):
         report_id = request.data.get('report_id')
@@ -604,7 +632,7 @@ class CompetitorTrackerDetailView(APIView):
 
         if 'is_active' in request.data:
             tracker.is_active = bool(request.data['is_active'])
-            tracker.save(update_fields=['is_active'])
+            tracker.save(update_fields=['is_active', 'updated_at'])
 
         return Response({
             'id': tracker.id,
@@ -625,9 +653,13 @@ class CompetitorUpdateListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        user_updates = CompetitorUpdate.objects.filter(tracker__user=request.user)
+        etag = queryset_etag('competitor-updates', user_updates, 'detected_at', 'tracker__report__updated_at')
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         updates = (
-            CompetitorUpdate.objects
-            .filter(tracker__user=request.user)
+            user_updates
             .select_related('tracker', 'tracker__report')
             .order_by('-detected_at')[:100]
         )
@@ -647,7 +679,7 @@ class CompetitorUpdateListView(APIView):
             }
             for u in updates
         ]
-        return Response(data, status=status.HTTP_200_OK)
+        return with_etag(Response(data, status=status.HTTP_200_OK), etag)
 
 
 class NewsFeedView(APIView):
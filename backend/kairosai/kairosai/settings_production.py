@@ -1,4 +1,5 @@
 # kairosai/settings_production.py
+import json
 import os
 from decouple import config
 from pathlib import Path
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'apps.analysis.middleware.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,7 +97,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.analysis.renderers.ORJSONRenderer',
     ],
 }
 
@@ -149,6 +151,44 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Rendered report exports (PDF/PPTX), reused until the report or template changes
+REPORT_ARTIFACT_DIR = config('REPORT_ARTIFACT_DIR', default=os.path.join(BASE_DIR, 'report_artifacts'))
+REPORT_ARTIFACT_MAX_BYTES = config('REPORT_ARTIFACT_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+# Process pool size for pre-rendering exports when a report completes (0 disables)
+REPORT_PRERENDER_WORKERS = config('REPORT_PRERENDER_WORKERS', default=2, cast=int)
+# Pre-serialized, pre-compressed snapshots of shared reports
+SHARED_SNAPSHOT_DIR = config('SHARED_SNAPSHOT_DIR', default=os.path.join(BASE_DIR, 'shared_snapshots'))
+# Semantic cache of chat answers, keyed on the report set and the question embedding
+CHAT_CACHE_TTL = config('CHAT_CACHE_TTL', default=24 * 60 * 60, cast=int)
+CHAT_CACHE_SIMILARITY = config('CHAT_CACHE_SIMILARITY', default=0.92, cast=float)
+# Chat memory: token budget for verbatim recent turns, threads summarizing older ones (0 disables)
+CHAT_HISTORY_TOKENS = config('CHAT_HISTORY_TOKENS', default=1500, cast=int)
+CHAT_SUMMARY_WORKERS = config('CHAT_SUMMARY_WORKERS', default=2, cast=int)
+# OpenAI rate limiting: 'database' shares token buckets across workers, 'local' is per process.
+# LLM_RATE_LIMITS is JSON, {model: {'rpm': ..., 'tpm': ...}}, matching the account's OpenAI tier;
+# models without limits are observe-only (calls are counted, never held)
+LLM_RATE_LIMIT_BACKEND = config('LLM_RATE_LIMIT_BACKEND', default='database')
+LLM_RATE_LIMIT_MAX_WAIT = config('LLM_RATE_LIMIT_MAX_WAIT', default=60, cast=float)
+LLM_RATE_LIMITS = config('LLM_RATE_LIMITS', default='{}', cast=json.loads)
+# LLM resilience: attempts per call, consecutive transient failures that open a model's circuit,
+# seconds before a probe call, and hedging interactive calls that run past the model's p95 latency
+LLM_RETRY_ATTEMPTS = config('LLM_RETRY_ATTEMPTS', default=3, cast=int)
+LLM_BREAKER_FAILURES = config('LLM_BREAKER_FAILURES', default=5, cast=int)
+LLM_BREAKER_RESET_SECONDS = config('LLM_BREAKER_RESET_SECONDS', default=30, cast=int)
+LLM_HEDGE_INTERACTIVE = config('LLM_HEDGE_INTERACTIVE', default=True, cast=bool)
+# Model routing overrides ({task: {tier: model}}), A/B experiments ({task: {'model': ..., 'share': 0.2}})
+# and how long per-call routing records are kept
+LLM_ROUTES = {}
+LLM_ROUTE_EXPERIMENTS = {}
+LLM_CALL_RETENTION_DAYS = config('LLM_CALL_RETENTION_DAYS', default=30, cast=int)
+# Analysis scheduler: concurrent research runs across all workers, seconds a request may queue,
+# and seconds after which a running job stops holding its slot
+ANALYSIS_MAX_CONCURRENT = config('ANALYSIS_MAX_CONCURRENT', default=4, cast=int)
+ANALYSIS_QUEUE_MAX_WAIT = config('ANALYSIS_QUEUE_MAX_WAIT', default=900, cast=int)
+ANALYSIS_JOB_TIMEOUT = config('ANALYSIS_JOB_TIMEOUT', default=2 * 60 * 60, cast=int)
+# URL namespaces whose JSON responses are brotli/gzip compressed
+COMPRESSED_RESPONSE_APPS = ['analysis']
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
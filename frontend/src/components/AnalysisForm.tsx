@@ -36,6 +36,22 @@ import { authService } from '../auth/authService';
 import { useData } from '../contexts/DataContext';
 import { API_ENDPOINTS } from '../config/api';
 
+// Headline scores the backend publishes from partial research while a run is in progress
+interface ProvisionalScores {
+  market_opportunity_score?: number;
+  competitive_intensity_score?: number;
+  entry_complexity_score?: number;
+}
+
+interface AnalysisProgress {
+  state: string;
+  provisional_scores: ProvisionalScores | null;
+  provisional_iteration: number | null;
+}
+
+// How often the loading screen asks for provisional scores
+const PROGRESS_POLL_MS = 5000;
+
 interface AnalysisFormProps {
   // Optional props for customization
   welcomeTitle?: string;
@@ -78,6 +94,7 @@ const AnalysisForm: React.FC<AnalysisFormProps> = ({
   const [loading, setLoading] = useState(false);
   const [timer, setTimer] = useState(600); // 10 minutes in seconds (default for 5 cycles)
   const [timerExpired, setTimerExpired] = useState(false);
+  const [progress, setProgress] = useState<AnalysisProgress | null>(null);
   const navigate = useNavigate();
   const toast = useToast();
 
@@ -230,6 +247,39 @@ const AnalysisForm: React.FC<AnalysisFormProps> = ({
     return () => clearInterval(interval);
   }, [loading, timer]);
 
+  // The analysis request blocks until research finishes, so poll for the
+  // provisional scores of the run in progress while it is pending.
+  useEffect(() => {
+    if (!loading || !user) {
+      setProgress(null);
+      return;
+    }
+    let cancelled = false;
+    const poll = async () => {
+      try {
+        const response = await fetch(API_ENDPOINTS.ANALYSIS.PROGRESS, {
+          headers: authService.getAuthHeaders(),
+        });
+        if (!response.ok) return;
+        const data = await response.json();
+        const active = (data.jobs || []).find(
+          (job: AnalysisProgress) => job.state === 'queued' || job.state === 'running'
+        );
+        if (!cancelled && active) {
+          setProgress(active);
+        }
+      } catch {
+        // Progress is a preview; the analysis request reports real failures
+      }
+    };
+    poll();
+    const interval = setInterval(poll, PROGRESS_POLL_MS);
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+    };
+  }, [loading, user]);
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
 
@@ -423,6 +473,35 @@ const AnalysisForm: React.FC<AnalysisFormProps> = ({
           {timerExpired && (
             <Text color="red.500" fontWeight="bold">This is taking longer than expected. Please wait or try again later.</Text>
           )}
+          {progress?.state === 'queued' && (
+            <Text fontSize="sm" color="purple.600">Waiting for a free research slot...</Text>
+          )}
+          {progress?.provisional_scores && (
+            <Card bg="white" borderRadius="md" shadow="md">
+              <CardBody>
+                <VStack spacing={2}>
+                  <Text fontSize="sm" fontWeight="bold" color="purple.700">
+                    Early estimate after {progress.provisional_iteration} research iteration{progress.provisional_iteration === 1 ? '' : 's'}
+                  </Text>
+                  <HStack spacing={6}>
+                    {([
+                      ['Opportunity', progress.provisional_scores.market_opportunity_score],
+                      ['Competition', progress.provisional_scores.competitive_intensity_score],
+                      ['Entry complexity', progress.provisional_scores.entry_complexity_score],
+                    ] as [string, number | undefined][]).map(([label, score]) => (
+                      <VStack key={label} spacing={0}>
+                        <Text fontSize="xl" fontWeight="bold" color="purple.600">
+                          {score !== undefined ? score.toFixed(1) : '-'}
+                        </Text>
+                        <Text fontSize="xs" color="gray.600">{label}</Text>
+                      </VStack>
+                    ))}
+                  </HStack>
+                  <Text fontSize="xs" color="gray.500">Scores may change when the full analysis completes.</Text>
+                </VStack>
+              </CardBody>
+            </Card>
+          )}
         </VStack>
       </Box>
     );
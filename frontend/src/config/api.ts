@@ -30,6 +30,7 @@ export const API_ENDPOINTS = {
     COMPREHENSIVE: `${API_BASE_URL}/comprehensive-analysis/`,
     COMPETITOR: `${API_BASE_URL}/competitor-analysis/`,
     SEGMENT_ARBITRAGE: `${API_BASE_URL}/segment-arbitrage/`,
+    PROGRESS: `${API_BASE_URL}/analysis-progress/`,
   },
   
   // Reports endpoints